@@ -0,0 +1,230 @@
+"""
+요청 수용 제어 (admission control)
+엔드포인트를 우선순위가 있는 클래스로 나누고, 클래스별/전체 동시 처리 수를 제한한다.
+한도를 넘은 요청은 짧은 대기열에서 기한까지만 기다리며, 대기열이 가득 찼거나 기한이 지나면
+처리하지 않고 바로 429/503 + Retry-After로 응답한다. 자리가 나면 우선순위가 높은 클래스의
+대기 요청부터 들여보내므로, 과부하 중에도 /optimize가 일괄/학습 요청보다 먼저 처리된다.
+
+이벤트 루프 안에서만 호출되므로 잠금 없이 카운터를 갱신한다.
+"""
+
+import asyncio
+import json
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+@dataclass(frozen=True)
+class AdmissionClass:
+    """수용 제어 클래스
+
+    priority가 작을수록 먼저 처리된다. max_queue=0 이면 한도를 넘은 요청은 기다리지 않고 바로 거절된다.
+    paths는 정확히 일치하는 경로, prefixes는 접두사로 일치하는 경로이며, methods가 있으면 그 HTTP 메서드만
+    해당한다 (예: 상태 조회 GET은 제외하고 작업을 바꾸는 POST만 제한).
+    """
+    name: str
+    priority: int
+    max_in_flight: int
+    max_queue: int = 0
+    queue_timeout: float = 0.0
+    paths: Tuple[str, ...] = ()
+    prefixes: Tuple[str, ...] = ()
+    methods: Tuple[str, ...] = ()
+
+    def allows(self, method: str) -> bool:
+        return not self.methods or method in self.methods
+
+class AdmissionRejected(Exception):
+    """요청 거절 (status: 429 클래스 한도 초과 / 503 서버 전체 포화)"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("future", "cancelled")
+
+    def __init__(self, future: "asyncio.Future[None]"):
+        self.future = future
+        self.cancelled = False
+
+@dataclass
+class _ClassState:
+    spec: AdmissionClass
+    in_flight: int = 0
+    waiters: Deque[_Waiter] = field(default_factory=deque)
+    queued: int = 0
+    admitted: int = 0
+    waited: int = 0
+    shed: Dict[str, int] = field(default_factory=lambda: {"queue_full": 0, "timeout": 0})
+
+class AdmissionController:
+    """클래스별/전체 동시 처리 수 제한 및 우선순위 대기열"""
+
+    def __init__(self, classes: Iterable[AdmissionClass], max_in_flight: int, retry_after: float = 1.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._classes: Dict[str, _ClassState] = {}
+        self._paths: Dict[str, _ClassState] = {}
+        self._prefixes: List[Tuple[str, _ClassState]] = []
+        for spec in sorted(classes, key=lambda c: c.priority):
+            state = self._classes[spec.name] = _ClassState(spec)
+            for path in spec.paths:
+                self._paths[path] = state
+            self._prefixes.extend((prefix, state) for prefix in spec.prefixes)
+        # 긴 접두사가 먼저 일치하도록 정렬
+        self._prefixes.sort(key=lambda item: -len(item[0]))
+
+    @property
+    def class_capacity(self) -> int:
+        """클래스 한도의 합 (max_in_flight보다 작으면 전체 한도는 적용되지 않는다)"""
+        return sum(state.spec.max_in_flight for state in self._classes.values())
+
+    def classify(self, path: str, method: str = "GET") -> Optional[str]:
+        """요청의 클래스 이름 (제한 대상이 아니면 None)"""
+        state = self._lookup(path, method)
+        return state.spec.name if state is not None else None
+
+    def _lookup(self, path: str, method: str) -> Optional[_ClassState]:
+        state = self._paths.get(path)
+        if state is not None and state.spec.allows(method):
+            return state
+        for prefix, state in self._prefixes:
+            if path.startswith(prefix) and state.spec.allows(method):
+                return state
+        return None
+
+    def _fits(self, state: _ClassState) -> bool:
+        return state.in_flight < state.spec.max_in_flight and self.in_flight < self.max_in_flight
+
+    def _admit(self, state: _ClassState) -> None:
+        state.in_flight += 1
+        state.admitted += 1
+        self.in_flight += 1
+
+    def _reject(self, state: _ClassState, reason: str) -> AdmissionRejected:
+        state.shed[reason] += 1
+        # 클래스 한도 때문이면 해당 클라이언트가 줄여야 하므로 429, 서버 전체가 포화면 503
+        status = 429 if state.in_flight >= state.spec.max_in_flight else 503
+        retry_after = max(self.retry_after, state.spec.queue_timeout)
+        return AdmissionRejected(status, reason, retry_after)
+
+    async def acquire(self, path: str, method: str = "GET") -> Optional[str]:
+        """처리 자리 확보 (제한 대상이 아니면 None, 확보했으면 클래스 이름, 거절 시 AdmissionRejected)"""
+        state = self._lookup(path, method)
+        if state is None:
+            return None
+        # 대기 중인 요청은 자리가 날 때마다 즉시 배정되므로, 지금 자리가 있으면 앞선 대기자도 없다
+        if self._fits(state):
+            self._admit(state)
+            return state.spec.name
+        if state.queued >= state.spec.max_queue or state.spec.queue_timeout <= 0:
+            raise self._reject(state, "queue_full")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future())
+        state.waiters.append(waiter)
+        state.queued += 1
+        state.waited += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), state.spec.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.cancelled = True
+                state.queued -= 1
+                raise self._reject(state, "timeout")
+        except asyncio.CancelledError:
+            # 대기 중 클라이언트 연결이 끊긴 경우 (이미 배정되었으면 자리를 돌려준다)
+            if waiter.future.done():
+                self.release(state.spec.name)
+            else:
+                waiter.cancelled = True
+                state.queued -= 1
+            raise
+        return state.spec.name
+
+    def release(self, name: str) -> None:
+        """처리 완료 (대기 중인 요청을 우선순위 순으로 배정)"""
+        state = self._classes[name]
+        state.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for state in self._classes.values():
+            if self.in_flight >= self.max_in_flight:
+                return
+            while state.waiters and self._fits(state):
+                waiter = state.waiters.popleft()
+                if waiter.cancelled:
+                    continue
+                state.queued -= 1
+                self._admit(state)
+                waiter.future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """현재 처리/대기 수 및 누적 수용/거절 수"""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "class_capacity": self.class_capacity,
+            "classes": {
+                name: {
+                    "priority": state.spec.priority,
+                    "in_flight": state.in_flight,
+                    "max_in_flight": state.spec.max_in_flight,
+                    "methods": list(state.spec.methods) or None,
+                    "queued": state.queued,
+                    "max_queue": state.spec.max_queue,
+                    "queue_timeout": state.spec.queue_timeout,
+                    "admitted": state.admitted,
+                    "waited": state.waited,
+                    "shed": dict(state.shed)
+                }
+                for name, state in self._classes.items()
+            }
+        }
+
+class AdmissionControlMiddleware:
+    """수용 제어 ASGI 미들웨어 (거절된 요청은 애플리케이션에 전달되지 않는다)"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            name = await self.controller.acquire(scope["path"], scope["method"])
+        except AdmissionRejected as e:
+            await self._send_rejection(send, e)
+            return
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name)
+
+    @staticmethod
+    async def _send_rejection(send, rejected: AdmissionRejected) -> None:
+        detail = "요청이 너무 많습니다" if rejected.status == 429 else "서버가 포화 상태입니다"
+        body = json.dumps(
+            {"detail": f"{detail} ({rejected.reason}), 잠시 후 다시 시도해주세요"}, ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(max(1, math.ceil(rejected.retry_after))).encode("ascii"))
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
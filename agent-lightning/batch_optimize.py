@@ -0,0 +1,473 @@
+"""
+오프라인 일괄 최적화
+프롬프트 라이브러리 전체(JSONL/CSV)를 HTTP 서버 없이 프로세스 풀로 다시 최적화한다 (규칙 변경 후 재처리 등).
+
+사용법 (agent-lightning 디렉터리에서):
+    python batch_optimize.py prompts.jsonl -o optimized.jsonl
+    python batch_optimize.py prompts.csv -o optimized.jsonl --category image --recommend --workers 8
+    python batch_optimize.py prompts.jsonl -o optimized.jsonl --resume      # 중단된 작업 이어서 처리
+    python batch_optimize.py prompts.jsonl -o optimized.jsonl --emit-spans  # 끝난 뒤 Span 일괄 기록
+
+입력은 청크 단위로 읽어 워커에 보내며, 처리 중인 청크 수가 제한되므로 입력 크기와 무관하게 메모리 사용량이 일정하다.
+결과는 입력 순서대로(기본) 또는 끝나는 순서대로(--unordered) JSONL로 기록되고,
+완료된 청크와 출력 파일 위치를 체크포인트 파일에 주기적으로 기록하여 --resume으로 이어서 처리할 수 있다.
+
+입력 항목은 /optimize 요청 형식(prompt, category, model, options, task_id)이며 id 필드가 있으면 결과에 그대로 포함된다.
+CSV는 같은 이름의 열을 사용하고 options 열은 JSON 문자열이다.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from schemas import PromptOptimizationRequest
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 256
+# 워커당 동시에 처리 중이거나 기록을 기다리는 청크 수
+DEFAULT_CHUNKS_PER_WORKER = 2
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+DEFAULT_PROGRESS_INTERVAL = 10.0
+# --emit-spans 시 한 번에 기록할 Span 수
+SPAN_RECORD_BATCH_SIZE = 1000
+
+Row = Union[str, Dict[str, Any]]
+
+class CheckpointMismatch(Exception):
+    """체크포인트가 현재 입력/설정과 맞지 않음 (이어서 처리할 수 없음)"""
+
+# ============================================
+# 워커 (프로세스 풀)
+# ============================================
+
+_server = None
+
+def _prepare(recommend: bool, learned_snapshot_path: Optional[str]) -> None:
+    """최적화 함수/템플릿 카탈로그/학습 스냅샷 준비 (부모 프로세스와 각 워커에서 한 번)
+
+    fork로 시작한 워커는 부모가 준비한 상태를 물려받으므로 아무것도 다시 읽지 않는다.
+    """
+    global _server
+    if _server is not None:
+        return
+    import main
+    if recommend:
+        main.template_catalog.reload()
+    if learned_snapshot_path and os.path.exists(learned_snapshot_path):
+        from shared_snapshot import read_snapshot_file
+        try:
+            version, entries = read_snapshot_file(learned_snapshot_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 학습 스냅샷 읽기 실패 (학습 패턴 없이 진행): {e}")
+        else:
+            main.learned_snapshots.swap(entries, version=version)
+    _server = main
+
+def _parse_row(row: Row, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """입력 행 -> 요청 필드 (JSONL은 한 줄, CSV는 열 이름 -> 값)"""
+    if isinstance(row, str):
+        data = json.loads(row)
+        if not isinstance(data, dict):
+            raise ValueError("항목은 JSON 객체여야 합니다")
+    else:
+        data = {key: value for key, value in row.items() if key and value not in (None, "")}
+        if "options" in data:
+            data["options"] = json.loads(data["options"])
+    for key, value in defaults.items():
+        data.setdefault(key, value)
+    return data
+
+def optimize_chunk(
+    start_index: int,
+    rows: List[Row],
+    defaults: Dict[str, Any],
+    recommend: bool,
+    learned_snapshot_path: Optional[str] = None
+) -> Tuple[bytes, int, int]:
+    """청크 하나 최적화 ((JSONL 결과, 성공 수, 실패 수) 반환, 항목별 오류는 결과에만 기록된다)"""
+    _prepare(recommend, learned_snapshot_path)
+    server = _server
+    learned_by_model: Dict[Optional[str], Any] = {}
+    lines: List[str] = []
+    succeeded = 0
+    for offset, row in enumerate(rows):
+        record: Dict[str, Any] = {"index": start_index + offset}
+        try:
+            data = _parse_row(row, defaults)
+            if "id" in data:
+                record["id"] = data["id"]
+            request = PromptOptimizationRequest.model_validate(data)
+            category = request.category.lower()
+            learned = None
+            if category == "image":
+                if request.model not in learned_by_model:
+                    learned_by_model[request.model] = server.get_learned_optimizations(category, request.model)
+                learned = learned_by_model[request.model]
+            result = server.run_optimizer(category, request.prompt, request.model, request.options or {}, learned=learned)
+        except Exception as e:
+            record.update(status="error", error=str(e))
+            lines.append(json.dumps(record, ensure_ascii=False))
+            continue
+        task_id = request.task_id or server.build_task_id(category, request.prompt)
+        record.update(
+            status="success",
+            category=category,
+            model=request.model,
+            task_id=task_id,
+            result=server.build_optimization_response(request, result, task_id, None).model_dump(exclude_none=True)
+        )
+        if recommend:
+            record["templates"] = server.recommend_templates(request.prompt, category, request.model)
+        lines.append(json.dumps(record, ensure_ascii=False))
+        succeeded += 1
+    lines.append("")
+    return "\n".join(lines).encode("utf-8"), succeeded, len(rows) - succeeded
+
+# ============================================
+# 입력
+# ============================================
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def iter_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[Tuple[int, int, List[Row]]]:
+    """(청크 번호, 첫 항목 번호, 행 목록) 순회 (JSONL은 빈 줄을 건너뛰며, 행은 워커에서 해석한다)"""
+    chunk: List[Row] = []
+    chunk_id = index = 0
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f) if fmt == "csv" else (line for line in f if line.strip())
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk_id, index, chunk
+                chunk_id += 1
+                index += len(chunk)
+                chunk = []
+        if chunk:
+            yield chunk_id, index, chunk
+
+# ============================================
+# 출력 및 체크포인트
+# ============================================
+
+def _input_signature(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": stat.st_size, "input_mtime_ns": stat.st_mtime_ns}
+
+class OutputWriter:
+    """결과 기록 및 체크포인트 관리
+
+    체크포인트에는 완료된 청크 번호와 그 결과까지 기록된 출력 파일 크기가 함께 저장되며,
+    이어서 처리할 때 출력 파일을 그 크기로 잘라 체크포인트 이후의 불완전한 기록을 버린다.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        checkpoint_path: str,
+        settings: Dict[str, Any],
+        ordered: bool,
+        checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+        resume: bool = False
+    ):
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path
+        self.settings = settings
+        self.ordered = ordered
+        self.checkpoint_interval = checkpoint_interval
+        self.completed_below = 0
+        self.completed: Set[int] = set()
+        self.items = self.succeeded = self.failed = 0
+        self.finished = False
+        self.spans_emitted = False
+        self.output_offset = 0
+        self._buffered: Dict[int, Tuple[bytes, int, int]] = {}
+        self._last_checkpoint = time.monotonic()
+
+        offset = 0
+        if resume and os.path.exists(checkpoint_path):
+            offset = self._restore()
+        self._file = open(output_path, "r+b" if offset else "wb")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self.output_offset = offset
+
+    def _restore(self) -> int:
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("format_version") != CHECKPOINT_FORMAT_VERSION:
+            raise CheckpointMismatch("체크포인트 형식 버전이 다릅니다")
+        for key, value in self.settings.items():
+            if checkpoint.get(key) != value:
+                raise CheckpointMismatch(f"체크포인트의 {key}가 현재 값과 다릅니다: {checkpoint.get(key)!r} != {value!r}")
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) < checkpoint["output_offset"]:
+            raise CheckpointMismatch(f"출력 파일이 체크포인트보다 짧습니다: {self.output_path}")
+        self.completed_below = checkpoint["completed_below"]
+        self.completed = set(checkpoint["completed"])
+        self.items = checkpoint["items"]
+        self.succeeded = checkpoint["succeeded"]
+        self.failed = checkpoint["failed"]
+        self.finished = checkpoint["finished"]
+        self.spans_emitted = checkpoint.get("spans_emitted", False)
+        logger.info(
+            f"✅ 체크포인트에서 이어서 처리: items={self.items}, chunks={self.completed_below + len(self.completed)}"
+        )
+        return checkpoint["output_offset"]
+
+    def is_done(self, chunk_id: int) -> bool:
+        return chunk_id < self.completed_below or chunk_id in self.completed
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffered)
+
+    def complete(self, chunk_id: int, payload: Tuple[bytes, int, int]) -> None:
+        """청크 결과 기록 (입력 순서 모드에서는 앞선 청크가 모두 기록될 때까지 보관)"""
+        if not self.ordered:
+            self._write(chunk_id, payload)
+        else:
+            self._buffered[chunk_id] = payload
+            while self.completed_below in self._buffered:
+                self._write(self.completed_below, self._buffered.pop(self.completed_below))
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def _write(self, chunk_id: int, payload: Tuple[bytes, int, int]) -> None:
+        data, succeeded, failed = payload
+        self._file.write(data)
+        self.items += succeeded + failed
+        self.succeeded += succeeded
+        self.failed += failed
+        self.completed.add(chunk_id)
+        while self.completed_below in self.completed:
+            self.completed.remove(self.completed_below)
+            self.completed_below += 1
+
+    def checkpoint(self) -> None:
+        """출력 파일을 디스크에 기록한 뒤 체크포인트 교체 (원자적, 출력 파일을 닫은 뒤에는 상태만 갱신)"""
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.output_offset = self._file.tell()
+        checkpoint = {
+            "format_version": CHECKPOINT_FORMAT_VERSION,
+            **self.settings,
+            "output_offset": self.output_offset,
+            "completed_below": self.completed_below,
+            "completed": sorted(self.completed),
+            "items": self.items,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "finished": self.finished,
+            "spans_emitted": self.spans_emitted,
+            "updated_at": time.time()
+        }
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(temp_path, self.checkpoint_path)
+        self._last_checkpoint = time.monotonic()
+
+    def close(self) -> None:
+        self._file.close()
+
+# ============================================
+# 실행
+# ============================================
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    fmt: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ordered: bool = True,
+    recommend: bool = False,
+    defaults: Optional[Dict[str, Any]] = None,
+    learned_snapshot_path: Optional[str] = None,
+    resume: bool = False,
+    checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL
+) -> OutputWriter:
+    """입력 파일 전체 최적화 (workers <= 1 이면 현재 프로세스에서 처리)"""
+    fmt = detect_format(input_path, fmt)
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    defaults = defaults or {}
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.json"
+    writer = OutputWriter(
+        output_path,
+        checkpoint_path,
+        settings={
+            **_input_signature(input_path),
+            "format": fmt,
+            "chunk_size": chunk_size,
+            "ordered": ordered,
+            "recommend": recommend,
+            "defaults": defaults
+        },
+        ordered=ordered,
+        checkpoint_interval=checkpoint_interval,
+        resume=resume
+    )
+    if writer.finished:
+        logger.info(f"✅ 이미 완료된 작업입니다: {output_path}")
+        writer.close()
+        return writer
+
+    # 부모에서 한 번 준비하면 fork로 시작하는 워커는 카탈로그/스냅샷을 다시 읽지 않는다
+    _prepare(recommend, learned_snapshot_path)
+    started = time.perf_counter()
+    last_progress = time.monotonic()
+    items_at_start = writer.items
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    window = max(1, workers) * DEFAULT_CHUNKS_PER_WORKER
+    pending: Dict[Future, int] = {}
+
+    def drain(block: bool) -> None:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED, timeout=None if block else 0)
+        for future in done:
+            writer.complete(pending.pop(future), future.result())
+
+    try:
+        for chunk_id, start_index, rows in iter_chunks(input_path, fmt, chunk_size):
+            if writer.is_done(chunk_id):
+                continue
+            if executor is None:
+                writer.complete(chunk_id, optimize_chunk(start_index, rows, defaults, recommend, learned_snapshot_path))
+            else:
+                # 처리 중인 청크와 기록을 기다리는 청크를 합쳐 window개를 넘지 않게 한다 (메모리 상한)
+                while pending and len(pending) + writer.buffered >= window:
+                    drain(block=True)
+                future = executor.submit(optimize_chunk, start_index, rows, defaults, recommend, learned_snapshot_path)
+                pending[future] = chunk_id
+                drain(block=False)
+            if progress_interval > 0 and time.monotonic() - last_progress >= progress_interval:
+                last_progress = time.monotonic()
+                rate = (writer.items - items_at_start) / max(time.perf_counter() - started, 1e-9)
+                logger.info(f"진행: items={writer.items}, failed={writer.failed}, {rate:.0f} items/s")
+        while pending:
+            drain(block=True)
+        writer.finished = True
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        writer.checkpoint()
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    processed = writer.items - items_at_start
+    logger.info(
+        f"✅ 일괄 최적화 완료: items={writer.items}, succeeded={writer.succeeded}, failed={writer.failed}, "
+        f"{elapsed:.1f}s, {processed / max(elapsed, 1e-9):.0f} items/s (workers={workers})"
+    )
+    return writer
+
+def emit_spans(output_path: str, init_timeout: float = 30.0) -> int:
+    """결과 파일의 성공 항목을 Span으로 일괄 기록 (기록한 Span 수, 추적 불가 시 -1)
+
+    최적화가 모두 끝난 뒤 부모 프로세스에서 한 번만 실행하며, 로컬 Span 저장소에는 배치마다 트랜잭션 하나로 기록된다.
+    """
+    import main
+    main.restore_training_stats()
+    main.open_local_span_store()
+    main.start_agent_lightning_initializer().join(init_timeout)
+    if not main.tracking_available():
+        logger.warning("⚠️ Agent Lightning/로컬 Span 저장소를 사용할 수 없어 Span을 기록하지 않습니다")
+        return -1
+
+    recorded = 0
+    records: List[Dict[str, Any]] = []
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                if item.get("status") != "success":
+                    continue
+                records.append({
+                    "prompt": item["result"]["original_prompt"],
+                    "optimized_prompt": item["result"]["optimized_prompt"],
+                    "category": item["category"],
+                    "model": item.get("model"),
+                    "task_id": item["task_id"],
+                    "metadata": {
+                        "quality_score": item["result"]["quality_score"],
+                        "confidence": item["result"]["confidence"],
+                        "improvements_count": len(item["result"]["improvements"]),
+                        "improvements": item["result"]["improvements"],
+                        "source": "batch_optimize"
+                    }
+                })
+                if len(records) >= SPAN_RECORD_BATCH_SIZE:
+                    recorded += len(main.record_prompt_spans(records))
+                    records = []
+        if records:
+            recorded += len(main.record_prompt_spans(records))
+    finally:
+        main.local_span_store.close()
+        main.save_training_stats()
+    logger.info(f"✅ Span 일괄 기록 완료: {recorded}개")
+    return recorded
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Agent Lightning 오프라인 일괄 프롬프트 최적화")
+    parser.add_argument("input", help="입력 파일 (JSONL 또는 CSV)")
+    parser.add_argument("-o", "--output", required=True, help="결과 JSONL 경로")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="입력 형식 (기본: 확장자로 판단)")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 코어 수, 1 이하면 단일 프로세스)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="워커에 한 번에 보낼 항목 수")
+    parser.add_argument("--unordered", action="store_true", help="끝나는 순서대로 기록 (입력 순서 유지 안 함)")
+    parser.add_argument("--recommend", action="store_true", help="항목마다 템플릿 추천 결과 포함")
+    parser.add_argument("--category", help="category가 없는 항목의 기본값")
+    parser.add_argument("--model", help="model이 없는 항목의 기본값")
+    parser.add_argument("--learned-snapshot", default=os.getenv("AGL_SHARED_SNAPSHOT_PATH", "learned_snapshot.bin"),
+                        help="학습 스냅샷 파일 (다중 워커 모드 소유자가 기록한 파일, 없으면 학습 패턴 없이 처리)")
+    parser.add_argument("--checkpoint", help="체크포인트 경로 (기본: <output>.checkpoint.json)")
+    parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="체크포인트 기록 주기 (초)")
+    parser.add_argument("--resume", action="store_true", help="체크포인트에서 이어서 처리")
+    parser.add_argument("--emit-spans", action="store_true", help="완료 후 성공 항목을 Span으로 일괄 기록")
+    parser.add_argument("--progress-interval", type=float, default=DEFAULT_PROGRESS_INTERVAL, help="진행 상황 출력 주기 (초)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    defaults = {key: value for key, value in (("category", args.category), ("model", args.model)) if value}
+    try:
+        writer = run_batch(
+            args.input,
+            args.output,
+            checkpoint_path=args.checkpoint,
+            fmt=args.format,
+            workers=args.workers,
+            chunk_size=max(1, args.chunk_size),
+            ordered=not args.unordered,
+            recommend=args.recommend,
+            defaults=defaults,
+            learned_snapshot_path=args.learned_snapshot,
+            resume=args.resume,
+            checkpoint_interval=args.checkpoint_interval,
+            progress_interval=args.progress_interval
+        )
+    except CheckpointMismatch as e:
+        logger.error(f"❌ 이어서 처리할 수 없습니다: {e} (--resume 없이 다시 실행하세요)")
+        return 2
+
+    if args.emit_spans and not writer.spans_emitted:
+        if emit_spans(args.output) < 0:
+            return 1
+        # 다시 실행해도 Span이 중복 기록되지 않도록 체크포인트에 표시
+        writer.spans_emitted = True
+        writer.checkpoint()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,484 @@
+"""
+최적화/추천/HTTP 엔드포인트 벤치마크 및 성능 회귀 검사
+
+사용법 (agent-lightning 디렉터리에서):
+    python benchmarks/run_benchmarks.py                    # 기준선과 비교 (회귀 시 종료 코드 1)
+    python benchmarks/run_benchmarks.py --update-baseline  # 현재 결과를 기준선으로 저장
+    python benchmarks/run_benchmarks.py --quick --output result.json
+
+agentlightning은 메모리 스텁으로 대체되며, HTTP 엔드포인트는 ASGI transport로 프로세스 내에서 호출된다.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+BASELINE_FORMAT_VERSION = 1
+
+# 기준선 대비 허용 저하 비율 (처리량/중앙값 지연, 꼬리 지연)
+DEFAULT_THRESHOLD = float(os.getenv("BENCH_THRESHOLD", "0.5"))
+DEFAULT_TAIL_THRESHOLD = float(os.getenv("BENCH_TAIL_THRESHOLD", "1.5"))
+# 이보다 작은 지연 증가는 타이머 잡음으로 보고 무시 (밀리초)
+DEFAULT_MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "0.01"))
+
+SEED = 20240601
+
+# ============================================
+# agentlightning 스텁
+# ============================================
+
+def install_agentlightning_stub() -> None:
+    """저장소 없이 main을 불러오기 위한 agentlightning 대체 모듈"""
+    module = types.ModuleType("agentlightning")
+    counter = {"spans": 0, "rewards": 0}
+
+    class _Span:
+        __slots__ = ("span_id",)
+
+        def __init__(self, span_id: str):
+            self.span_id = span_id
+
+    def emit_span(name: str, metadata: Dict[str, Any], task_id: Optional[str] = None) -> _Span:
+        counter["spans"] += 1
+        return _Span(f"stub_span_{counter['spans']}")
+
+    def emit_reward(span_id: str, reward: float, metadata: Optional[Dict[str, Any]] = None) -> None:
+        counter["rewards"] += 1
+
+    class LightningStore:
+        def __init__(self, store_url: str = ""):
+            self.store_url = store_url
+
+    class Trainer:
+        def __init__(self, store: Any = None):
+            self.store = store
+
+        def train(self) -> None:
+            return None
+
+    module.emit_span = emit_span
+    module.emit_reward = emit_reward
+    module.LightningStore = LightningStore
+    module.Trainer = Trainer
+    module.counter = counter
+    sys.modules["agentlightning"] = module
+
+def import_app(workdir: str):
+    """벤치마크용 설정으로 main 불러오기 (파일 쓰기는 임시 디렉터리, 학습 작업은 실행되지 않음)"""
+    os.environ.setdefault("TRAINING_STATS_PATH", os.path.join(workdir, "training_stats.json"))
+    os.environ.setdefault("LOCAL_SPAN_STORE_PATH", os.path.join(workdir, "span_store.db"))
+    os.environ.setdefault("TRAINING_DEBOUNCE_SECONDS", "86400")
+    os.environ.setdefault("LEARNED_REFRESH_INTERVAL", "3600")
+    install_agentlightning_stub()
+    sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+    import logging
+    logging.disable(logging.INFO)
+    import main
+    return main
+
+# ============================================
+# 입력 분포
+# ============================================
+
+SUBJECTS = [
+    "a portrait of an old fisherman", "a futuristic city skyline", "a red sports car",
+    "a bowl of ramen", "a mountain lake at dawn", "a cat sleeping on a sofa",
+    "an astronaut riding a horse", "a product shot of a perfume bottle", "a dragon over a castle",
+    "아이가 해변에서 노는 장면", "서울 야경", "제품 사진 흰 배경", "카페 인테리어"
+]
+MODIFIERS = [
+    "cinematic", "soft light", "golden hour", "moody", "detailed", "wide angle", "macro",
+    "high quality", "4k", "film grain", "studio lighting", "camera pan", "slow motion",
+    "natural movement", "consistent style", "dramatic", "pastel colors", "bokeh",
+    "ultra detailed", "professional", "minimal", "vibrant", "the", "with", "and", "in"
+]
+MODELS = {
+    "image": ["midjourney", "dalle", "stable-diffusion", None],
+    "video": ["sora", "runway", "pika", None],
+    "text": ["gpt-4", "claude", None]
+}
+
+def prompt_length(rng: random.Random) -> int:
+    """프롬프트 길이 (단어 수): 대부분 짧고 일부는 매우 긴 로그 정규 분포"""
+    return max(1, min(400, int(rng.lognormvariate(2.8, 0.9))))
+
+def make_prompt(rng: random.Random) -> str:
+    words = [rng.choice(SUBJECTS)]
+    words.extend(rng.choice(MODIFIERS) for _ in range(prompt_length(rng)))
+    return " ".join(words)
+
+def make_prompts(rng: random.Random, count: int) -> List[str]:
+    return [make_prompt(rng) for _ in range(count)]
+
+def make_catalog(rng: random.Random, size: int) -> Dict[str, List[Dict[str, Any]]]:
+    """카테고리별 size개 템플릿으로 이루어진 합성 카탈로그
+
+    실제 카탈로그처럼 대부분의 단어는 템플릿마다 다르고 일부만 일반적인 수식어와 겹친다.
+    """
+    vocabulary = MODIFIERS + [f"style{i}" for i in range(max(100, size))]
+    catalog: Dict[str, List[Dict[str, Any]]] = {}
+    for category in ("image", "video", "text"):
+        templates = []
+        for i in range(size):
+            name = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3)))
+            body = ", ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12)))
+            templates.append({
+                "name": f"{name} {i}",
+                "template": f"{{subject}}, {body}",
+                "score": round(rng.uniform(0.5, 0.95), 3),
+                "reason": f"{category} 합성 템플릿 {i}"
+            })
+        catalog[category] = templates
+    return catalog
+
+# ============================================
+# 측정
+# ============================================
+
+def summarize(latencies_ns: List[int], elapsed_s: float, operations: int) -> Dict[str, float]:
+    """지연 분포 요약 (밀리초)"""
+    ordered = sorted(latencies_ns)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index] / 1e6
+
+    return {
+        "operations": operations,
+        "ops_per_sec": round(operations / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) / 1e6, 4),
+        "p50_ms": round(percentile(50), 4),
+        "p90_ms": round(percentile(90), 4),
+        "p99_ms": round(percentile(99), 4),
+        "max_ms": round(ordered[-1] / 1e6, 4)
+    }
+
+def measure(func: Callable[[Any], Any], inputs: List[Any], warmup: int = 50) -> Dict[str, float]:
+    """입력마다 func를 호출하여 처리량/지연 측정"""
+    for item in inputs[:warmup]:
+        func(item)
+    latencies: List[int] = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for item in inputs:
+        t0 = clock()
+        func(item)
+        latencies.append(clock() - t0)
+    return summarize(latencies, (clock() - started) / 1e9, len(inputs))
+
+async def measure_async(
+    func: Callable[[Any], Any],
+    inputs: List[Any],
+    concurrency: int = 1,
+    warmup: int = 20
+) -> Dict[str, float]:
+    """코루틴 함수를 concurrency개씩 동시에 호출하여 처리량/지연 측정"""
+    for item in inputs[:warmup]:
+        await func(item)
+    latencies: List[int] = []
+    clock = time.perf_counter_ns
+
+    async def timed(item: Any) -> None:
+        t0 = clock()
+        await func(item)
+        latencies.append(clock() - t0)
+
+    started = clock()
+    for start in range(0, len(inputs), concurrency):
+        await asyncio.gather(*(timed(item) for item in inputs[start:start + concurrency]))
+    return summarize(latencies, (clock() - started) / 1e9, len(inputs))
+
+# ============================================
+# 벤치마크 케이스
+# ============================================
+
+def run_function_benchmarks(main, rng: random.Random, scale: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    count = 2000 * scale
+
+    for category, func in (
+        ("image", main.optimize_image_prompt),
+        ("video", main.optimize_video_prompt),
+        ("text", main.optimize_text_prompt)
+    ):
+        inputs = [(prompt, rng.choice(MODELS[category])) for prompt in make_prompts(rng, count)]
+        results[f"optimize_{category}_prompt"] = measure(lambda item, f=func: f(item[0], item[1], {}), inputs)
+
+    # 학습 키워드가 많은 스냅샷 항목 (인덱스는 스냅샷 생성 시 한 번만 만든다)
+    # 다른 케이스의 입력이 바뀌지 않도록 별도 난수 생성기를 사용한다
+    learned_rng = random.Random(SEED + 17)
+    image_inputs = [(prompt, learned_rng.choice(MODELS["image"])) for prompt in make_prompts(learned_rng, count // 4)]
+    for size in (1000, 5000):
+        vocabulary = [
+            {"keyword": f"{learned_rng.choice(MODIFIERS)} {index}", "reward": learned_rng.random()}
+            for index in range(size)
+        ]
+        learned = {"learned_keywords": main.LearnedKeywords(vocabulary, size)}
+        results[f"optimize_image_prompt_learned_{size}"] = measure(
+            lambda item, entry=learned: main.optimize_image_prompt(item[0], item[1], {}, entry), image_inputs
+        )
+
+    queries = [
+        (make_prompt(rng)[:rng.choice((10, 40, 200))], rng.choice(("image", "video", "text")))
+        for _ in range(count)
+    ]
+    from template_catalog import TemplateCatalog
+    from template_index import TemplateIndex
+    original_catalog = main.template_catalog.current
+    try:
+        for size in (10, 1000, 5000):
+            main.template_catalog.swap(TemplateCatalog(
+                version=f"bench-{size}", index=TemplateIndex(make_catalog(rng, size)),
+                source=None, files=(), loaded_at=time.time()
+            ))
+            results[f"recommend_templates_catalog_{size}"] = measure(
+                lambda item: main.recommend_templates(item[0], item[1]), queries
+            )
+    finally:
+        main.template_catalog.swap(original_catalog)
+
+    feedback_inputs = [
+        (
+            rng.uniform(0, 100),
+            rng.choice((None, 1, 2, 3, 4, 5)),
+            rng.choice((None, {"satisfied": True}, {"used_result": True, "satisfied": True}, {"disappointed": True}))
+        )
+        for _ in range(count * 5)
+    ]
+    results["calculate_reward_from_feedback"] = measure(
+        lambda item: main.calculate_reward_from_feedback(item[0], item[1], item[2]), feedback_inputs
+    )
+
+    # 같은 입력 1000개를 배열로 한 번에 계산
+    batches = []
+    for start in range(0, len(feedback_inputs) - 999, 1000):
+        chunk = feedback_inputs[start:start + 1000]
+        batches.append((
+            [score for score, _, _ in chunk],
+            [float("nan") if rating is None else rating for _, rating, _ in chunk],
+            [bool(feedback and feedback.get("satisfied")) for _, _, feedback in chunk],
+            [bool(feedback and feedback.get("used_result")) for _, _, feedback in chunk],
+            [bool(feedback and feedback.get("disappointed")) for _, _, feedback in chunk]
+        ))
+    results["calculate_rewards_from_feedback_batch_1000"] = measure(
+        lambda item: main.calculate_rewards_from_feedback(*item), batches, warmup=2
+    )
+    return results
+
+async def run_http_benchmarks(main, rng: random.Random, scale: int) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    results: Dict[str, Dict[str, float]] = {}
+    count = 500 * scale
+
+    async with main.lifespan(main.app):
+        # Agent Lightning은 백그라운드에서 초기화되므로 /feedback 측정 전에 완료를 기다린다
+        while main.agent_lightning_init["state"] in ("pending", "initializing"):
+            await asyncio.sleep(0.01)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def post(path: str, payload: Dict[str, Any]) -> None:
+                response = await client.post(path, json=payload)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path} -> {response.status_code}: {response.text[:200]}")
+
+            # 캐시를 거치지 않도록 요청마다 고유한 프롬프트 사용
+            optimize_requests = []
+            for i in range(count):
+                category = rng.choice(("image", "video", "text"))
+                optimize_requests.append({
+                    "prompt": f"{make_prompt(rng)} #{i}",
+                    "category": category,
+                    "model": rng.choice(MODELS[category])
+                })
+            results["http_optimize"] = await measure_async(lambda p: post("/optimize", p), optimize_requests)
+            results["http_optimize_concurrent_16"] = await measure_async(
+                lambda p: post("/optimize", p),
+                [{**p, "prompt": p["prompt"] + " c"} for p in optimize_requests],
+                concurrency=16
+            )
+            # 같은 요청 반복 (결과 캐시 적중 경로)
+            hot = optimize_requests[:20]
+            results["http_optimize_cached"] = await measure_async(
+                lambda p: post("/optimize", p), [hot[i % len(hot)] for i in range(count)]
+            )
+
+            recommend_requests = [
+                {"user_input": make_prompt(rng)[:80], "category": rng.choice(("image", "video"))}
+                for _ in range(count)
+            ]
+            results["http_recommend_templates"] = await measure_async(
+                lambda p: post("/recommend-templates", p), recommend_requests
+            )
+
+            feedback_requests = [
+                {"task_id": f"task_{i}", "span_id": f"span_{i}", "reward": round(rng.uniform(-1, 1), 3)}
+                for i in range(count)
+            ]
+            results["http_feedback"] = await measure_async(lambda p: post("/feedback", p), feedback_requests)
+
+            feedback_batches = [
+                {"items": [
+                    {
+                        "task_id": f"task_{i}_{j}",
+                        "span_id": f"span_{i}_{j}",
+                        "quality_score": round(rng.uniform(0, 100), 2),
+                        "rating": rng.choice((None, 1, 2, 3, 4, 5)),
+                        "satisfied": rng.random() < 0.5,
+                        "used_result": rng.random() < 0.3
+                    }
+                    for j in range(1000)
+                ]}
+                for i in range(max(10, count // 50))
+            ]
+            results["http_feedback_batch_1000"] = await measure_async(
+                lambda p: post("/feedback/batch", p), feedback_batches, warmup=1
+            )
+    return results
+
+def best_of(runs: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """반복 실행 결과 중 지표별 최선값 (일시적인 잡음으로 인한 오탐을 줄이기 위함)"""
+    merged: Dict[str, Dict[str, float]] = {}
+    for run in runs:
+        for name, metrics in run.items():
+            if name not in merged:
+                merged[name] = dict(metrics)
+                continue
+            best = merged[name]
+            for key, value in metrics.items():
+                if key == "ops_per_sec":
+                    best[key] = max(best[key], value)
+                elif key.endswith("_ms"):
+                    best[key] = min(best[key], value)
+    return merged
+
+# ============================================
+# 기준선 비교
+# ============================================
+
+def compare(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    tail_threshold: float,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS
+) -> List[str]:
+    """기준선 대비 회귀 목록 (처리량 감소, 중앙값/꼬리 지연 증가)"""
+    regressions = []
+    for name, metrics in sorted(current.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if reference["ops_per_sec"] and metrics["ops_per_sec"] < reference["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: 처리량 {metrics['ops_per_sec']:.1f} ops/s < 기준 {reference['ops_per_sec']:.1f} (허용 -{threshold:.0%})"
+            )
+        for key, allowed in (("p50_ms", threshold), ("p99_ms", tail_threshold)):
+            limit = max(reference[key] * (1 + allowed), reference[key] + min_delta_ms)
+            if reference[key] and metrics[key] > limit:
+                regressions.append(
+                    f"{name}: {key} {metrics[key]:.4f}ms > 기준 {reference[key]:.4f}ms (허용 +{allowed:.0%})"
+                )
+    return regressions
+
+def print_table(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    header = f"{'benchmark':<40} {'ops/s':>12} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        delta = ""
+        if reference and reference["ops_per_sec"]:
+            delta = f"{metrics['ops_per_sec'] / reference['ops_per_sec'] - 1:+.1%}"
+        print(
+            f"{name:<40} {metrics['ops_per_sec']:>12.1f} {metrics['p50_ms']:>10.4f} "
+            f"{metrics['p90_ms']:>10.4f} {metrics['p99_ms']:>10.4f} {delta:>9}"
+        )
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format_version") != BASELINE_FORMAT_VERSION:
+        print(f"⚠️ 기준선 형식이 달라 비교하지 않습니다: {path}")
+        return {}
+    return data.get("benchmarks", {})
+
+def write_results(path: str, results: Dict[str, Dict[str, float]], scale: int) -> None:
+    data = {
+        "format_version": BASELINE_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "benchmarks": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Agent Lightning 최적화 서버 벤치마크")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="기준선 JSON 경로")
+    parser.add_argument("--update-baseline", action="store_true", help="현재 결과를 기준선으로 저장")
+    parser.add_argument("--output", help="현재 결과를 저장할 JSON 경로")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="처리량/p50 허용 저하 비율")
+    parser.add_argument("--tail-threshold", type=float, default=DEFAULT_TAIL_THRESHOLD, help="p99 허용 증가 비율")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="무시할 지연 증가 (밀리초)")
+    parser.add_argument("--scale", type=int, default=1, help="반복 횟수 배율")
+    parser.add_argument("--repeat", type=int, default=3, help="전체 실행 횟수 (지표별 최선값 사용)")
+    parser.add_argument("--quick", action="store_true", help="함수 벤치마크만 실행 (HTTP 제외)")
+    parser.add_argument("--filter", help="이름에 이 문자열이 포함된 벤치마크만 보고/비교")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="agl-bench-") as workdir:
+        app_module = import_app(workdir)
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            rng = random.Random(SEED)
+            run = run_function_benchmarks(app_module, rng, args.scale)
+            if not args.quick:
+                run.update(asyncio.run(run_http_benchmarks(app_module, rng, args.scale)))
+            runs.append(run)
+        results = best_of(runs)
+
+    if args.filter:
+        results = {name: metrics for name, metrics in results.items() if args.filter in name}
+
+    baseline = load_baseline(args.baseline)
+    print_table(results, baseline)
+
+    if args.output:
+        write_results(args.output, results, args.scale)
+    if args.update_baseline:
+        write_results(args.baseline, {**baseline, **results}, args.scale)
+        print(f"✅ 기준선 저장: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("⚠️ 기준선이 없습니다. --update-baseline으로 먼저 생성하세요.")
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.tail_threshold, args.min_delta_ms)
+    if regressions:
+        print("\n❌ 성능 회귀:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ 기준선 대비 회귀 없음")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
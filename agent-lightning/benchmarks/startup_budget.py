@@ -0,0 +1,126 @@
+"""
+시작 시간 예산 검사
+
+새 인터프리터에서 main을 불러오는 시간과 첫 /optimize 응답까지의 시간을 측정하여
+예산을 넘으면 종료 코드 1을 반환한다. agentlightning은 저장소 연결이 느린 스텁으로 대체되어,
+저장소 초기화가 첫 요청을 막지 않는지도 함께 확인한다.
+
+사용법 (agent-lightning 디렉터리에서):
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --import-budget 1.0 --first-request-budget 1.5 --store-delay 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "2.0"))
+DEFAULT_FIRST_REQUEST_BUDGET = float(os.getenv("STARTUP_FIRST_REQUEST_BUDGET_SECONDS", "3.0"))
+
+# 자식 인터프리터에서 실행되는 측정 코드
+PROBE = r"""
+import asyncio, json, sys, time, types
+started = time.perf_counter()
+
+store_delay = float(sys.argv[1])
+stub = types.ModuleType("agentlightning")
+
+class LightningStore:
+    def __init__(self, store_url=""):
+        time.sleep(store_delay)
+
+class Trainer:
+    def __init__(self, store=None):
+        pass
+
+stub.LightningStore = LightningStore
+stub.Trainer = Trainer
+stub.emit_span = lambda **kwargs: types.SimpleNamespace(span_id="stub")
+stub.emit_reward = lambda **kwargs: None
+sys.modules["agentlightning"] = stub
+
+import logging
+logging.disable(logging.WARNING)
+import main
+imported = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            ready = await client.get("/health/ready")
+            response = await client.post("/optimize", json={"prompt": "a cat", "category": "image"})
+            return ready.status_code, response.status_code, main.agent_lightning_init["state"]
+
+ready_status, optimize_status, init_state = asyncio.run(first_request())
+finished = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "first_request_seconds": finished - started,
+    "ready_status": ready_status,
+    "optimize_status": optimize_status,
+    "init_state_at_first_request": init_state
+}))
+"""
+
+def measure(store_delay: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="agl-startup-") as workdir:
+        env = {
+            **os.environ,
+            "TRAINING_STATS_PATH": os.path.join(workdir, "training_stats.json"),
+            "LOCAL_SPAN_STORE_PATH": os.path.join(workdir, "span_store.db"),
+            "WARM_STATE_PATH": os.path.join(workdir, "warm_state.bin"),
+            "PYTHONDONTWRITEBYTECODE": "1"
+        }
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE, str(store_delay)],
+            cwd=os.path.dirname(BENCHMARK_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"측정 실패:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="시작 시간 예산 검사")
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET, help="main 불러오기 예산 (초)")
+    parser.add_argument("--first-request-budget", type=float, default=DEFAULT_FIRST_REQUEST_BUDGET, help="첫 응답까지 예산 (초)")
+    parser.add_argument("--store-delay", type=float, default=5.0, help="스텁 저장소 연결 지연 (초)")
+    parser.add_argument("--runs", type=int, default=3, help="측정 횟수 (최솟값 사용)")
+    args = parser.parse_args(argv)
+
+    samples = [measure(args.store_delay) for _ in range(max(1, args.runs))]
+    import_seconds = min(sample["import_seconds"] for sample in samples)
+    first_request_seconds = min(sample["first_request_seconds"] for sample in samples)
+    print(f"main 불러오기: {import_seconds:.3f}s (예산 {args.import_budget:.3f}s)")
+    print(f"첫 /optimize 응답: {first_request_seconds:.3f}s (예산 {args.first_request_budget:.3f}s, 저장소 지연 {args.store_delay:.1f}s)")
+
+    failures = []
+    if import_seconds > args.import_budget:
+        failures.append("main 불러오기 시간이 예산을 초과했습니다")
+    if first_request_seconds > args.first_request_budget:
+        failures.append("첫 응답까지의 시간이 예산을 초과했습니다")
+    for sample in samples:
+        if sample["ready_status"] != 200 or sample["optimize_status"] != 200:
+            failures.append(f"시작 직후 요청 실패: ready={sample['ready_status']}, optimize={sample['optimize_status']}")
+            break
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ 시작 시간 예산 이내")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,93 @@
+"""
+프로세스 역할별 웜 상태 섹션 검사
+
+새 인터프리터에서 main을 단일 프로세스 역할로 불러온 뒤 run_multi_worker처럼 역할을 owner로 바꾸고,
+소유자가 결과 캐시/템플릿 카탈로그 섹션을 등록하거나 기록하지 않는지 확인한다.
+단일 프로세스 모드에서는 세 섹션이 모두 등록되는지도 함께 확인한다. 실패하면 종료 코드 1을 반환한다.
+
+사용법 (agent-lightning 디렉터리에서):
+    python benchmarks/warm_state_roles.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 자식 인터프리터에서 실행되는 검사 코드 (argv[1]: 전환할 역할)
+PROBE = r"""
+import json, logging, sys
+logging.disable(logging.WARNING)
+import main
+from warm_state import read_warm_state
+
+imported_role = main.PROCESS_ROLE
+# run_multi_worker와 같이 불러온 뒤에 역할을 정한다
+main.PROCESS_ROLE = sys.argv[1]
+main.configure_warm_state_sections()
+main.restore_warm_state()
+status = main.warm_state_status()
+saved = main.warm_state.save()
+_, stored = read_warm_state(main.WARM_STATE_PATH)
+print(json.dumps({
+    "imported_role": imported_role,
+    "sections": status["sections"],
+    "unmanaged_sections": status["unmanaged_sections"],
+    "saved": saved["saved"],
+    "stored_sections": sorted(stored)
+}))
+"""
+
+EXPECTED = {
+    "owner": ["learned_snapshot"],
+    "single": ["learned_snapshot", "result_cache", "template_catalog"]
+}
+
+def probe(role: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="agl-warm-roles-") as workdir:
+        env = {
+            **os.environ,
+            "AGL_PROCESS_ROLE": "single",
+            "TRAINING_STATS_PATH": os.path.join(workdir, "training_stats.json"),
+            "LOCAL_SPAN_STORE_PATH": os.path.join(workdir, "span_store.db"),
+            "WARM_STATE_PATH": os.path.join(workdir, "warm_state.bin"),
+            "PYTHONDONTWRITEBYTECODE": "1"
+        }
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE, role],
+            cwd=os.path.dirname(BENCHMARK_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"검사 실패 ({role}):\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main_cli() -> int:
+    failures = []
+    for role, expected in EXPECTED.items():
+        result = probe(role)
+        print(f"{role}: sections={result['sections']}, stored={result['stored_sections']}")
+        if result["imported_role"] != "single":
+            failures.append(f"{role}: 단일 프로세스 역할로 불러오지 않았습니다 ({result['imported_role']})")
+        if result["sections"] != expected:
+            failures.append(f"{role}: 등록된 섹션 {result['sections']} != {expected}")
+        if not set(result["stored_sections"]) <= set(expected):
+            failures.append(f"{role}: 기록된 섹션 {result['stored_sections']}에 관리하지 않는 섹션이 있습니다")
+        if role == "owner" and sorted(result["unmanaged_sections"]) != ["result_cache", "template_catalog"]:
+            failures.append(f"owner: unmanaged_sections {result['unmanaged_sections']}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ 역할별 웜 상태 섹션 정상")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,263 @@
+"""
+회로 차단기 (circuit breaker)
+저장소/agentlightning/소유자 프로세스 호출처럼 장애가 나면 느려지거나 계속 실패하는 백엔드 작업마다 하나씩 두고,
+연속 실패(또는 느린 호출)가 기준을 넘으면 일정 시간 동안 호출하지 않고 바로 건너뛴다(open).
+시간이 지나면 제한된 수의 시험 호출만 통과시키고(half_open), 성공하면 다시 정상(closed)으로 돌아간다.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """회로가 열려 있어 호출하지 않음"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"회로 차단 중: {name} ({retry_after:.1f}초 후 재시도)")
+        self.name = name
+        self.retry_after = retry_after
+
+class CallTimeoutError(TimeoutError):
+    """호출이 call_timeout 안에 끝나지 않음 (호출은 백그라운드 스레드에서 계속되며 결과는 버린다)"""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"호출 시간 초과: {name} ({timeout:.1f}초)")
+        self.name = name
+        self.timeout = timeout
+
+class _CallRunner:
+    """시간 제한 호출용 데몬 스레드 풀
+
+    유휴 스레드를 재사용하고, 없으면 새로 만든다. 시간 초과된 호출의 스레드는 호출이 실제로 끝난 뒤에야
+    풀로 돌아오므로 멈춘 백엔드가 다른 호출을 막지 않는다. 유휴 스레드는 max_idle개까지만 남긴다.
+    """
+
+    def __init__(self, name: str, max_idle: int = 4):
+        self.name = name
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle: List["queue.SimpleQueue[Any]"] = []
+
+    def run(self, fn: Callable[[], T], timeout: float) -> T:
+        with self._lock:
+            inbox = self._idle.pop() if self._idle else None
+        if inbox is None:
+            inbox = queue.SimpleQueue()
+            threading.Thread(target=self._work, args=(inbox,), name=f"breaker-{self.name}", daemon=True).start()
+        outcome: Dict[str, Any] = {}
+        done = threading.Event()
+        inbox.put((fn, outcome, done))
+        if not done.wait(timeout):
+            raise CallTimeoutError(self.name, timeout)
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _work(self, inbox: "queue.SimpleQueue[Any]") -> None:
+        while True:
+            fn, outcome, done = inbox.get()
+            try:
+                outcome["result"] = fn()
+            except BaseException as e:
+                outcome["error"] = e
+            done.set()
+            with self._lock:
+                if len(self._idle) >= self.max_idle:
+                    return
+                self._idle.append(inbox)
+
+class CircuitBreaker:
+    """백엔드 작업 하나의 회로 차단기
+
+    failure_threshold번 연속 실패하면 reset_timeout 동안 열린다. slow_call_seconds > 0 이면
+    그보다 오래 걸린 호출은 성공했더라도 실패로 센다 (멈춘 저장소가 요청마다 지연을 더하지 않도록).
+    call_timeout > 0 이면 call()은 그 시간까지만 기다리고 CallTimeoutError를 내며 실패로 센다
+    (응답하지 않는 백엔드도 회로를 열 수 있도록, 호출 자체는 백그라운드 스레드에서 끝날 때까지 계속된다).
+    열린 뒤에는 half_open_max_calls개의 시험 호출이 모두 성공해야 닫히고, 하나라도 실패하면 다시 열린다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        slow_call_seconds: float = 0.0,
+        call_timeout: float = 0.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.slow_call_seconds = slow_call_seconds
+        self.call_timeout = call_timeout
+        self._runner = _CallRunner(name) if call_timeout > 0 else None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._probes = 0
+        self._probe_successes = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.opened = 0
+        self.last_error: Optional[str] = None
+        self.last_opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """현재 상태 (열린 지 reset_timeout이 지났으면 half_open으로 보고한다)"""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """호출해도 되는지 확인 (half_open이면 시험 호출 자리를 차지한다, 허용했으면 반드시 결과를 기록해야 한다)"""
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._probes = self._probe_successes = 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._probes += 1
+            self.calls += 1
+            return True
+
+    def retry_after(self) -> float:
+        """다시 호출을 시도할 수 있을 때까지 남은 시간 (초)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._consecutive_failures = 0
+        self.opened += 1
+        self.last_opened_at = time.time()
+
+    def record_success(self, duration: float = 0.0) -> None:
+        """호출 성공 기록 (slow_call_seconds보다 오래 걸렸으면 실패로 기록)"""
+        if self.slow_call_seconds > 0 and duration >= self.slow_call_seconds:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure(f"느린 호출: {duration:.3f}s")
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_max_calls:
+                    self._state = CLOSED
+            self._consecutive_failures = 0
+
+    def record_failure(self, error: Optional[str] = None) -> None:
+        """호출 실패 기록"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            if self._state == OPEN:
+                return
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def cancel(self) -> None:
+        """allow()로 허용받은 호출을 결과 없이 끝냄 (예: 호출 쪽 사정으로 중단, half_open 시험 호출 자리만 돌려준다)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """회로 차단기를 거쳐 호출 (열려 있으면 CircuitOpenError, 시간 초과는 CallTimeoutError, 호출 예외는 그대로 전달)"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        started = time.perf_counter()
+        try:
+            if self._runner is not None:
+                result = self._runner.run(lambda: fn(*args, **kwargs), self.call_timeout)
+            else:
+                result = fn(*args, **kwargs)
+        except CallTimeoutError as e:
+            with self._lock:
+                self.timeouts += 1
+            self.record_failure(str(e))
+            raise
+        except Exception as e:
+            self.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        self.record_success(time.perf_counter() - started)
+        return result
+
+    def reset(self) -> None:
+        """강제로 닫힘 상태로 되돌림"""
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+
+    def status(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "calls": self.calls,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "last_opened_at": self.last_opened_at,
+                "last_error": self.last_error,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "slow_call_seconds": self.slow_call_seconds,
+                "call_timeout": self.call_timeout
+            }
+
+class CircuitBreakerRegistry:
+    """백엔드 작업 이름별 회로 차단기 (처음 요청될 때 공통 설정으로 만든다)"""
+
+    def __init__(self, **defaults: Any):
+        self.defaults = defaults
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str, **overrides: Any) -> CircuitBreaker:
+        """이름의 회로 차단기 (없으면 생성, overrides는 생성할 때만 적용)"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name, **{**self.defaults, **overrides})
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        """이름 -> 상태"""
+        return {name: breaker.state for name, breaker in list(self._breakers.items())}
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """이름 -> 상세 상태"""
+        return {name: breaker.status() for name, breaker in list(self._breakers.items())}
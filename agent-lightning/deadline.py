@@ -0,0 +1,80 @@
+"""
+요청 기한 (deadline) 전파
+요청마다 처리 기한을 contextvar에 두고, 저장소/소유자 프로세스처럼 느려질 수 있는 단계는
+남은 시간을 확인해 부족하면 건너뛰거나 남은 시간만큼만 기다린다.
+contextvar는 asyncio.to_thread와 스레드 풀 실행에도 복사되므로 별도로 인자를 넘기지 않아도 된다.
+
+기한은 클라이언트가 X-AGL-Deadline-Ms 헤더(남은 시간, 밀리초)로 보내거나 서버 기본값을 쓴다.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+DEADLINE_HEADER = "x-agl-deadline-ms"
+
+# 처리 기한 (time.monotonic 기준, None이면 기한 없음)
+_deadline: ContextVar[Optional[float]] = ContextVar("agl_deadline", default=None)
+
+def remaining() -> Optional[float]:
+    """남은 시간 (초, 기한이 없으면 None, 지났으면 0)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def has_budget(seconds: float) -> bool:
+    """남은 시간이 seconds 이상인지 (기한이 없으면 True)"""
+    left = remaining()
+    return left is None or left >= seconds
+
+def bounded_timeout(timeout: float) -> float:
+    """timeout과 남은 시간 중 작은 값 (기한이 없으면 timeout)"""
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """seconds 뒤를 기한으로 하는 구간 (바깥 기한이 더 이르면 바깥 기한 유지, None이면 바꾸지 않음)"""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + max(0.0, seconds)
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+class DeadlineMiddleware:
+    """요청 기한 설정 ASGI 미들웨어
+
+    X-AGL-Deadline-Ms 헤더가 있으면 그 값을(max_seconds로 제한), 없으면 default_seconds를 기한으로 한다.
+    둘 다 없으면(0) 기한을 두지 않는다.
+    """
+
+    def __init__(self, app, default_seconds: float = 0.0, max_seconds: float = 0.0):
+        self.app = app
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+
+    def _budget(self, scope) -> Optional[float]:
+        for name, value in scope.get("headers", ()):
+            if name == DEADLINE_HEADER.encode("ascii"):
+                try:
+                    seconds = float(value) / 1000
+                except ValueError:
+                    break
+                if self.max_seconds > 0:
+                    seconds = min(seconds, self.max_seconds)
+                return max(0.0, seconds)
+        return self.default_seconds if self.default_seconds > 0 else None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline_scope(self._budget(scope)):
+            await self.app(scope, receive, send)
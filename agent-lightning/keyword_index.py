@@ -0,0 +1,161 @@
+"""
+학습된 키워드 인덱스
+학습 스냅샷이 만들어질 때 (category, model) 별 학습 키워드를 보상 순으로 정렬/상한 적용하고
+부분 문자열 검색용 Aho-Corasick 오토마톤을 한 번만 만들어 둔다.
+프롬프트에 키워드를 적용할 때는 프롬프트를 한 번만 훑으므로 키워드 수와 무관하게 프롬프트 길이에 비례한다.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# 키워드가 이 개수 이하이면 오토마톤 대신 문자열 검색을 사용한다 (작은 어휘에서는 더 빠르다)
+AUTOMATON_MIN_KEYWORDS = 32
+
+class KeywordAutomaton:
+    """여러 키워드의 부분 문자열 일치를 한 번에 찾는 Aho-Corasick 오토마톤"""
+
+    def __init__(self, keywords: Sequence[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        outputs: List[List[int]] = [[]]
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword_id)
+
+        # 너비 우선으로 실패 링크를 만들고 실패 링크의 출력을 합친다
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+        self._output = [tuple(ids) for ids in outputs]
+
+    def find(self, text: str) -> Set[int]:
+        """text에 부분 문자열로 나타나는 키워드 ID 집합"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+def rank_keywords(raw: Iterable[Any], max_keywords: Optional[int] = None) -> Tuple[Tuple[str, ...], Tuple[Optional[float], ...]]:
+    """학습 키워드를 보상 내림차순으로 정렬하고 상한 적용
+
+    항목은 문자열 또는 {"keyword": ..., "reward": ...} 형식이다. 보상이 없는 키워드는 보상이 있는
+    키워드 뒤에 원래 순서대로 놓이며, 같은 키워드(대소문자 무시)는 처음 것만 남는다.
+    숫자 키워드는 문자열로 바꾸고, 그 밖의 잘못된 키워드는 건너뛰며 숫자가 아닌 보상은 없는 것으로 본다.
+    """
+    entries: List[Tuple[str, Optional[float]]] = []
+    seen: Set[str] = set()
+    for item in raw:
+        if isinstance(item, dict):
+            keyword, reward = item.get("keyword"), item.get("reward")
+            try:
+                reward = float(reward) if reward is not None else None
+            except (TypeError, ValueError):
+                reward = None
+        else:
+            keyword, reward = item, None
+        if isinstance(keyword, (int, float)) and not isinstance(keyword, bool):
+            keyword = str(keyword)
+        if not isinstance(keyword, str) or not keyword or keyword.lower() in seen:
+            continue
+        seen.add(keyword.lower())
+        entries.append((keyword, reward))
+    ranked = sorted(
+        range(len(entries)),
+        key=lambda i: (entries[i][1] is None, -(entries[i][1] or 0.0), i)
+    )
+    if max_keywords is not None:
+        ranked = ranked[:max(0, max_keywords)]
+    return tuple(entries[i][0] for i in ranked), tuple(entries[i][1] for i in ranked)
+
+class LearnedKeywords(tuple):
+    """보상 순으로 정렬된 학습 키워드 (tuple로 동작하며 적용용 인덱스를 함께 가진다)
+
+    스냅샷 생성 시 한 번만 만들어지고 이후에는 변경되지 않는다.
+    """
+
+    def __new__(cls, raw: Iterable[Any] = (), max_keywords: Optional[int] = None):
+        keywords, rewards = rank_keywords(raw, max_keywords)
+        instance = super().__new__(cls, keywords)
+        instance.rewards = rewards
+        instance._lowered = tuple(keyword.lower() for keyword in keywords)
+        instance._automaton = KeywordAutomaton(instance._lowered) if len(keywords) > AUTOMATON_MIN_KEYWORDS else None
+        # 키워드 i를 포함하는 더 높은 순위 키워드 목록 (그 키워드가 추가되면 i는 이미 들어 있는 것으로 본다)
+        instance._contained_in = instance._containment()
+        return instance
+
+    # 보상만 바뀐 스냅샷도 새 스냅샷으로 교체/공유되도록 같음 비교에 보상을 포함한다
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LearnedKeywords):
+            return tuple.__eq__(self, other) and self.rewards == other.rewards
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self) -> int:
+        return hash((tuple(self), self.rewards))
+
+    def to_plain(self) -> List[Dict[str, Any]]:
+        """보상과 함께 직렬화 가능한 형태로 ({"keyword", "reward"} 목록, 다시 넣으면 같은 순위가 된다)"""
+        return [{"keyword": keyword, "reward": reward} for keyword, reward in zip(self, self.rewards)]
+
+    def _containment(self) -> Tuple[Tuple[int, ...], ...]:
+        contained_in: List[List[int]] = [[] for _ in self]
+        if self._automaton is not None:
+            for outer, keyword in enumerate(self._lowered):
+                for inner in self._automaton.find(keyword):
+                    if inner > outer:
+                        contained_in[inner].append(outer)
+        else:
+            for inner, keyword in enumerate(self._lowered):
+                contained_in[inner] = [outer for outer in range(inner) if keyword in self._lowered[outer]]
+        return tuple(tuple(outers) for outers in contained_in)
+
+    def apply(self, text: str, limit: Optional[int] = None) -> Tuple[str, List[str]]:
+        """text에 없는 키워드를 순위대로 최대 limit개 덧붙임 ((결과 문자열, 추가된 키워드) 반환)
+
+        일치 여부는 대소문자를 무시한 부분 문자열 기준이며, 앞서 추가된 키워드에 포함된 키워드도 건너뛴다.
+        """
+        if not self or limit == 0:
+            return text, []
+        lowered = text.lower()
+        if self._automaton is not None:
+            present = self._automaton.find(lowered)
+        else:
+            present = {index for index, keyword in enumerate(self._lowered) if keyword in lowered}
+
+        added_ids: Set[int] = set()
+        parts = [text]
+        for index, keyword in enumerate(self):
+            if index in present or any(outer in added_ids for outer in self._contained_in[index]):
+                continue
+            added_ids.add(index)
+            parts.append(keyword)
+            if limit is not None and len(added_ids) >= limit:
+                break
+        if len(parts) == 1:
+            return text, []
+        return ", ".join(parts), parts[1:]
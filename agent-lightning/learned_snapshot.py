@@ -0,0 +1,213 @@
+"""
+학습된 최적화 스냅샷
+(category, model) 별 학습된 키워드/패턴/신뢰도를 변경 불가능한 메모리 스냅샷으로 유지한다.
+백그라운드 스레드가 저장소에서 새 스냅샷을 만들어 참조를 통째로 교체하므로,
+요청 처리 경로에서는 잠금 없이 현재 스냅샷을 읽기만 한다.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from keyword_index import LearnedKeywords
+
+logger = logging.getLogger(__name__)
+
+# 학습 데이터가 없는 (category, model)에 대한 조회 결과
+EMPTY_LEARNED: Mapping[str, Any] = MappingProxyType({})
+
+# 로더가 반환하는 형식: (category, model 또는 "any") -> {"learned_keywords", "learned_patterns", "confidence"}
+LearnedEntries = Mapping[Tuple[str, str], Mapping[str, Any]]
+
+def _freeze_entry(entry: Mapping[str, Any], max_keywords: Optional[int] = None) -> Mapping[str, Any]:
+    """학습 항목을 읽기 전용 형태로 정규화 (키워드는 보상 순 정렬/상한 적용 후 인덱스 생성)"""
+    return MappingProxyType({
+        "learned_keywords": LearnedKeywords(entry.get("learned_keywords", ()), max_keywords),
+        "learned_patterns": tuple(entry.get("learned_patterns", ())),
+        "confidence": float(entry.get("confidence", 0.0)),
+        **{key: value for key, value in entry.items()
+           if key not in ("learned_keywords", "learned_patterns", "confidence")}
+    })
+
+@dataclass(frozen=True)
+class LearnedSnapshot:
+    """학습된 최적화 스냅샷 (생성 후 변경되지 않는다)"""
+    version: int
+    created_at: float
+    entries: Mapping[Tuple[str, str], Mapping[str, Any]] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def build(
+        cls,
+        version: int,
+        entries: LearnedEntries,
+        created_at: Optional[float] = None,
+        max_keywords: Optional[int] = None
+    ) -> "LearnedSnapshot":
+        frozen = {
+            (category, model): _freeze_entry(entry, max_keywords)
+            for (category, model), entry in entries.items()
+        }
+        return cls(
+            version=version,
+            created_at=time.time() if created_at is None else created_at,
+            entries=MappingProxyType(frozen)
+        )
+
+    def lookup(self, category: str, model: Optional[str] = None) -> Mapping[str, Any]:
+        """(category, model) 학습 결과 조회 (모델별 항목이 없으면 카테고리 공통 항목)"""
+        entry = self.entries.get((category, model or "any"))
+        if entry is None and model:
+            entry = self.entries.get((category, "any"))
+        return entry if entry is not None else EMPTY_LEARNED
+
+class LearnedSnapshotManager:
+    """학습 스냅샷 주기적 갱신 및 원자적 교체
+
+    loader는 저장소에서 학습 결과 전체를 읽어 오는 함수로, 갱신 스레드에서만 호출된다.
+    저장소를 아직 사용할 수 없으면 loader가 None을 반환하며, 이때는 (복원된) 현재 스냅샷을 유지한다.
+    내용이 바뀐 경우에만 버전이 올라가므로 버전을 키로 쓰는 캐시가 불필요하게 무효화되지 않는다.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Optional[LearnedEntries]],
+        refresh_interval: float = 60.0,
+        name: str = "learned-snapshot",
+        on_swap: Optional[Callable[["LearnedSnapshot"], None]] = None,
+        max_keywords: Optional[int] = None
+    ):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.name = name
+        # (category, model) 별로 유지할 학습 키워드 수 (보상 상위부터)
+        self.max_keywords = max_keywords
+        # 새 스냅샷으로 교체된 직후 호출 (예: 다중 워커 모드의 공유 스냅샷 파일 기록)
+        self.on_swap = on_swap
+        self.current = LearnedSnapshot.build(version=0, entries={})
+        self.refresh_count = 0
+        self.last_refresh_at: Optional[float] = None
+        self.last_refresh_ms = 0.0
+        self.last_error: Optional[str] = None
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> int:
+        return self.current.version
+
+    def lookup(self, category: str, model: Optional[str] = None) -> Mapping[str, Any]:
+        """현재 스냅샷 조회 (잠금 없음)"""
+        return self.current.lookup(category, model)
+
+    def swap(self, entries: LearnedEntries, version: Optional[int] = None) -> LearnedSnapshot:
+        """새 학습 결과로 스냅샷 교체 (내용이 같으면 현재 스냅샷 유지)
+
+        version을 지정하면 (다른 프로세스가 만든 스냅샷을 따라가는 경우) 그 버전으로 그대로 교체한다.
+        """
+        with self._refresh_lock:
+            previous = self.current
+            if version is not None:
+                if version == previous.version:
+                    return previous
+                candidate = LearnedSnapshot.build(version=version, entries=entries, max_keywords=self.max_keywords)
+            else:
+                candidate = LearnedSnapshot.build(
+                    version=previous.version + 1, entries=entries, max_keywords=self.max_keywords
+                )
+                if candidate.entries == previous.entries:
+                    return previous
+            self.current = candidate
+        if self.on_swap is not None:
+            try:
+                self.on_swap(candidate)
+            except Exception as e:
+                logger.warning(f"⚠️ 학습 스냅샷 교체 후 처리 실패: {e}")
+        return candidate
+
+    def export_state(self) -> Dict[str, Any]:
+        """현재 스냅샷을 JSON 직렬화 가능한 형태로 (학습 키워드는 보상과 함께 기록되어 순위가 유지된다)"""
+        snapshot = self.current
+
+        def plain(value: Any) -> Any:
+            if isinstance(value, LearnedKeywords):
+                return value.to_plain()
+            if isinstance(value, Mapping):
+                return {key: plain(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [plain(item) for item in value]
+            return value
+
+        return {
+            "version": snapshot.version,
+            "entries": [[category, model, plain(entry)] for (category, model), entry in snapshot.entries.items()]
+        }
+
+    def restore_state(self, state: Mapping[str, Any]) -> LearnedSnapshot:
+        """export_state 결과로 스냅샷 교체 (저장 당시 버전 유지)"""
+        entries = {(category, model): entry for category, model, entry in state["entries"]}
+        return self.swap(entries, version=int(state["version"]))
+
+    def refresh(self) -> LearnedSnapshot:
+        """저장소에서 학습 결과를 다시 읽어 스냅샷 교체"""
+        started = time.perf_counter()
+        try:
+            entries = self.loader()
+            snapshot = self.swap(entries) if entries is not None else self.current
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"⚠️ 학습 스냅샷 갱신 실패: {e}")
+            return self.current
+        finally:
+            self.refresh_count += 1
+            self.last_refresh_at = time.time()
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+        return snapshot
+
+    def request_refresh(self) -> None:
+        """즉시 갱신 요청 (예: 학습 완료 직후)"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """갱신 스레드 시작 (시작 직후 한 번 갱신)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """갱신 스레드 종료"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            self.refresh()
+
+    def status(self) -> Dict[str, Any]:
+        """스냅샷 버전 및 경과 시간"""
+        snapshot = self.current
+        return {
+            "version": snapshot.version,
+            "age_seconds": round(time.time() - snapshot.created_at, 3),
+            "entries": len(snapshot.entries),
+            "refresh_interval": self.refresh_interval,
+            "refresh_count": self.refresh_count,
+            "last_refresh_at": self.last_refresh_at,
+            "last_refresh_ms": round(self.last_refresh_ms, 3),
+            "last_error": self.last_error
+        }
@@ -3,14 +3,58 @@ Agent Lightning 프롬프트 최적화 서버
 이미지/동영상 프롬프트의 정확성과 품질을 향상시키는 API 서버
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import ValidationError
+from typing import Optional, List, Dict, Any, Mapping, Tuple, AsyncIterator, Callable, Hashable
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import json
+import math
 import os
+import threading
+import time
+import uuid
+import numpy as np
 from dotenv import load_dotenv
 import logging
 
+from rule_engine import DEFAULT_RULES, RuleEngine
+from schemas import (
+    PromptOptimizationRequest,
+    PromptOptimizationResponse,
+    TemplateRecommendationRequest,
+    TemplateRecommendationResponse,
+    BatchOptimizationRequest,
+    BatchOptimizationItemResult,
+    BatchOptimizationResponse,
+    FeedbackRequest,
+    FeedbackBatchItem,
+    FeedbackBatchRequest,
+    FeedbackBatchItemResult,
+    FeedbackBatchResponse
+)
+from template_catalog import TemplateCatalogManager
+from result_cache import ResultCache, SingleFlight, request_fingerprint
+from span_emitter import BackgroundEmitter, PendingRewards, SpanIdRegistry
+from learned_snapshot import LearnedSnapshot, LearnedSnapshotManager
+from keyword_index import LearnedKeywords
+from training_jobs import TrainingJobRunner, TrainingQueueFull, run_lightning_training
+from training_stats import TrainingStatistics
+from span_store import LocalSpanStore
+from training_export import TrainingExporter
+from metrics import MetricsRegistry, RequestMetricsMiddleware
+from admission import AdmissionClass, AdmissionControlMiddleware, AdmissionController
+from profiling import NO_PROFILE, ProfileStore, RequestProfiler, StackSampler
+from owner_ipc import OwnerCallError, OwnerClient, OwnerServer
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from deadline import DeadlineMiddleware, bounded_timeout, has_budget
+from shared_snapshot import SharedSnapshotFollower, write_snapshot_file
+from warm_state import WarmStateManager
+
 # 환경 변수 로드
 load_dotenv()
 
@@ -18,12 +62,242 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ============================================
+# 프로세스 역할 (다중 워커 모드)
+# ============================================
+
+# WORKERS > 1 이면 이 프로세스가 소유자(owner)가 되어 저장소 쓰기/학습/학습 스냅샷 갱신을 맡고,
+# uvicorn 워커 프로세스(worker)는 요청 처리만 한다. WORKERS=1 이면 한 프로세스가 모두 처리한다(single).
+PROCESS_ROLE = os.getenv("AGL_PROCESS_ROLE", "single")  # single | owner | worker
+WORKERS = int(os.getenv("WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+# 워커 -> 소유자 작업 요청용 Unix 도메인 소켓
+AGL_OWNER_SOCKET = os.getenv("AGL_OWNER_SOCKET", "agl_owner.sock")
+# 소유자가 기록하고 워커가 메모리 매핑으로 읽는 학습 스냅샷 파일
+AGL_SHARED_SNAPSHOT_PATH = os.getenv("AGL_SHARED_SNAPSHOT_PATH", "learned_snapshot.bin")
+# 워커의 공유 스냅샷 파일 변경 확인 주기 (초)
+LEARNED_SHARED_POLL_INTERVAL = float(os.getenv("LEARNED_SHARED_POLL_INTERVAL", "1"))
+
+# 연결이 끊겼을 때 다시 보내도 되는 조회 작업 (emit, submit_training 등 나머지는 소유자가 받았을 수 있으면 다시 보내지 않는다)
+OWNER_IDEMPOTENT_OPERATIONS = (
+    "status", "training_status", "list_jobs", "get_job", "export_status", "warm_state_status"
+)
+
+# 워커 프로세스에서만 사용
+owner_client: Optional[OwnerClient] = (
+    OwnerClient(AGL_OWNER_SOCKET, idempotent=OWNER_IDEMPOTENT_OPERATIONS) if PROCESS_ROLE == "worker" else None
+)
+
+# ============================================
+# 메트릭
+# ============================================
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# 메트릭별 최대 레이블 조합 수 (초과분은 "other"로 합쳐진다)
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "1000"))
+
+metrics_registry = MetricsRegistry()
+http_requests = metrics_registry.counter(
+    "agl_http_requests", "엔드포인트별 HTTP 요청 수", ("endpoint", "method", "status"), METRICS_MAX_SERIES
+)
+http_request_seconds = metrics_registry.histogram(
+    "agl_http_request_duration_seconds", "엔드포인트별 HTTP 요청 처리 시간", ("endpoint", "method"), max_series=METRICS_MAX_SERIES
+)
+optimize_requests = metrics_registry.counter(
+    "agl_optimize_requests", "엔드포인트/카테고리/모델별 최적화 항목 수", ("endpoint", "category", "model"), METRICS_MAX_SERIES
+)
+optimize_seconds = metrics_registry.histogram(
+    "agl_optimize_duration_seconds", "엔드포인트/카테고리/모델별 최적화 시간 (캐시 포함)", ("endpoint", "category", "model"),
+    max_series=METRICS_MAX_SERIES
+)
+stage_seconds = metrics_registry.histogram("agl_stage_duration_seconds", "처리 단계별 소요 시간", ("stage",))
+errors_total = metrics_registry.counter(
+    "agl_errors", "위치/예외 유형별 오류 수", ("where", "exception"), METRICS_MAX_SERIES
+)
+
+# 자주 쓰는 시계열은 미리 받아 두어 요청마다 레이블 조회를 하지 않는다
+STAGE_OPTIMIZE = stage_seconds.labels("optimize")
+STAGE_CACHE_LOOKUP = stage_seconds.labels("cache_lookup")
+STAGE_LEARNED_LOOKUP = stage_seconds.labels("learned_lookup")
+STAGE_EMIT_SPAN = stage_seconds.labels("emit_prompt_span")
+STAGE_EMIT_REWARD = stage_seconds.labels("emit_reward")
+STAGE_SERIALIZE = stage_seconds.labels("serialize")
+
+def record_error(where: str, error: BaseException) -> None:
+    """오류 수 기록"""
+    errors_total.labels(where, type(error).__name__).inc()
+
+# ============================================
+# 수용 제어 (과부하 시 요청 거절)
+# ============================================
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# 제한 대상 엔드포인트 전체의 동시 처리 수 (프로세스/워커당, 클래스 한도의 합보다 작아야 적용된다)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "128"))
+# 거절 응답의 최소 Retry-After (초)
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+def _admission_class(
+    name: str,
+    priority: int,
+    max_in_flight: int,
+    max_queue: int,
+    queue_timeout: float,
+    paths: Tuple[str, ...] = (),
+    prefixes: Tuple[str, ...] = (),
+    methods: Tuple[str, ...] = ()
+) -> AdmissionClass:
+    """클래스 한도는 ADMISSION_<NAME>_MAX_IN_FLIGHT / _MAX_QUEUE / _QUEUE_TIMEOUT 으로 바꿀 수 있다"""
+    env = f"ADMISSION_{name.upper()}"
+    return AdmissionClass(
+        name=name,
+        priority=priority,
+        max_in_flight=int(os.getenv(f"{env}_MAX_IN_FLIGHT", str(max_in_flight))),
+        max_queue=int(os.getenv(f"{env}_MAX_QUEUE", str(max_queue))),
+        queue_timeout=float(os.getenv(f"{env}_QUEUE_TIMEOUT", str(queue_timeout))),
+        paths=paths,
+        prefixes=prefixes,
+        methods=methods
+    )
+
+# 우선순위 순 (대화형 요청 > 일괄 요청 > 학습), 목록에 없는 경로(상태/메트릭 등)는 제한하지 않는다
+# 클래스 한도의 합(112+24+4)은 전체 한도보다 크게 잡아, 여러 클래스가 함께 몰리면 전체 한도가 적용된다
+ADMISSION_CLASSES: Tuple[AdmissionClass, ...] = (
+    _admission_class("interactive", 0, 112, 256, 0.5, paths=("/optimize", "/recommend-templates", "/feedback")),
+    _admission_class("bulk", 1, 24, 16, 2.0, paths=("/optimize/batch", "/optimize/stream", "/feedback/batch")),
+    # 학습 작업을 바꾸는 요청(시작/내보내기/취소)만 제한하고, 상태 조회(GET)는 제한하지 않는다
+    _admission_class("training", 2, 4, 0, 0.0, prefixes=("/training/",), methods=("POST",))
+)
+
+admission_controller = AdmissionController(
+    ADMISSION_CLASSES, max_in_flight=ADMISSION_MAX_IN_FLIGHT, retry_after=ADMISSION_RETRY_AFTER
+)
+if ADMISSION_ENABLED and admission_controller.max_in_flight >= admission_controller.class_capacity:
+    logger.warning(
+        f"⚠️ ADMISSION_MAX_IN_FLIGHT({admission_controller.max_in_flight})가 클래스 한도의 합"
+        f"({admission_controller.class_capacity}) 이상이라 전체 한도가 적용되지 않습니다"
+    )
+
+# ============================================
+# 요청 기한 및 회로 차단기
+# ============================================
+
+# 요청 기한 (X-AGL-Deadline-Ms 헤더가 없을 때의 기본값 / 헤더 값의 상한, 0 이면 없음)
+REQUEST_DEADLINE_DEFAULT_MS = float(os.getenv("REQUEST_DEADLINE_DEFAULT_MS", "0"))
+REQUEST_DEADLINE_MAX_MS = float(os.getenv("REQUEST_DEADLINE_MAX_MS", "0"))
+# 남은 시간이 이보다 적으면 소유자 프로세스 호출을 건너뛴다 (Span/보상 기록 예약은 메모리 대기열이므로 항상 실행)
+DEADLINE_STORE_STAGE_MIN_MS = float(os.getenv("DEADLINE_STORE_STAGE_MIN_MS", "10"))
+
+# 백엔드 작업별 회로 차단기 (연속 실패 또는 느린 호출이 기준을 넘으면 RESET_TIMEOUT 동안 호출하지 않는다)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "30"))
+CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "1"))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "1"))
+# 백엔드 호출 시간 제한 (초, 넘으면 기다리지 않고 실패로 센다, 0 이면 제한 없음)
+CIRCUIT_BREAKER_CALL_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_CALL_TIMEOUT", "5"))
+
+circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=CIRCUIT_BREAKER_RESET_TIMEOUT,
+    half_open_max_calls=CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+    slow_call_seconds=CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+    call_timeout=CIRCUIT_BREAKER_CALL_TIMEOUT
+)
+
+deadline_skipped = metrics_registry.counter("agl_deadline_skipped", "남은 시간 부족으로 건너뛴 단계 수", ("stage",))
+
+def store_stage_allowed(stage: str) -> bool:
+    """소유자 프로세스를 거치는 단계를 실행할 시간이 남았는지 (부족하면 건너뛴 횟수 기록)"""
+    if has_budget(DEADLINE_STORE_STAGE_MIN_MS / 1000):
+        return True
+    deadline_skipped.labels(stage).inc()
+    return False
+
+# ============================================
+# 프로파일링
+# ============================================
+
+# X-AGL-Profile 헤더가 있는 /optimize, /recommend-templates 요청을 cProfile로 기록 (토큰을 지정하면 헤더 값이 같아야 한다)
+PROFILING_HEADER_ENABLED = os.getenv("PROFILING_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_HEADER_TOKEN = os.getenv("PROFILING_HEADER_TOKEN", "")
+# 헤더와 무관하게 기록할 요청 비율 (0 이면 표본 기록 안 함)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+# 프로파일 저장 디렉터리와 보관 개수 (넘으면 오래된 것부터 삭제)
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+# 연속 스택 표본 추출 (flamegraph용 접힌 스택 집계)
+PROFILING_SAMPLER_ENABLED = os.getenv("PROFILING_SAMPLER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_SAMPLER_INTERVAL = float(os.getenv("PROFILING_SAMPLER_INTERVAL", "0.05"))
+PROFILING_SAMPLER_MAX_STACKS = int(os.getenv("PROFILING_SAMPLER_MAX_STACKS", "10000"))
+# 기록된 요청의 응답에 포함되는 프로파일 ID 헤더
+PROFILE_ID_HEADER = "X-AGL-Profile-Id"
+
+request_profiler = RequestProfiler(
+    ProfileStore(PROFILING_DIR, PROFILING_MAX_PROFILES),
+    header_enabled=PROFILING_HEADER_ENABLED,
+    header_token=PROFILING_HEADER_TOKEN,
+    sample_rate=PROFILING_SAMPLE_RATE
+)
+stack_sampler = StackSampler(interval=PROFILING_SAMPLER_INTERVAL, max_stacks=PROFILING_SAMPLER_MAX_STACKS)
+
+# 준비 상태 확인에 Agent Lightning 초기화 완료까지 요구할지 여부 (기본: 요구하지 않음)
+READINESS_REQUIRE_AGENT_LIGHTNING = os.getenv("READINESS_REQUIRE_AGENT_LIGHTNING", "false").lower() in ("1", "true", "yes")
+
+# lifespan 시작 여부 (준비 상태 확인용)
+server_state: Dict[str, Any] = {"started": False}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작/종료 처리
+
+    agentlightning/저장소 초기화는 백그라운드에서 진행되므로 요청은 즉시 처리된다.
+    다중 워커 모드의 워커는 소유자 프로세스를 따르는 서비스만 시작한다.
+    """
+    if PROCESS_ROLE == "worker":
+        await asyncio.to_thread(start_worker_services)
+    else:
+        await asyncio.to_thread(start_owner_services)
+    # 템플릿 카탈로그는 요청을 처리하는 프로세스마다 파일에서 직접 불러온다
+    await asyncio.to_thread(template_catalog.start)
+    if PROFILING_SAMPLER_ENABLED:
+        stack_sampler.start()
+    server_state["started"] = True
+    yield
+    server_state["started"] = False
+    stack_sampler.stop()
+    template_catalog.stop()
+    if PROCESS_ROLE == "worker":
+        await asyncio.to_thread(stop_worker_services)
+    else:
+        await asyncio.to_thread(stop_owner_services)
+
 app = FastAPI(
     title="Agent Lightning Prompt Optimizer",
     description="AI 프롬프트 최적화 및 템플릿 추천 API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# 수용 제어는 메트릭 미들웨어 안쪽에서 동작하므로 거절된 요청도 요청 수/지연에 집계된다
+# (라우팅 전에 거절되므로 메트릭 미들웨어가 라우트 표에서 경로 템플릿을 찾아 endpoint 레이블로 쓴다)
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
+# 요청 기한은 수용 제어 대기 시간을 포함한다
+app.add_middleware(
+    DeadlineMiddleware,
+    default_seconds=REQUEST_DEADLINE_DEFAULT_MS / 1000,
+    max_seconds=REQUEST_DEADLINE_MAX_MS / 1000
 )
 
+# 요청 수/지연 기록 (/metrics 자체는 제외)
+if METRICS_ENABLED:
+    app.add_middleware(
+        RequestMetricsMiddleware,
+        requests=http_requests,
+        duration=http_request_seconds,
+        exclude_paths=("/metrics",)
+    )
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -34,91 +308,163 @@ app.add_middleware(
 )
 
 # ============================================
-# 요청/응답 모델
+# Agent Lightning 통합
 # ============================================
 
-class PromptOptimizationRequest(BaseModel):
-    """프롬프트 최적화 요청"""
-    prompt: str = Field(..., description="원본 프롬프트")
-    category: str = Field(..., description="카테고리: image, video, text")
-    model: Optional[str] = Field(None, description="타겟 모델 (예: midjourney, sora, dalle)")
-    options: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 옵션")
-    user_feedback: Optional[Dict[str, Any]] = Field(None, description="사용자 피드백 (선택적)")
-    task_id: Optional[str] = Field(None, description="작업 ID (Agent Lightning용)")
-
-class PromptOptimizationResponse(BaseModel):
-    """프롬프트 최적화 응답"""
-    original_prompt: str
-    optimized_prompt: str
-    improvements: List[str] = Field(default_factory=list, description="개선 사항 목록")
-    quality_score: float = Field(..., ge=0, le=100, description="품질 점수 (0-100)")
-    confidence: float = Field(..., ge=0, le=1, description="신뢰도 (0-1)")
-    recommendations: List[str] = Field(default_factory=list, description="추천 사항")
-
-class TemplateRecommendationRequest(BaseModel):
-    """템플릿 추천 요청"""
-    user_input: str = Field(..., description="사용자 입력")
-    category: str = Field(..., description="카테고리: image, video, text")
-    model: Optional[str] = Field(None, description="타겟 모델")
-    context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 컨텍스트")
+# Agent Lightning 저장소 URL (학습 작업 프로세스도 같은 저장소를 사용)
+LIGHTNING_STORE_URL = os.getenv("LIGHTNING_STORE_URL", "sqlite:///lightning_store.db")
 
-class TemplateRecommendationResponse(BaseModel):
-    """템플릿 추천 응답"""
-    recommended_templates: List[Dict[str, Any]] = Field(default_factory=list)
-    reasoning: str = Field(..., description="추천 이유")
-    confidence: float = Field(..., ge=0, le=1)
-
-class FeedbackRequest(BaseModel):
-    """사용자 피드백 요청"""
-    task_id: str = Field(..., description="작업 ID")
-    span_id: Optional[str] = Field(None, description="Span ID")
-    reward: float = Field(..., ge=-1, le=1, description="보상 점수 (-1 ~ 1)")
-    feedback_text: Optional[str] = Field(None, description="피드백 텍스트")
-    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 메타데이터")
-
-# ============================================
-# Agent Lightning 통합
-# ============================================
+# 저장소 연결 실패 시 재시도 간격 (초, 실패할 때마다 최대값까지 두 배로 늘어난다)
+AGENT_LIGHTNING_INIT_RETRY_INTERVAL = float(os.getenv("AGENT_LIGHTNING_INIT_RETRY_INTERVAL", "5"))
+AGENT_LIGHTNING_INIT_MAX_RETRY_INTERVAL = float(os.getenv("AGENT_LIGHTNING_INIT_MAX_RETRY_INTERVAL", "60"))
 
 # Agent Lightning 모듈 상태
-_agent_lightning_available = False
+# 서버 시작을 막지 않도록 lifespan에서 백그라운드 스레드로 초기화되며,
+# 초기화가 끝나기 전까지 Span 추적/보상/학습은 비활성 상태로 동작한다
+AGENT_LIGHTNING_AVAILABLE = False
 agl = None
 lightning_store = None
 trainer = None
 
-try:
-    import agentlightning as agl
-    from agentlightning import LightningStore, Trainer
+# 초기화 진행 상태 (pending -> initializing -> ready | degraded | unavailable)
+agent_lightning_init: Dict[str, Any] = {
+    "state": "pending",
+    "attempts": 0,
+    "started_at": None,
+    "ready_at": None,
+    "error": None
+}
+_agent_lightning_shutdown = threading.Event()
+
+def initialize_agent_lightning() -> None:
+    """agentlightning 모듈, LightningStore, Trainer 초기화 (백그라운드 스레드에서 호출)
+
+    모듈을 불러오면 Span 추적이 바로 활성화되며, 저장소 연결에 실패하면
+    degraded 상태로 서버 종료 시까지 재시도한다.
+    """
+    global agl, lightning_store, trainer, AGENT_LIGHTNING_AVAILABLE
+    agent_lightning_init.update(state="initializing", started_at=time.time())
+    
+    # 로컬 Span 저장소가 있으면 agentlightning과 무관하게 먼저 통계 재구성
+    if local_span_store.is_open:
+        rebuild_training_stats()
     
-    # LightningStore 초기화 (데이터 저장소)
     try:
-        store_url = os.getenv("LIGHTNING_STORE_URL", "sqlite:///lightning_store.db")
-        lightning_store = LightningStore(store_url=store_url)
-        logger.info("✅ LightningStore 초기화 완료")
-    except Exception as e:
-        logger.warning(f"⚠️ LightningStore 초기화 실패: {e}")
-        lightning_store = None
+        import agentlightning
+        from agentlightning import LightningStore, Trainer
+    except ImportError as e:
+        logger.warning(f"⚠️ Agent Lightning을 사용할 수 없습니다: {e}")
+        agent_lightning_init.update(state="unavailable", error=str(e))
+        return
+    
+    # Agent Lightning 사용 가능으로 표시
+    agl = agentlightning
+    AGENT_LIGHTNING_AVAILABLE = True
+    logger.info("✅ Agent Lightning 모듈 로드 완료")
+    
+    # LightningStore 초기화 (데이터 저장소)
+    retry_interval = AGENT_LIGHTNING_INIT_RETRY_INTERVAL
+    while True:
+        agent_lightning_init["attempts"] += 1
+        try:
+            store = LightningStore(store_url=LIGHTNING_STORE_URL)
+            break
+        except Exception as e:
+            logger.warning(f"⚠️ LightningStore 초기화 실패 ({retry_interval:.0f}초 후 재시도): {e}")
+            agent_lightning_init.update(state="degraded", error=str(e))
+            if _agent_lightning_shutdown.wait(retry_interval):
+                return
+            retry_interval = min(retry_interval * 2, AGENT_LIGHTNING_INIT_MAX_RETRY_INTERVAL)
+    lightning_store = store
+    logger.info("✅ LightningStore 초기화 완료")
+    rebuild_training_stats()
     
     # Trainer 초기화 (학습 루프 관리)
     try:
-        trainer = Trainer(store=lightning_store) if lightning_store else None
-        if trainer:
-            logger.info("✅ Trainer 초기화 완료")
+        trainer = Trainer(store=lightning_store)
+        logger.info("✅ Trainer 초기화 완료")
     except Exception as e:
         logger.warning(f"⚠️ Trainer 초기화 실패: {e}")
         trainer = None
     
-    # Agent Lightning 사용 가능으로 표시
-    _agent_lightning_available = True
-    logger.info("✅ Agent Lightning 모듈 로드 완료")
-except ImportError as e:
-    logger.warning(f"⚠️ Agent Lightning을 사용할 수 없습니다: {e}")
-    agl = None
-    lightning_store = None
-    trainer = None
+    agent_lightning_init.update(state="ready", ready_at=time.time(), error=None)
+    learned_snapshots.request_refresh()
+
+# 워커가 소유자의 초기화 상태를 확인하는 주기 (초)
+OWNER_STATUS_POLL_INTERVAL = 1.0
+
+# 워커 프로세스에서 본 소유자의 저장소/Trainer 상태 (저장소와 Trainer는 소유자에만 있다)
+owner_agent_lightning: Dict[str, bool] = {"store_available": False, "trainer_available": False, "local_store_available": False}
 
-# 공개 상수 (읽기 전용)
-AGENT_LIGHTNING_AVAILABLE = _agent_lightning_available
+def follow_owner_agent_lightning() -> None:
+    """소유자 프로세스의 Agent Lightning 초기화 상태 반영 (워커의 백그라운드 스레드에서 호출)
+
+    소유자 초기화가 끝나면(ready 또는 unavailable) Span/보상 전달이 활성화된다.
+    """
+    global AGENT_LIGHTNING_AVAILABLE
+    agent_lightning_init.update(state="initializing", started_at=time.time())
+    while True:
+        try:
+            status = owner_client.call("status")
+        except (OSError, OwnerCallError) as e:
+            agent_lightning_init["error"] = f"소유자 프로세스 연결 실패: {e}"
+        else:
+            owner_agent_lightning.update(
+                store_available=status["store_available"],
+                trainer_available=status["trainer_available"],
+                local_store_available=status["local_store_available"]
+            )
+            agent_lightning_init.update(
+                {key: status[key] for key in ("state", "attempts", "started_at", "ready_at", "error")}
+            )
+            AGENT_LIGHTNING_AVAILABLE = status["available"]
+            if status["state"] in ("ready", "unavailable"):
+                return
+        if _agent_lightning_shutdown.wait(OWNER_STATUS_POLL_INTERVAL):
+            return
+
+def start_agent_lightning_initializer() -> threading.Thread:
+    """Agent Lightning 백그라운드 초기화 시작 (워커는 소유자 상태를 따라간다)"""
+    _agent_lightning_shutdown.clear()
+    target = follow_owner_agent_lightning if PROCESS_ROLE == "worker" else initialize_agent_lightning
+    thread = threading.Thread(target=target, name="agent-lightning-init", daemon=True)
+    thread.start()
+    return thread
+
+def store_available() -> bool:
+    """LightningStore 사용 가능 여부 (워커는 소유자 기준)"""
+    if PROCESS_ROLE == "worker":
+        return owner_agent_lightning["store_available"]
+    return lightning_store is not None
+
+def training_available() -> bool:
+    """Trainer 사용 가능 여부 (워커는 소유자 기준)"""
+    if PROCESS_ROLE == "worker":
+        return owner_agent_lightning["trainer_available"]
+    return trainer is not None
+
+def local_store_available() -> bool:
+    """로컬 Span 저장소 사용 가능 여부 (워커는 소유자 기준)"""
+    if PROCESS_ROLE == "worker":
+        return owner_agent_lightning["local_store_available"]
+    return local_span_store.is_open
+
+def tracking_available() -> bool:
+    """Span/보상 추적 가능 여부 (agentlightning 또는 로컬 Span 저장소 중 하나라도 있으면 가능)"""
+    return AGENT_LIGHTNING_AVAILABLE or local_store_available()
+
+def get_agent_lightning_status() -> Dict[str, Any]:
+    """Agent Lightning 초기화 상태"""
+    status = dict(agent_lightning_init)
+    if status["started_at"] and status["ready_at"]:
+        status["init_seconds"] = round(status["ready_at"] - status["started_at"], 3)
+    status.update(
+        available=AGENT_LIGHTNING_AVAILABLE,
+        store_available=store_available(),
+        trainer_available=training_available(),
+        local_store_available=local_store_available()
+    )
+    return status
 
 # ============================================
 # Agent Lightning 헬퍼 함수
@@ -146,15 +492,21 @@ def emit_prompt_span(
             **(metadata or {})
         }
         
-        # Span 생성 및 기록
-        span = agl.emit_span(
+        # Span 생성 및 기록 (회로가 열려 있으면 호출하지 않는다)
+        started = time.perf_counter()
+        span = circuit_breakers.get("agl.emit_span").call(
+            agl.emit_span,
             name=f"prompt_optimization_{category}",
             metadata=span_metadata,
             task_id=task_id
         )
+        STAGE_EMIT_SPAN.observe(time.perf_counter() - started)
         
         return span.span_id if hasattr(span, 'span_id') else None
+    except CircuitOpenError:
+        return None
     except Exception as e:
+        record_error("emit_prompt_span", e)
         logger.warning(f"Span 기록 실패: {e}")
         return None
 
@@ -174,18 +526,400 @@ def emit_reward(
             **(metadata or {})
         }
         
-        agl.emit_reward(
+        started = time.perf_counter()
+        circuit_breakers.get("agl.emit_reward").call(
+            agl.emit_reward,
             span_id=span_id,
             reward=reward,
             metadata=reward_metadata
         )
+        STAGE_EMIT_REWARD.observe(time.perf_counter() - started)
         
         logger.info(f"보상 기록 완료: span_id={span_id}, reward={reward}")
         return True
+    except CircuitOpenError:
+        return False
     except Exception as e:
+        record_error("emit_reward", e)
         logger.warning(f"보상 기록 실패: {e}")
         return False
 
+# ============================================
+# 로컬 Span 저장소
+# ============================================
+
+# agentlightning이 없으면 Span/보상은 로컬 저장소에만 기록되고, 있으면 양쪽에 기록된다
+LOCAL_SPAN_STORE_ENABLED = os.getenv("LOCAL_SPAN_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+LOCAL_SPAN_STORE_PATH = os.getenv("LOCAL_SPAN_STORE_PATH", "span_store.db")
+LOCAL_SPAN_STORE_READ_POOL_SIZE = int(os.getenv("LOCAL_SPAN_STORE_READ_POOL_SIZE", "4"))
+
+local_span_store = LocalSpanStore(LOCAL_SPAN_STORE_PATH, read_pool_size=LOCAL_SPAN_STORE_READ_POOL_SIZE)
+
+def open_local_span_store() -> None:
+    """로컬 Span 저장소 열기 (실패해도 서버는 계속 동작)"""
+    if not LOCAL_SPAN_STORE_ENABLED:
+        return
+    try:
+        local_span_store.open()
+    except Exception as e:
+        record_error("local_span_store", e)
+        logger.warning(f"⚠️ 로컬 Span 저장소 열기 실패 ({LOCAL_SPAN_STORE_PATH}): {e}")
+
+# ============================================
+# 학습 데이터 내보내기
+# ============================================
+
+# 로컬 Span 저장소의 Span/보상을 열 기반 파일로 증분 내보낸다 (경로가 비어 있으면 비활성화)
+TRAINING_EXPORT_PATH = os.getenv("TRAINING_EXPORT_PATH", "")
+TRAINING_EXPORT_INTERVAL = float(os.getenv("TRAINING_EXPORT_INTERVAL", "300"))
+TRAINING_EXPORT_SEGMENT_ROWS = int(os.getenv("TRAINING_EXPORT_SEGMENT_ROWS", "200000"))
+TRAINING_EXPORT_MAX_SEGMENTS = int(os.getenv("TRAINING_EXPORT_MAX_SEGMENTS", "32"))
+
+training_exporter = TrainingExporter(
+    local_span_store,
+    TRAINING_EXPORT_PATH,
+    interval=TRAINING_EXPORT_INTERVAL,
+    segment_rows=TRAINING_EXPORT_SEGMENT_ROWS,
+    max_segments=TRAINING_EXPORT_MAX_SEGMENTS
+)
+
+# ============================================
+# 학습 데이터 통계
+# ============================================
+
+# 통계는 Span/보상 기록 시 누적 갱신되며, 저장소 전체 조회는 시작 시 복원 파일이 없을 때만 수행한다
+TRAINING_STATS_PATH = os.getenv("TRAINING_STATS_PATH", "training_stats.json")
+TRAINING_STATS_PERSIST_INTERVAL = float(os.getenv("TRAINING_STATS_PERSIST_INTERVAL", "60"))
+TRAINING_STATS_WINDOWS = os.getenv("TRAINING_STATS_WINDOWS", "true").lower() in ("1", "true", "yes")
+# 카테고리/모델 별 집계 키 상한 (넘는 값은 "other"로 묶는다)
+TRAINING_STATS_MAX_BREAKDOWN_KEYS = int(os.getenv("TRAINING_STATS_MAX_BREAKDOWN_KEYS", "1000"))
+
+training_stats = TrainingStatistics(
+    max_tracked_spans=int(os.getenv("SPAN_ID_REGISTRY_SIZE", "100000")),
+    windows=TRAINING_STATS_WINDOWS,
+    max_breakdown_keys=TRAINING_STATS_MAX_BREAKDOWN_KEYS
+)
+
+def load_training_records() -> Tuple[List[Tuple[str, str, Optional[str], Optional[float]]], List[Tuple[str, float, Optional[float]]]]:
+    """저장소의 Span/보상 전체 조회 (시작 시 통계 재구성용)
+
+    Span은 (local_span_id, category, model, timestamp), 보상은 (local_span_id, reward, timestamp) 형식
+    """
+    if local_span_store.is_open:
+        return list(local_span_store.iter_spans()), list(local_span_store.iter_rewards())
+    
+    if not lightning_store:
+        return [], []
+    
+    # 실제 구현은 store의 API에 따라 달라질 수 있음
+    return [], []
+
+def restore_training_stats() -> None:
+    """시작 시 저장 파일에서 통계 복원"""
+    if training_stats.load(TRAINING_STATS_PATH):
+        logger.info(f"✅ 학습 통계 복원 완료: {TRAINING_STATS_PATH}")
+
+def rebuild_training_stats() -> None:
+    """저장 파일이 없었으면 저장소에서 통계 재구성 (저장소 초기화 직후 1회)
+
+    초기화 도중 이미 기록된 통계가 있으면 덮어쓰지 않는다.
+    """
+    if training_stats.restored_from or training_stats.updated_at is not None:
+        return
+    try:
+        spans, rewards = load_training_records()
+        training_stats.rebuild(spans, rewards)
+        training_stats.restored_from = "store"
+    except Exception as e:
+        logger.warning(f"⚠️ 학습 통계 재구성 실패: {e}")
+
+def save_training_stats() -> None:
+    """통계 파일 저장"""
+    if not TRAINING_STATS_PATH or training_stats.updated_at is None:
+        return
+    try:
+        training_stats.save(TRAINING_STATS_PATH)
+    except Exception as e:
+        logger.warning(f"⚠️ 학습 통계 저장 실패: {e}")
+
+_stats_persister_stop = threading.Event()
+
+def persist_training_stats_periodically() -> None:
+    """통계 주기적 저장 (변경이 있을 때만, 백그라운드 스레드에서 호출)
+
+    다중 워커 모드의 소유자 프로세스에는 이벤트 루프가 없으므로 스레드로 실행한다.
+    """
+    last_saved = training_stats.updated_at
+    while not _stats_persister_stop.wait(TRAINING_STATS_PERSIST_INTERVAL):
+        if training_stats.updated_at != last_saved:
+            last_saved = training_stats.updated_at
+            save_training_stats()
+
+def start_training_stats_persister() -> threading.Thread:
+    """통계 주기적 저장 시작"""
+    _stats_persister_stop.clear()
+    thread = threading.Thread(target=persist_training_stats_periodically, name="training-stats-persister", daemon=True)
+    thread.start()
+    return thread
+
+# ============================================
+# 백그라운드 Span/보상 기록
+# ============================================
+
+# 요청 처리 경로에서는 큐에 넣기만 하고, 기록 스레드가 모아서 Agent Lightning/로컬 저장소에 기록한다
+SPAN_EMITTER_MAX_QUEUE = int(os.getenv("SPAN_EMITTER_MAX_QUEUE", "10000"))
+SPAN_EMITTER_BATCH_SIZE = int(os.getenv("SPAN_EMITTER_BATCH_SIZE", "100"))
+SPAN_EMITTER_FLUSH_INTERVAL = float(os.getenv("SPAN_EMITTER_FLUSH_INTERVAL", "0.5"))
+SPAN_EMITTER_OVERFLOW = os.getenv("SPAN_EMITTER_OVERFLOW", "drop_oldest")  # drop_oldest | block
+SPAN_EMITTER_BLOCK_TIMEOUT = float(os.getenv("SPAN_EMITTER_BLOCK_TIMEOUT", "0.05"))
+SPAN_EMITTER_DRAIN_TIMEOUT = float(os.getenv("SPAN_EMITTER_DRAIN_TIMEOUT", "10"))
+
+# 응답에 포함되는 로컬 Span ID (이 접두사로 발급한다)
+LOCAL_SPAN_ID_PREFIX = "span_"
+
+# 로컬 Span ID -> Agent Lightning Span ID (최근 기록분 캐시, 원본은 로컬 Span 저장소의 Span 행)
+span_id_registry = SpanIdRegistry(int(os.getenv("SPAN_ID_REGISTRY_SIZE", "100000")))
+
+# Span보다 먼저 도착한 보상 (다중 워커 모드에서 다른 워커가 Span을 아직 전달하지 않은 경우 등)
+pending_rewards = PendingRewards(
+    max_entries=int(os.getenv("PENDING_REWARD_MAX", "10000")),
+    max_age=float(os.getenv("PENDING_REWARD_MAX_AGE", "300"))
+)
+
+# 보상의 Span 연결 상태
+_SPAN_PENDING = object()  # Span이 아직 기록되지 않음
+_SPAN_UNTRACKED = object()  # Span은 기록됐지만 Agent Lightning에는 기록되지 않음
+
+def _lookup_backend_span_ids(batch: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """배치의 보상 중 캐시에 없는 로컬 Span ID를 로컬 저장소에서 한 번에 조회"""
+    batch_span_ids = {item["span_id"] for item in batch if item["kind"] == "span"}
+    missing = [
+        item["span_id"] for item in batch
+        if item["kind"] == "reward"
+        and item["span_id"].startswith(LOCAL_SPAN_ID_PREFIX)
+        and item["span_id"] not in batch_span_ids
+        and span_id_registry.get(item["span_id"]) is None
+    ]
+    if not missing or not local_span_store.is_open:
+        return {}
+    try:
+        return local_span_store.backend_span_ids(missing)
+    except Exception as e:
+        record_error("local_span_store", e)
+        logger.warning(f"⚠️ 로컬 Span 저장소 조회 실패: {e}")
+        return {}
+
+def _emit_deferred_rewards(span_id: str, backend_span_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Span을 기다리던 보상을 Agent Lightning에 기록 (기록된 보상 반환)"""
+    deferred = pending_rewards.take(span_id)
+    if deferred and backend_span_id is None:
+        logger.warning(f"⚠️ Span이 Agent Lightning에 기록되지 않아 대기 중인 보상 {len(deferred)}개를 버립니다: {span_id}")
+        return []
+    recorded_items = []
+    for item in deferred:
+        recorded = emit_reward(
+            span_id=backend_span_id,
+            reward=item["reward"],
+            feedback_text=item.get("feedback_text"),
+            metadata=item.get("metadata")
+        )
+        if recorded:
+            recorded_items.append(item)
+    return recorded_items
+
+def _emit_tracking_batch(batch: List[Dict[str, Any]]) -> None:
+    """큐에 쌓인 Span/보상 기록 (기록 스레드에서 호출)
+
+    agentlightning에는 순서대로 하나씩, 로컬 저장소에는 배치 전체를 트랜잭션 하나로 기록하며,
+    통계는 둘 중 한 곳에라도 기록된 항목만 반영한다.
+    보상의 로컬 Span ID는 캐시 -> 로컬 저장소 순으로 Agent Lightning Span ID로 변환하고,
+    Span이 아직 기록되지 않았으면 Agent Lightning 기록만 Span이 기록될 때까지 미룬다.
+    """
+    expired = pending_rewards.expire()
+    if expired:
+        logger.warning(f"⚠️ Span이 기록되지 않아 대기 중인 보상 {len(expired)}개를 버립니다")
+    
+    now = time.time()
+    stored_span_ids = _lookup_backend_span_ids(batch)
+    # 이 배치에서 기록한 Span (로컬 Span ID -> Agent Lightning Span ID, 기록 실패 시 None)
+    batch_span_ids: Dict[str, Optional[str]] = {}
+    span_rows = []
+    reward_rows = []
+    emitted: List[bool] = []
+    deferred: List[Dict[str, Any]] = []
+    late_rewards: List[Dict[str, Any]] = []
+    for item in batch:
+        if item["kind"] == "span":
+            record = item["record"]
+            backend_span_id = emit_prompt_span(
+                **{**record, "metadata": {**(record.get("metadata") or {}), "local_span_id": item["span_id"]}}
+            )
+            if backend_span_id:
+                span_id_registry.put(item["span_id"], backend_span_id)
+            batch_span_ids[item["span_id"]] = backend_span_id
+            late_rewards.extend(_emit_deferred_rewards(item["span_id"], backend_span_id))
+            span_rows.append((
+                item["span_id"],
+                backend_span_id,
+                record.get("task_id"),
+                record["category"],
+                record.get("model") or "unknown",
+                now,
+                {
+                    "original_prompt": record["prompt"],
+                    "optimized_prompt": record["optimized_prompt"],
+                    **(record.get("metadata") or {})
+                }
+            ))
+            emitted.append(backend_span_id is not None)
+        elif item["kind"] == "reward":
+            span_id = item["span_id"]
+            if not span_id.startswith(LOCAL_SPAN_ID_PREFIX):
+                # 작업 ID 또는 Agent Lightning Span ID를 직접 받은 경우
+                target = span_id
+            elif span_id in batch_span_ids:
+                target = batch_span_ids[span_id] or _SPAN_UNTRACKED
+            elif span_id_registry.get(span_id) is not None:
+                target = span_id_registry.get(span_id)
+            elif span_id in stored_span_ids:
+                target = stored_span_ids[span_id] or _SPAN_UNTRACKED
+            else:
+                target = _SPAN_PENDING
+            
+            recorded = False
+            if target is _SPAN_PENDING:
+                if AGENT_LIGHTNING_AVAILABLE:
+                    # 같은 배치의 뒤쪽 Span에도 연결되도록 바로 대기열에 넣는다
+                    pending_item = {**item, "counted": False}
+                    pending_rewards.add(span_id, pending_item)
+                    deferred.append(pending_item)
+            elif target is not _SPAN_UNTRACKED:
+                recorded = emit_reward(
+                    span_id=target,
+                    reward=item["reward"],
+                    feedback_text=item.get("feedback_text"),
+                    metadata=item.get("metadata")
+                )
+            reward_rows.append((
+                span_id,
+                (item.get("metadata") or {}).get("task_id"),
+                item["reward"],
+                item.get("feedback_text"),
+                now,
+                item.get("metadata")
+            ))
+            emitted.append(recorded)
+    
+    stored = False
+    if local_span_store.is_open:
+        try:
+            local_span_store.write_batch(span_rows, reward_rows)
+            stored = True
+        except Exception as e:
+            record_error("local_span_store", e)
+            logger.warning(f"⚠️ 로컬 Span 저장소 기록 실패: {e}")
+    
+    # 미룬 보상은 로컬 저장소에 기록됐으면 통계를 지금 반영하고, 아니면 Agent Lightning에 기록될 때 반영한다
+    for item in deferred:
+        item["counted"] = stored
+    
+    for item, recorded in zip(batch, emitted):
+        if not (recorded or stored):
+            continue
+        if item["kind"] == "span":
+            training_stats.record_span(item["span_id"], item["record"]["category"], item["record"].get("model"))
+        else:
+            training_stats.record_reward(item["span_id"], item["reward"])
+    for item in late_rewards:
+        if not item["counted"]:
+            training_stats.record_reward(item["span_id"], item["reward"])
+
+def _forward_tracking_batch(batch: List[Dict[str, Any]]) -> None:
+    """큐에 쌓인 Span/보상을 소유자 프로세스에 전달 (워커의 기록 스레드에서 호출)
+
+    소유자의 기록 대기열에 들어가며, Agent Lightning 기록과 통계 갱신은 소유자가 수행한다.
+    """
+    # IPC 소켓 자체에 시간 제한이 있으므로 별도 스레드로 감싸지 않는다
+    circuit_breakers.get("owner.emit", call_timeout=0.0).call(owner_client.call, "emit", items=batch)
+
+span_emitter = BackgroundEmitter(
+    sink=_forward_tracking_batch if PROCESS_ROLE == "worker" else _emit_tracking_batch,
+    max_queue=SPAN_EMITTER_MAX_QUEUE,
+    batch_size=SPAN_EMITTER_BATCH_SIZE,
+    flush_interval=SPAN_EMITTER_FLUSH_INTERVAL,
+    overflow=SPAN_EMITTER_OVERFLOW,
+    block_timeout=SPAN_EMITTER_BLOCK_TIMEOUT
+)
+
+def enqueue_prompt_spans(records: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """프롬프트 최적화 Span 기록 예약
+
+    records는 emit_prompt_span의 키워드 인자 형식이며, 항목마다 즉시 발급한
+    로컬 Span ID(큐에서 버려졌거나 추적 불가 시 None)를 입력 순서대로 반환한다.
+    """
+    if not tracking_available():
+        return [None] * len(records)
+    
+    items = [
+        {"kind": "span", "span_id": f"{LOCAL_SPAN_ID_PREFIX}{uuid.uuid4().hex}", "record": record}
+        for record in records
+    ]
+    accepted = span_emitter.submit_many(items)
+    return [item["span_id"] if added else None for item, added in zip(items, accepted)]
+
+def record_prompt_spans(records: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """프롬프트 최적화 Span 즉시 일괄 기록 (대기열을 거치지 않음, 오프라인 일괄 최적화용)
+
+    enqueue_prompt_spans와 같은 형식이며, 대기열 크기와 무관하게 모든 항목을 호출한 스레드에서 기록한다.
+    """
+    if not tracking_available():
+        return [None] * len(records)
+
+    items = [
+        {"kind": "span", "span_id": f"{LOCAL_SPAN_ID_PREFIX}{uuid.uuid4().hex}", "record": record}
+        for record in records
+    ]
+    _emit_tracking_batch(items)
+    return [item["span_id"] for item in items]
+
+def enqueue_prompt_span(**record: Any) -> Optional[str]:
+    """프롬프트 최적화 Span 기록 예약 (emit_prompt_span과 같은 인자)"""
+    return enqueue_prompt_spans([record])[0]
+
+def enqueue_reward(
+    span_id: str,
+    reward: float,
+    feedback_text: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> bool:
+    """보상 기록 예약 (큐에서 버려졌거나 추적 불가 시 False)"""
+    if not tracking_available():
+        return False
+    
+    return span_emitter.submit({
+        "kind": "reward",
+        "span_id": span_id,
+        "reward": reward,
+        "feedback_text": feedback_text,
+        "metadata": metadata
+    })
+
+def enqueue_rewards(records: List[Dict[str, Any]]) -> List[bool]:
+    """보상 여러 개를 한 번에 기록 예약 (records는 enqueue_reward의 키워드 인자 형식, 항목별 추가 여부 반환)"""
+    if not tracking_available():
+        return [False] * len(records)
+    
+    return span_emitter.submit_many([
+        {
+            "kind": "reward",
+            "span_id": record["span_id"],
+            "reward": record["reward"],
+            "feedback_text": record.get("feedback_text"),
+            "metadata": record.get("metadata")
+        }
+        for record in records
+    ])
+
 def calculate_reward_from_feedback(
     quality_score: float,
     user_rating: Optional[float] = None,
@@ -211,74 +945,301 @@ def calculate_reward_from_feedback(
     
     return max(-1.0, min(1.0, base_reward))
 
+def calculate_rewards_from_feedback(
+    quality_scores: Any,
+    user_ratings: Optional[Any] = None,
+    satisfied: Optional[Any] = None,
+    used_result: Optional[Any] = None,
+    disappointed: Optional[Any] = None
+) -> np.ndarray:
+    """calculate_reward_from_feedback의 벡터화 버전 (항목마다 같은 값)
+
+    평점이 없는 항목은 user_ratings에 NaN으로, 피드백 플래그는 bool 배열로 전달한다.
+    """
+    base_reward = (np.asarray(quality_scores, dtype=np.float64) / 100.0) * 2.0 - 1.0
+    
+    if user_ratings is not None:
+        ratings = np.asarray(user_ratings, dtype=np.float64)
+        user_reward = (ratings / 5.0) * 2.0 - 1.0
+        base_reward = np.where(np.isnan(ratings), base_reward, base_reward * 0.4 + user_reward * 0.6)
+    
+    if satisfied is not None:
+        base_reward = np.where(satisfied, np.minimum(base_reward + 0.2, 1.0), base_reward)
+    if used_result is not None:
+        base_reward = np.where(used_result, np.minimum(base_reward + 0.1, 1.0), base_reward)
+    if disappointed is not None:
+        base_reward = np.where(disappointed, np.maximum(base_reward - 0.3, -1.0), base_reward)
+    
+    return np.clip(base_reward, -1.0, 1.0)
+
+# 학습된 최적화 스냅샷 갱신 주기 (초)
+LEARNED_REFRESH_INTERVAL = float(os.getenv("LEARNED_REFRESH_INTERVAL", "60"))
+# (category, model) 별로 유지할 학습 키워드 수 / 프롬프트 하나에 추가할 최대 키워드 수 (보상 상위부터)
+LEARNED_KEYWORDS_MAX = int(os.getenv("LEARNED_KEYWORDS_MAX", "1000"))
+LEARNED_KEYWORDS_MAX_APPLIED = int(os.getenv("LEARNED_KEYWORDS_MAX_APPLIED", "20"))
+
+def load_learned_optimizations() -> Optional[Dict[Tuple[str, str], Dict[str, Any]]]:
+    """저장소에서 (category, model) 별 학습된 최적화 전략 전체 조회 (스냅샷 갱신 스레드에서 호출)
+
+    저장소가 아직 준비되지 않았거나 회로가 열려 있으면 None (현재 스냅샷을 그대로 사용한다)
+    """
+    if not lightning_store:
+        return None
+    try:
+        return circuit_breakers.get("store.load_learned").call(query_learned_optimizations)
+    except CircuitOpenError:
+        return None
+
+def query_learned_optimizations() -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """LightningStore에서 학습된 최적화 전략 조회"""
+    # LightningStore에서 학습된 패턴 조회
+    # 실제 구현은 store의 API에 따라 달라질 수 있음
+    # 예: {("image", "midjourney"): {"learned_keywords": [...], "learned_patterns": [...], "confidence": 0.85}}
+    # learned_keywords 항목은 문자열 또는 {"keyword": ..., "reward": ...} (보상 순으로 정렬된다)
+    return {}
+
+# 요청 처리 경로는 메모리 스냅샷만 읽고, 저장소 조회는 갱신 스레드에서만 수행한다
+learned_snapshots = LearnedSnapshotManager(
+    loader=load_learned_optimizations,
+    refresh_interval=LEARNED_REFRESH_INTERVAL,
+    max_keywords=LEARNED_KEYWORDS_MAX
+)
+
+def get_learned_optimizations_version() -> int:
+    """학습된 최적화 스냅샷 버전 조회 (바뀌면 최적화 결과 캐시가 무효화된다)"""
+    return learned_snapshots.version
+
 def get_learned_optimizations(
     category: str,
-    model: Optional[str] = None
-) -> Dict[str, Any]:
-    """학습된 최적화 전략 조회"""
-    if not lightning_store:
-        return {}
+    model: Optional[str] = None,
+    snapshot: Optional[LearnedSnapshot] = None
+) -> Mapping[str, Any]:
+    """학습된 최적화 전략 조회 (읽기 전용, snapshot이 없으면 현재 스냅샷)"""
+    started = time.perf_counter()
+    learned = (snapshot or learned_snapshots.current).lookup(category, model)
+    STAGE_LEARNED_LOOKUP.observe(time.perf_counter() - started)
+    return learned
+
+# ============================================
+# 백그라운드 학습 작업
+# ============================================
+
+# 학습은 서버와 분리된 자식 프로세스에서 실행된다
+TRAINING_MAX_CONCURRENT = int(os.getenv("TRAINING_MAX_CONCURRENT", "1"))
+TRAINING_MAX_QUEUE = int(os.getenv("TRAINING_MAX_QUEUE", "10"))
+# 피드백으로 인한 학습 트리거를 모으는 시간 (초)
+TRAINING_DEBOUNCE_SECONDS = float(os.getenv("TRAINING_DEBOUNCE_SECONDS", "30"))
+# 실행 중인 작업 취소 시 프로세스 강제 종료까지의 유예 시간 (초)
+TRAINING_CANCEL_GRACE = float(os.getenv("TRAINING_CANCEL_GRACE", "5"))
+
+def _on_training_complete(job) -> None:
+    """학습 완료 시 학습된 최적화 스냅샷 즉시 갱신"""
+    logger.info(f"✅ 학습 완료: job_id={job.job_id}, duration={job.duration_seconds:.1f}s")
+    learned_snapshots.request_refresh()
+
+training_jobs = TrainingJobRunner(
+    target=run_lightning_training,
+    target_kwargs={"store_url": LIGHTNING_STORE_URL},
+    max_concurrent=TRAINING_MAX_CONCURRENT,
+    max_queue=TRAINING_MAX_QUEUE,
+    debounce_seconds=TRAINING_DEBOUNCE_SECONDS,
+    cancel_grace=TRAINING_CANCEL_GRACE,
+    on_complete=_on_training_complete
+)
+
+# ============================================
+# 소유자/워커 프로세스 서비스
+# ============================================
+
+def get_owner_training_status() -> Dict[str, Any]:
+    """학습 작업/스냅샷/통계 상태 (소유자 프로세스 기준)"""
+    status = {
+        "agent_lightning_available": AGENT_LIGHTNING_AVAILABLE,
+        "store_available": store_available(),
+        "trainer_available": training_available(),
+        "agent_lightning_init": get_agent_lightning_status(),
+        **training_jobs.status(),
+        "learned_snapshot": learned_snapshots.status(),
+        "circuit_breakers": circuit_breakers.status(),
+        "emitter": span_emitter.stats(),
+        "pending_rewards": pending_rewards.stats(),
+        "local_span_store": local_span_store.stats()
+    }
     
+    # 학습 데이터 통계 (누적 집계이므로 저장소를 조회하지 않는다)
+    statistics = training_stats.summary()
+    status["total_spans"] = statistics.pop("total_spans")
+    status["total_rewards"] = statistics.pop("total_rewards")
+    status["average_reward"] = statistics.pop("average_reward")
+    status["statistics"] = statistics
+    return status
+
+def _job_as_dict(job) -> Optional[Dict[str, Any]]:
+    return job.as_dict() if job is not None else None
+
+# 워커가 소유자에게 요청할 수 있는 작업 (인자/결과는 JSON 직렬화 가능해야 한다)
+OWNER_OPERATIONS: Dict[str, Any] = {
+    "emit": lambda items: span_emitter.submit_many(items),
+    "status": get_agent_lightning_status,
+    "training_status": get_owner_training_status,
+    "submit_training": lambda reason, debounce=False: _job_as_dict(training_jobs.submit(reason=reason, debounce=debounce)),
+    "list_jobs": lambda: training_jobs.jobs(),
+    "get_job": lambda job_id: _job_as_dict(training_jobs.get(job_id)),
+    "cancel_job": lambda job_id: _job_as_dict(training_jobs.cancel(job_id)),
+    "export_status": training_exporter.status,
+    "request_export": training_exporter.request_export,
+    "warm_state_status": lambda: warm_state_status(),
+    "save_warm_state": lambda: warm_state.save()
+}
+
+class OwnerDeadlineExceeded(Exception):
+    """요청의 남은 시간이 부족해 소유자 프로세스를 호출하지 않음"""
+
+class OwnerUnavailable(Exception):
+    """소유자 프로세스에 연결할 수 없거나 응답이 없음 (연결 실패, 시간 초과 등)"""
+
+async def call_owner(op: str, **kwargs: Any) -> Any:
+    """소유자 작업 실행 (워커는 IPC로 요청, 그 외에는 현재 프로세스에서 실행)
+
+    워커는 요청의 남은 시간만큼만 기다리며, 소유자가 응답하지 않으면 작업별 회로를 열어
+    이후 요청은 기다리지 않고 바로 CircuitOpenError를 받는다.
+    소유자 쪽 작업 실패는 OwnerCallError, 연결 실패/시간 초과는 OwnerUnavailable로 전달한다.
+    """
+    if PROCESS_ROLE != "worker":
+        return OWNER_OPERATIONS[op](**kwargs)
+    if not store_stage_allowed(f"owner.{op}"):
+        raise OwnerDeadlineExceeded(f"남은 시간이 부족해 소유자 작업을 건너뜁니다: {op}")
+    breaker = circuit_breakers.get(f"owner.{op}")
+    if not breaker.allow():
+        raise CircuitOpenError(breaker.name, breaker.retry_after())
+    timeout = bounded_timeout(owner_client.timeout)
+    started = time.perf_counter()
     try:
-        # LightningStore에서 학습된 패턴 조회
-        # 실제 구현은 store의 API에 따라 달라질 수 있음
-        query = {
-            "category": category,
-            "model": model or "any"
-        }
-        
-        # 학습된 최적화 규칙 반환
-        # 예: 특정 키워드 조합이 높은 보상을 받았는지 등
-        return {
-            "learned_keywords": [],
-            "learned_patterns": [],
-            "confidence": 0.0
-        }
+        result = await asyncio.to_thread(owner_client.call, op, timeout=timeout, **kwargs)
+    except OwnerCallError as e:
+        # 소유자는 응답했으므로 백엔드 장애가 아니다
+        breaker.record_success()
+        if e.error_type == TrainingQueueFull.__name__:
+            raise TrainingQueueFull(str(e))
+        raise
     except Exception as e:
-        logger.warning(f"학습 데이터 조회 실패: {e}")
-        return {}
+        if timeout < owner_client.timeout and time.perf_counter() - started >= timeout:
+            # 요청 기한 때문에 일찍 끊은 호출은 소유자 장애로 세지 않는다
+            breaker.cancel()
+            raise OwnerDeadlineExceeded(f"요청 기한 안에 소유자가 응답하지 않았습니다: {op}")
+        breaker.record_failure(f"{type(e).__name__}: {e}")
+        raise OwnerUnavailable(f"소유자 프로세스에 연결할 수 없습니다: {op} ({type(e).__name__}: {e})") from e
+    breaker.record_success(time.perf_counter() - started)
+    return result
+
+owner_server: Optional[OwnerServer] = None
+_shared_snapshot_lock = threading.Lock()
+
+def publish_learned_snapshot(snapshot=None) -> None:
+    """현재 학습 스냅샷을 공유 파일에 기록 (소유자 프로세스, 스냅샷 교체 시 호출)
+
+    교체가 겹쳐도 항상 최신 스냅샷이 마지막에 기록되도록 현재 스냅샷을 잠금 안에서 다시 읽는다.
+    """
+    with _shared_snapshot_lock:
+        current = learned_snapshots.current
+        try:
+            write_snapshot_file(AGL_SHARED_SNAPSHOT_PATH, current.version, current.entries)
+        except Exception as e:
+            record_error("publish_learned_snapshot", e)
+            logger.warning(f"⚠️ 공유 학습 스냅샷 기록 실패: {e}")
+
+def start_owner_services() -> None:
+    """저장소/학습을 담당하는 서비스 시작 (단일 프로세스 모드 또는 소유자 프로세스)"""
+    global owner_server
+    restore_training_stats()
+    # 학습 스냅샷은 소유자 모드에서 공유 파일을 기록하기 전에 복원한다. 결과 캐시와 템플릿 카탈로그(lifespan의
+    # template_catalog.start 전)는 요청을 처리하는 단일 프로세스 모드에서만 복원한다 (소유자는 해당 섹션을 등록하지 않는다)
+    configure_warm_state_sections()
+    restore_warm_state()
+    open_local_span_store()
+    start_agent_lightning_initializer()
+    span_emitter.start()
+    if PROCESS_ROLE == "owner":
+        learned_snapshots.on_swap = publish_learned_snapshot
+        publish_learned_snapshot()
+        owner_server = OwnerServer(AGL_OWNER_SOCKET, OWNER_OPERATIONS)
+        owner_server.start()
+    learned_snapshots.start()
+    start_training_stats_persister()
+    training_exporter.start()
+    warm_state.start()
+
+def stop_owner_services() -> None:
+    """소유자 서비스 종료 (대기 중인 Span/보상을 모두 기록하고 통계 저장)"""
+    _agent_lightning_shutdown.set()
+    _stats_persister_stop.set()
+    if owner_server is not None:
+        owner_server.stop()
+    training_jobs.stop(TRAINING_CANCEL_GRACE)
+    learned_snapshots.stop()
+    # 학습 스냅샷 갱신이 멈춘 뒤 마지막 상태를 기록한다
+    warm_state.stop()
+    span_emitter.stop(SPAN_EMITTER_DRAIN_TIMEOUT)
+    if len(pending_rewards):
+        logger.warning(f"⚠️ Span이 기록되지 않아 Agent Lightning에 기록하지 못한 보상 {len(pending_rewards)}개 (로컬 저장소에는 기록됨)")
+    # 대기열을 모두 기록한 뒤 남은 Span/보상을 마지막으로 내보낸다
+    training_exporter.stop()
+    local_span_store.close()
+    save_training_stats()
+
+# 워커는 학습 스냅샷을 직접 갱신하지 않고 소유자가 기록한 공유 파일을 따라간다
+learned_snapshot_follower = SharedSnapshotFollower(
+    AGL_SHARED_SNAPSHOT_PATH,
+    apply=lambda version, entries: learned_snapshots.swap(entries, version=version),
+    poll_interval=LEARNED_SHARED_POLL_INTERVAL
+)
+
+def start_worker_services() -> None:
+    """워커 프로세스 서비스 시작 (소유자 상태/공유 스냅샷 추적, Span/보상 전달)"""
+    start_agent_lightning_initializer()
+    span_emitter.start()
+    learned_snapshot_follower.start()
+
+def stop_worker_services() -> None:
+    """워커 서비스 종료 (대기 중인 Span/보상을 소유자에게 모두 전달)"""
+    _agent_lightning_shutdown.set()
+    learned_snapshot_follower.stop()
+    span_emitter.stop(SPAN_EMITTER_DRAIN_TIMEOUT)
 
 # ============================================
 # 프롬프트 최적화 로직
 # ============================================
 
-def optimize_image_prompt(prompt: str, model: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """이미지 프롬프트 최적화 (학습된 패턴 적용)"""
-    improvements = []
-    optimized = prompt
-    
+# 규칙 테이블은 시작 시 (category, model) 별 단일 매처로 컴파일된다
+rule_engine = RuleEngine(DEFAULT_RULES)
+
+def optimize_image_prompt(
+    prompt: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    learned: Optional[Mapping[str, Any]] = None
+) -> Dict[str, Any]:
+    """이미지 프롬프트 최적화 (학습된 패턴 적용)
+
+    learned가 주어지면 학습된 최적화 전략 조회를 생략한다 (일괄 처리 시 그룹당 1회 조회).
+    """
     # 학습된 최적화 전략 조회
-    learned = get_learned_optimizations("image", model)
-    
-    # 1. 기술적 세부사항 추가
-    if "4k" not in prompt.lower() and "8k" not in prompt.lower():
-        optimized += ", 4k, ultra detailed"
-        improvements.append("고해상도 키워드 추가")
-    
-    # 2. 스타일 일관성 개선
-    if model == "midjourney":
-        if "--v" not in prompt and "--style" not in prompt:
-            optimized += " --v 6 --style raw"
-            improvements.append("Midjourney 버전 및 스타일 파라미터 추가")
-    
-    # 3. 구도 및 조명 개선
-    if "composition" not in prompt.lower() and "lighting" not in prompt.lower():
-        optimized += ", professional composition, cinematic lighting"
-        improvements.append("전문적인 구도 및 조명 지시 추가")
-    
-    # 4. 학습된 패턴 적용 (예: 특정 키워드 조합이 높은 보상을 받았다면)
-    if learned.get("learned_keywords"):
-        for keyword in learned["learned_keywords"]:
-            if keyword not in optimized.lower():
-                optimized += f", {keyword}"
-                improvements.append(f"학습된 키워드 추가: {keyword}")
-    
-    # 5. 부정 프롬프트 제안
-    negative_suggestions = []
-    if "blurry" not in prompt.lower():
-        negative_suggestions.append("blurry")
-    if "low quality" not in prompt.lower():
-        negative_suggestions.append("low quality")
+    if learned is None:
+        learned = get_learned_optimizations("image", model)
+    
+    # 1. 규칙 적용 (고해상도, 모델별 파라미터, 구도/조명, 부정 프롬프트 제안)
+    applied = rule_engine.apply("image", model, prompt)
+    improvements = applied.improvements
+    optimized = applied.optimized_prompt
+    
+    # 2. 학습된 패턴 적용 (예: 특정 키워드 조합이 높은 보상을 받았다면)
+    # 키워드 인덱스는 스냅샷 생성 시 만들어지며, 프롬프트에 없는 키워드를 보상 순으로 최대 N개 추가한다
+    keywords = learned.get("learned_keywords")
+    if keywords:
+        if not isinstance(keywords, LearnedKeywords):
+            keywords = LearnedKeywords(keywords, LEARNED_KEYWORDS_MAX)
+        optimized, added = keywords.apply(optimized, LEARNED_KEYWORDS_MAX_APPLIED)
+        improvements.extend(f"학습된 키워드 추가: {keyword}" for keyword in added)
     
     quality_score = min(85 + len(improvements) * 5, 100)
     confidence = 0.8 if improvements else 0.6
@@ -292,41 +1253,21 @@ def optimize_image_prompt(prompt: str, model: Optional[str] = None, options: Opt
         "improvements": improvements,
         "quality_score": quality_score,
         "confidence": confidence,
-        "negative_suggestions": negative_suggestions,
+        "negative_suggestions": applied.negative_suggestions,
         "learned_optimizations_applied": len(learned.get("learned_keywords", []))
     }
 
 def optimize_video_prompt(prompt: str, model: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """동영상 프롬프트 최적화"""
-    improvements = []
-    optimized = prompt
-    
-    # 1. 모션 및 시간 정보 추가
-    if "motion" not in prompt.lower() and "movement" not in prompt.lower():
-        optimized += ", smooth motion, natural movement"
-        improvements.append("자연스러운 모션 지시 추가")
-    
-    # 2. 카메라 워크 개선
-    if "camera" not in prompt.lower():
-        optimized += ", cinematic camera movement"
-        improvements.append("시네마틱 카메라 워크 추가")
-    
-    # 3. 일관성 강화
-    if model == "sora":
-        if "consistent" not in prompt.lower():
-            optimized += ", consistent style and lighting"
-            improvements.append("스타일 일관성 강화")
-    
-    # 4. 프레임 레이트 고려
-    if "fps" not in prompt.lower() and "frame rate" not in prompt.lower():
-        optimized += ", 24fps"
-        improvements.append("프레임 레이트 명시")
+    # 모션, 카메라 워크, 모델별 일관성, 프레임 레이트 규칙 적용
+    applied = rule_engine.apply("video", model, prompt)
+    improvements = applied.improvements
     
     quality_score = min(80 + len(improvements) * 5, 100)
     confidence = 0.75 if improvements else 0.65
     
     return {
-        "optimized_prompt": optimized,
+        "optimized_prompt": applied.optimized_prompt,
         "improvements": improvements,
         "quality_score": quality_score,
         "confidence": confidence
@@ -334,97 +1275,633 @@ def optimize_video_prompt(prompt: str, model: Optional[str] = None, options: Opt
 
 def optimize_text_prompt(prompt: str, model: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """텍스트 프롬프트 최적화"""
-    improvements = []
-    optimized = prompt
-    
-    # 1. 명확성 개선
-    if len(prompt.split()) < 10:
-        optimized = f"다음 주제에 대해 상세하고 전문적인 내용을 작성해주세요: {prompt}"
-        improvements.append("프롬프트 구조화 및 명확성 개선")
-    
-    # 2. 출력 형식 명시
-    if "형식" not in prompt and "format" not in prompt.lower():
-        optimized += "\n출력 형식: 구조화된 마크다운 형식"
-        improvements.append("출력 형식 명시")
+    # 명확성(구조화) 및 출력 형식 규칙 적용
+    applied = rule_engine.apply("text", model, prompt)
+    improvements = applied.improvements
     
     quality_score = min(75 + len(improvements) * 5, 100)
     confidence = 0.7
     
     return {
-        "optimized_prompt": optimized,
+        "optimized_prompt": applied.optimized_prompt,
         "improvements": improvements,
         "quality_score": quality_score,
         "confidence": confidence
     }
 
+def run_optimizer(
+    category: str,
+    prompt: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    learned: Optional[Mapping[str, Any]] = None
+) -> Dict[str, Any]:
+    """카테고리별 최적화 함수 실행 (지원하지 않는 카테고리는 ValueError)"""
+    if category == "image":
+        return optimize_image_prompt(prompt, model, options, learned=learned)
+    elif category == "video":
+        return optimize_video_prompt(prompt, model, options)
+    elif category == "text":
+        return optimize_text_prompt(prompt, model, options)
+    raise ValueError(f"지원하지 않는 카테고리: {category}")
+
+# ============================================
+# 최적화 결과 캐시
+# ============================================
+
+# 캐시 설정 (OPTIMIZE_CACHE_MAX_ENTRIES=0 이면 비활성화)
+OPTIMIZE_CACHE_MAX_ENTRIES = int(os.getenv("OPTIMIZE_CACHE_MAX_ENTRIES", "10000"))
+OPTIMIZE_CACHE_TTL_SECONDS = float(os.getenv("OPTIMIZE_CACHE_TTL_SECONDS", "300"))
+# 캐시 적중 시에도 Span을 기록할지 여부 (강화학습 추적 정확도 유지)
+OPTIMIZE_CACHE_EMIT_SPANS_ON_HIT = os.getenv("OPTIMIZE_CACHE_EMIT_SPANS_ON_HIT", "true").lower() in ("1", "true", "yes")
+
+# 같은 요청이 동시에 들어오면 최적화를 한 번만 실행하고 결과를 나눠 받는다 (Span은 요청마다 기록)
+OPTIMIZE_COALESCE_ENABLED = os.getenv("OPTIMIZE_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+result_cache = ResultCache(
+    max_entries=OPTIMIZE_CACHE_MAX_ENTRIES,
+    ttl_seconds=OPTIMIZE_CACHE_TTL_SECONDS
+)
+optimize_flights = SingleFlight()
+
+def _prepare_cached_optimizer(
+    category: str,
+    prompt: str,
+    model: Optional[str],
+    options: Optional[Dict[str, Any]],
+    learned: Optional[Mapping[str, Any]],
+    snapshot: Optional[LearnedSnapshot]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Hashable], Callable[[], Dict[str, Any]]]:
+    """(캐시된 결과, 계산 합치기 키, 계산 함수) 반환 (캐시와 합치기가 모두 꺼져 있으면 키는 None)
+
+    학습 결과(learned)와 캐시 버전은 같은 스냅샷에서 읽는다 (learned를 넘기면 snapshot에서 조회한 값이어야 한다).
+    """
+    if snapshot is None:
+        snapshot = learned_snapshots.current
+    if learned is None and category == "image":
+        learned = get_learned_optimizations(category, model, snapshot)
+    if not result_cache.enabled and not OPTIMIZE_COALESCE_ENABLED:
+        def run() -> Dict[str, Any]:
+            started = time.perf_counter()
+            result = run_optimizer(category, prompt, model, options, learned=learned)
+            STAGE_OPTIMIZE.observe(time.perf_counter() - started)
+            return result
+        return None, None, run
+    
+    started = time.perf_counter()
+    key = request_fingerprint(prompt, category, model, options)
+    version = snapshot.version
+    cached = result_cache.get(key, version)
+    STAGE_CACHE_LOOKUP.observe(time.perf_counter() - started)
+    
+    def compute() -> Dict[str, Any]:
+        # 계산이 끝나기 전에 캐시에 넣어, 계산 종료 직후 도착한 요청도 캐시에서 받게 한다
+        started = time.perf_counter()
+        result = run_optimizer(category, prompt, model, options, learned=learned)
+        STAGE_OPTIMIZE.observe(time.perf_counter() - started)
+        result_cache.put(key, result, version)
+        return result
+    
+    return cached, (key, version), compute
+
+def run_optimizer_cached(
+    category: str,
+    prompt: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    learned: Optional[Mapping[str, Any]] = None,
+    snapshot: Optional[LearnedSnapshot] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """캐시를 거쳐 최적화 실행 ((결과, 캐시 적중 여부) 반환, 결과는 읽기 전용)
+
+    캐시에 없는 요청은 지문과 학습 스냅샷 버전이 같은 진행 중인 계산이 있으면 그 결과를 함께 받는다.
+    진행 중인 계산을 기다리며 스레드를 막으므로 이벤트 루프에서는 run_optimizer_cached_async를 쓴다.
+    """
+    cached, key, compute = _prepare_cached_optimizer(category, prompt, model, options, learned, snapshot)
+    if cached is not None:
+        return cached, True
+    if key is not None and OPTIMIZE_COALESCE_ENABLED:
+        result, _ = optimize_flights.do(key, compute)
+    else:
+        result = compute()
+    return result, False
+
+async def run_optimizer_cached_async(
+    category: str,
+    prompt: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """이벤트 루프용 run_optimizer_cached
+
+    캐시 적중은 루프에서 바로 반환하고, 캐시에 없는 요청은 스레드에서 계산하므로 계산 중에 들어온
+    같은 요청(다른 코루틴이나 스레드)은 루프를 막지 않고 그 결과를 함께 받는다.
+    """
+    cached, key, compute = _prepare_cached_optimizer(category, prompt, model, options, None, None)
+    if cached is not None:
+        return cached, True
+    if key is not None and OPTIMIZE_COALESCE_ENABLED:
+        result, _ = await optimize_flights.do_async(key, compute)
+    else:
+        result = await asyncio.to_thread(compute)
+    return result, False
+
 # ============================================
 # 템플릿 추천 로직
 # ============================================
 
+# 템플릿 카탈로그 파일 또는 디렉터리 (*.json, *.jsonl)
+TEMPLATE_CATALOG_PATH = os.getenv(
+    "TEMPLATE_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+)
+# 카탈로그 파일 변경 확인 주기 (초, 0 이면 시작 시와 /templates/reload 요청 시에만 불러온다)
+TEMPLATE_CATALOG_POLL_INTERVAL = float(os.getenv("TEMPLATE_CATALOG_POLL_INTERVAL", "5"))
+# 카탈로그 전체 템플릿 수 상한 (초과하면 불러오지 않고 이전 카탈로그 유지)
+TEMPLATE_CATALOG_MAX_TEMPLATES = int(os.getenv("TEMPLATE_CATALOG_MAX_TEMPLATES", "200000"))
+
+# 카탈로그는 불러올 때 한 번만 색인되며, 파일이 바뀌면 새로 색인한 카탈로그로 통째로 교체된다
+template_catalog = TemplateCatalogManager(
+    TEMPLATE_CATALOG_PATH,
+    poll_interval=TEMPLATE_CATALOG_POLL_INTERVAL,
+    max_templates=TEMPLATE_CATALOG_MAX_TEMPLATES
+)
+
 def recommend_templates(user_input: str, category: str, model: Optional[str] = None) -> Dict[str, Any]:
-    """템플릿 추천"""
+    """템플릿 추천 (역색인 기반 상위 3개)"""
+    templates, catalog_version = template_catalog.recommend(user_input, category, k=3)
     
-    # 카테고리별 기본 템플릿
-    image_templates = [
-        {
-            "name": "고품질 포트레이트",
-            "template": "{subject}, professional portrait, studio lighting, 4k, ultra detailed, sharp focus",
-            "score": 0.9,
-            "reason": "포트레이트 생성에 최적화된 템플릿"
-        },
-        {
-            "name": "시네마틱 풍경",
-            "template": "{subject}, cinematic landscape, dramatic lighting, wide angle, 8k, film grain",
-            "score": 0.85,
-            "reason": "영화적 풍경 이미지 생성에 적합"
-        },
-        {
-            "name": "제품 사진",
-            "template": "{subject}, product photography, white background, professional lighting, high detail, commercial quality",
-            "score": 0.8,
-            "reason": "제품 사진에 최적화"
-        }
-    ]
+    return {
+        "recommended_templates": templates,
+        "reasoning": f"{category} 카테고리에서 사용자 입력과 가장 유사한 템플릿을 추천했습니다.",
+        "confidence": templates[0]["final_score"] if templates else 0.5,
+        "catalog_version": catalog_version
+    }
+
+# ============================================
+# 웜 재시작 상태
+# ============================================
+
+# 웜 상태 파일 (비우면 비활성화) 및 주기적 기록 간격 (초, 0 이면 종료 시에만 기록)
+WARM_STATE_PATH = os.getenv("WARM_STATE_PATH", "warm_state.bin")
+WARM_STATE_INTERVAL = float(os.getenv("WARM_STATE_INTERVAL", "300"))
+
+def optimizer_fingerprint() -> str:
+    """최적화 결과에 영향을 주는 코드/설정의 지문 (바뀌면 저장된 결과 캐시를 복원하지 않는다)"""
+    digest = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ("main.py", "rule_engine.py", "keyword_index.py"):
+        with open(os.path.join(base_dir, name), "rb") as f:
+            digest.update(f.read())
+    digest.update(f"{LEARNED_KEYWORDS_MAX}:{LEARNED_KEYWORDS_MAX_APPLIED}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def _capture_result_cache():
+    version, entries = result_cache.export_entries()
+    if not entries:
+        return None
+    return {"version": version, "entries": entries}, []
+
+def _restore_result_cache(meta: Dict[str, Any], buffers: List[bytes]) -> Dict[str, Any]:
+    # 학습 스냅샷이 저장 당시 버전으로 복원되지 않았으면 캐시 항목도 쓸 수 없다
+    if meta["version"] != learned_snapshots.version:
+        raise ValueError(f"학습 스냅샷 버전 불일치: {meta['version']} != {learned_snapshots.version}")
+    return {"entries": result_cache.restore_entries(meta["version"], meta["entries"])}
+
+def _restore_learned_snapshot(meta: Dict[str, Any], buffers: List[bytes]) -> Dict[str, Any]:
+    snapshot = learned_snapshots.restore_state(meta)
+    return {"version": snapshot.version, "entries": len(snapshot.entries)}
+
+def _restore_template_catalog(meta: Dict[str, Any], buffers: List[bytes]) -> Dict[str, Any]:
+    catalog = template_catalog.restore_state(meta, buffers)
+    return {"version": catalog.version, "templates": catalog.index.size()}
+
+# 결과 캐시와 템플릿 카탈로그는 요청을 처리하는 프로세스에만 있다. 다중 워커 모드의 소유자는 요청을 처리하지 않으므로
+# (비어 있는 캐시/카탈로그를 기록하지 않도록) 학습 스냅샷만 기록/복원하고, 워커의 캐시와 카탈로그는 콜드 시작한다.
+WARM_STATE_SERVING_SECTIONS = ("result_cache", "template_catalog")
+
+# 결과 캐시는 학습 스냅샷 버전을 확인하므로 학습 스냅샷 뒤에 복원한다.
+# 학습 통계는 TRAINING_STATS_PATH에 따로 저장/복원된다.
+warm_state = WarmStateManager(WARM_STATE_PATH, interval=WARM_STATE_INTERVAL)
+warm_state.register(
+    "learned_snapshot",
+    lambda: (learned_snapshots.export_state(), []),
+    _restore_learned_snapshot
+)
+
+def configure_warm_state_sections() -> None:
+    """현재 프로세스 역할에 맞게 웜 상태 섹션 등록 (start_owner_services에서 복원 전에 호출)
+
+    역할은 run_multi_worker가 불러오기 이후에 정하므로 불러올 때가 아니라 서비스 시작 시 결정한다.
+    """
+    if PROCESS_ROLE == "owner":
+        for name in WARM_STATE_SERVING_SECTIONS:
+            warm_state.unregister(name)
+        return
+    warm_state.register(
+        "result_cache",
+        _capture_result_cache,
+        _restore_result_cache,
+        compatibility=optimizer_fingerprint()
+    )
+    warm_state.register(
+        "template_catalog",
+        template_catalog.export_state,
+        _restore_template_catalog
+    )
+
+def warm_state_status() -> Dict[str, Any]:
+    """웜 상태 (다중 워커 모드에서 기록하지 않는 섹션 포함)"""
+    status = warm_state.status()
+    status["unmanaged_sections"] = list(WARM_STATE_SERVING_SECTIONS) if PROCESS_ROLE == "owner" else []
+    if PROCESS_ROLE == "owner":
+        status["note"] = "다중 워커 모드에서는 학습 스냅샷만 기록/복원하며, 워커별 결과 캐시와 템플릿 카탈로그는 콜드 시작합니다"
+    return status
+
+def restore_warm_state() -> None:
+    """시작 시 웜 상태 복원 (단일 프로세스 모드 또는 소유자 프로세스, 준비 상태 보고 전, 등록된 섹션만)"""
+    try:
+        warm_state.restore()
+    except Exception as e:
+        record_error("restore_warm_state", e)
+        logger.warning(f"⚠️ 웜 상태 복원 실패 (콜드 시작): {e}")
+
+# ============================================
+# 일괄 최적화 로직
+# ============================================
+
+# 일괄 최적화 요청당 최대 항목 수
+OPTIMIZE_BATCH_MAX_ITEMS = int(os.getenv("OPTIMIZE_BATCH_MAX_ITEMS", "10000"))
+
+def build_task_id(category: str, prompt: str) -> str:
+    """작업 ID 생성
+
+    카테고리와 프롬프트 내용의 해시이므로 프로세스/워커/재시작과 무관하게 같은 요청은 같은 ID를 받는다.
+    """
+    digest = hashlib.sha256(f"{category}\x00{prompt}".encode("utf-8")).hexdigest()
+    return f"task_{category}_{digest[:16]}"
+
+def build_optimization_response(
+    request: PromptOptimizationRequest,
+    result: Dict[str, Any],
+    task_id: str,
+    span_id: Optional[str]
+) -> PromptOptimizationResponse:
+    """최적화 결과를 응답 모델로 변환 (Span이 기록된 경우에만 task_id/span_id 포함)"""
+    return PromptOptimizationResponse(
+        original_prompt=request.prompt,
+        optimized_prompt=result["optimized_prompt"],
+        improvements=result["improvements"],
+        quality_score=result["quality_score"],
+        confidence=result["confidence"],
+        recommendations=result.get("negative_suggestions", []),
+        task_id=task_id if span_id else None,
+        span_id=span_id
+    )
+
+def optimize_batch(items: List[Dict[str, Any]], endpoint: str = "/optimize/batch") -> List[BatchOptimizationItemResult]:
+    """프롬프트 일괄 최적화
+
+    (category, model) 그룹마다 학습된 최적화 전략을 한 번만 조회하고,
+    Span은 배치 전체에 대해 한 번에 기록한다. 항목별 오류는 결과에만 기록된다.
+    endpoint는 메트릭 레이블로만 사용된다.
+    """
+    results: List[Optional[BatchOptimizationItemResult]] = [None] * len(items)
+    groups: Dict[Tuple[str, Optional[str]], List[Tuple[int, PromptOptimizationRequest]]] = {}
     
-    video_templates = [
-        {
-            "name": "단일 장면 동영상",
-            "template": "{description}, smooth camera movement, consistent lighting, 24fps, cinematic quality",
-            "score": 0.9,
-            "reason": "일관된 품질의 동영상 생성"
-        },
+    # 1. 항목별 검증 및 (category, model) 그룹화
+    for index, item in enumerate(items):
+        try:
+            request = PromptOptimizationRequest.model_validate(item)
+        except ValidationError as e:
+            record_error(endpoint, e)
+            results[index] = BatchOptimizationItemResult(index=index, status="error", error=str(e))
+            continue
+        key = (request.category.lower(), request.model)
+        groups.setdefault(key, []).append((index, request))
+    
+    # 2. 그룹별 최적화
+    completed: List[Tuple[int, PromptOptimizationRequest, Dict[str, Any], str, bool]] = []
+    # 학습 결과와 캐시 버전이 어긋나지 않도록 스냅샷은 한 번만 읽는다
+    snapshot = learned_snapshots.current
+    for (category, model), group in groups.items():
+        learned = get_learned_optimizations(category, model, snapshot) if category == "image" else None
+        group_requests = optimize_requests.labels(endpoint, category, model or "unknown")
+        group_seconds = optimize_seconds.labels(endpoint, category, model or "unknown")
+        for index, request in group:
+            started = time.perf_counter()
+            try:
+                result, cache_hit = run_optimizer_cached(
+                    category, request.prompt, model, request.options or {}, learned=learned, snapshot=snapshot
+                )
+            except Exception as e:
+                record_error(endpoint, e)
+                results[index] = BatchOptimizationItemResult(index=index, status="error", error=str(e))
+                continue
+            group_seconds.observe(time.perf_counter() - started)
+            group_requests.inc()
+            task_id = request.task_id or build_task_id(category, request.prompt)
+            completed.append((index, request, result, task_id, cache_hit))
+    
+    # 3. Span 일괄 기록 예약 (설정에 따라 캐시 적중 항목 제외)
+    span_ids: List[Optional[str]] = [None] * len(completed)
+    if completed and tracking_available():
+        tracked = [
+            position for position, (_, _, _, _, cache_hit) in enumerate(completed)
+            if OPTIMIZE_CACHE_EMIT_SPANS_ON_HIT or not cache_hit
+        ]
+        emitted = enqueue_prompt_spans([
+            {
+                "prompt": request.prompt,
+                "optimized_prompt": result["optimized_prompt"],
+                "category": request.category.lower(),
+                "model": request.model,
+                "task_id": task_id,
+                "metadata": {
+                    "quality_score": result["quality_score"],
+                    "confidence": result["confidence"],
+                    "improvements_count": len(result["improvements"]),
+                    "improvements": result["improvements"],
+                    "cache_hit": cache_hit,
+                    "batch": True
+                }
+            }
+            for _, request, result, task_id, cache_hit in (completed[position] for position in tracked)
+        ])
+        for position, span_id in zip(tracked, emitted):
+            span_ids[position] = span_id
+    
+    # 4. 피드백 보상 기록 및 결과 조립
+    for (index, request, result, task_id, _), span_id in zip(completed, span_ids):
+        if request.user_feedback and span_id:
+            reward = calculate_reward_from_feedback(
+                quality_score=result["quality_score"],
+                user_rating=request.user_feedback.get("rating"),
+                user_feedback=request.user_feedback
+            )
+            enqueue_reward(
+                span_id=span_id,
+                reward=reward,
+                feedback_text=request.user_feedback.get("text"),
+                metadata=request.user_feedback
+            )
+        results[index] = BatchOptimizationItemResult(
+            index=index,
+            status="success",
+            result=build_optimization_response(request, result, task_id, span_id).model_dump()
+        )
+    
+    return results
+
+# ============================================
+# 일괄 피드백 로직
+# ============================================
+
+# 일괄 피드백 요청당 최대 항목 수
+FEEDBACK_BATCH_MAX_ITEMS = int(os.getenv("FEEDBACK_BATCH_MAX_ITEMS", "10000"))
+
+def ingest_feedback_batch(items: List[Dict[str, Any]]) -> List[FeedbackBatchItemResult]:
+    """피드백 일괄 기록
+
+    보상이 없는 항목의 보상은 배열 연산으로 한 번에 계산하고, 보상은 한 번에 기록 대기열에 넣는다.
+    항목별 오류는 결과에만 기록된다.
+    """
+    results: List[Optional[FeedbackBatchItemResult]] = [None] * len(items)
+    valid: List[Tuple[int, FeedbackBatchItem]] = []
+    
+    # 1. 항목별 검증
+    for index, item in enumerate(items):
+        try:
+            feedback = FeedbackBatchItem.model_validate(item)
+        except ValidationError as e:
+            record_error("/feedback/batch", e)
+            results[index] = FeedbackBatchItemResult(index=index, status="error", error=str(e))
+            continue
+        if feedback.reward is None and feedback.quality_score is None:
+            results[index] = FeedbackBatchItemResult(index=index, status="error", error="reward 또는 quality_score가 필요합니다")
+            continue
+        valid.append((index, feedback))
+    
+    # 2. 보상 계산 (reward가 없는 항목만)
+    rewards = [feedback.reward for _, feedback in valid]
+    missing = [position for position, reward in enumerate(rewards) if reward is None]
+    if missing:
+        pending = [valid[position][1] for position in missing]
+        computed = calculate_rewards_from_feedback(
+            quality_scores=[feedback.quality_score for feedback in pending],
+            user_ratings=[np.nan if feedback.rating is None else feedback.rating for feedback in pending],
+            satisfied=[feedback.satisfied for feedback in pending],
+            used_result=[feedback.used_result for feedback in pending],
+            disappointed=[feedback.disappointed for feedback in pending]
+        )
+        for position, reward in zip(missing, computed.tolist()):
+            rewards[position] = reward
+    
+    # 3. 보상 일괄 기록 예약 및 결과 조립
+    accepted = enqueue_rewards([
         {
-            "name": "액션 시퀀스",
-            "template": "{description}, dynamic action, fast-paced movement, dramatic angles, high energy",
-            "score": 0.85,
-            "reason": "액션 장면에 최적화"
+            "span_id": feedback.span_id or feedback.task_id,
+            "reward": reward,
+            "feedback_text": feedback.feedback_text,
+            "metadata": {"task_id": feedback.task_id, "batch": True, **(feedback.metadata or {})}
         }
-    ]
+        for (_, feedback), reward in zip(valid, rewards)
+    ])
+    for (index, _), reward, added in zip(valid, rewards, accepted):
+        if added:
+            results[index] = FeedbackBatchItemResult(index=index, status="success", reward=reward)
+        else:
+            results[index] = FeedbackBatchItemResult(index=index, status="error", reward=reward, error="보상 기록 대기열이 가득 찼습니다")
+    
+    return results
+
+# ============================================
+# 스트리밍 최적화 로직
+# ============================================
+
+# 한 번에 최적화할 최대 줄 수 (입력 크기와 무관하게 메모리 사용량을 일정하게 유지)
+OPTIMIZE_STREAM_CHUNK_SIZE = int(os.getenv("OPTIMIZE_STREAM_CHUNK_SIZE", "256"))
+# 요청 한 줄의 최대 크기 (바이트)
+OPTIMIZE_STREAM_MAX_LINE_BYTES = int(os.getenv("OPTIMIZE_STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+
+async def iter_ndjson_chunks(
+    body: AsyncIterator[bytes],
+    chunk_size: int = OPTIMIZE_STREAM_CHUNK_SIZE,
+    max_line_bytes: int = OPTIMIZE_STREAM_MAX_LINE_BYTES
+) -> AsyncIterator[List[Any]]:
+    """요청 본문에서 NDJSON 항목을 읽어 최대 chunk_size개씩 반환
+
+    본문 조각이 도착할 때마다 완성된 줄만 처리하므로 느린 입력도 도착하는 대로 결과가 나간다.
+    해석할 수 없거나 max_line_bytes를 넘는 줄은 오류 메시지(str)로 반환되고, 빈 줄은 무시된다.
+    """
+    buffer = bytearray()
+    oversized = False
+    pending: List[Any] = []
     
-    templates = image_templates if category == "image" else video_templates if category == "video" else []
+    def parse(line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            pending.append(f"JSON 해석 실패: {e}")
+            return
+        pending.append(item if isinstance(item, dict) else "항목은 JSON 객체여야 합니다")
     
-    # 사용자 입력 기반 매칭 점수 계산
-    for template in templates:
-        # 간단한 키워드 매칭 (실제로는 더 정교한 NLP 사용)
-        user_keywords = set(user_input.lower().split())
-        template_keywords = set(template["template"].lower().split())
-        overlap = len(user_keywords & template_keywords)
-        template["match_score"] = overlap / max(len(user_keywords), 1)
-        template["final_score"] = template["score"] * 0.7 + template["match_score"] * 0.3
+    async for data in body:
+        start = 0
+        while True:
+            newline = data.find(b"\n", start)
+            if newline < 0:
+                break
+            if oversized or len(buffer) + newline - start > max_line_bytes:
+                pending.append(f"줄 크기 초과: > {max_line_bytes} bytes")
+                oversized = False
+            else:
+                buffer += data[start:newline]
+                parse(bytes(buffer))
+            buffer.clear()
+            start = newline + 1
+            if len(pending) >= chunk_size:
+                yield pending
+                pending = []
+        if not oversized:
+            buffer += data[start:]
+            if len(buffer) > max_line_bytes:
+                # 줄 끝까지 나머지 내용은 버린다
+                buffer.clear()
+                oversized = True
+        if pending:
+            yield pending
+            pending = []
     
-    # 점수 순으로 정렬
-    templates.sort(key=lambda x: x["final_score"], reverse=True)
+    if oversized:
+        pending.append(f"줄 크기 초과: > {max_line_bytes} bytes")
+    elif buffer:
+        parse(bytes(buffer))
+    if pending:
+        yield pending
+
+def optimize_stream_chunk(items: List[Any], offset: int) -> bytes:
+    """NDJSON 항목 묶음 최적화 (offset은 스트림 내 첫 항목의 위치)"""
+    valid = [(position, item) for position, item in enumerate(items) if isinstance(item, dict)]
+    results: List[Optional[BatchOptimizationItemResult]] = [None] * len(items)
+    for (position, _), result in zip(valid, optimize_batch([item for _, item in valid], endpoint="/optimize/stream")):
+        results[position] = result
     
-    return {
-        "recommended_templates": templates[:3],  # 상위 3개
-        "reasoning": f"{category} 카테고리에서 사용자 입력과 가장 유사한 템플릿을 추천했습니다.",
-        "confidence": templates[0]["final_score"] if templates else 0.5
-    }
+    lines = []
+    for position, item in enumerate(items):
+        result = results[position]
+        if result is None:
+            result = BatchOptimizationItemResult(index=position, status="error", error=item)
+        result.index = offset + position
+        lines.append(result.model_dump_json())
+    lines.append("")
+    started = time.perf_counter()
+    body = "\n".join(lines).encode("utf-8")
+    STAGE_SERIALIZE.observe(time.perf_counter() - started)
+    return body
+
+class BodyStreamingResponse(StreamingResponse):
+    """요청 본문을 읽으면서 응답을 내보내는 스트리밍 응답
+
+    기본 StreamingResponse는 연결 종료 감지를 위해 receive()를 동시에 호출하여 요청 본문 조각을
+    가로챌 수 있으므로, receive()는 본문을 읽는 쪽(request.stream())에서만 호출한다.
+    연결 종료는 본문 읽기 또는 응답 전송 실패로 감지된다.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+async def optimize_ndjson_stream(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """NDJSON 요청 스트림을 최적화 결과 NDJSON 스트림으로 변환
+
+    응답이 소비되어야 다음 본문을 읽으므로 클라이언트가 결과를 읽지 않으면 입력도 읽지 않는다.
+    """
+    offset = 0
+    async for items in iter_ndjson_chunks(body):
+        yield await asyncio.to_thread(optimize_stream_chunk, items, offset)
+        offset += len(items)
+    logger.info(f"스트리밍 최적화 완료: total={offset}")
+
+# 수집 시점에 현재 상태(게이지)와 다른 객체가 세고 있는 누적 수(카운터, _total)를 읽는다
+metrics_registry.gauge(
+    "agl_emitter_queue_depth", "Span/보상 기록 대기열 깊이",
+    lambda: {(): span_emitter.stats()["queue_depth"]}
+)
+metrics_registry.callback_counter(
+    "agl_emitter_items", "Span/보상 기록 항목 수 (누적)",
+    lambda: {(key,): value for key, value in span_emitter.stats().items() if key in ("submitted", "emitted", "dropped")},
+    ("state",)
+)
+metrics_registry.callback_counter(
+    "agl_cache_lookups", "최적화 결과 캐시 조회 수 (누적)",
+    lambda: {(key,): value for key, value in result_cache.stats().items() if key in ("hits", "misses")},
+    ("result",)
+)
+metrics_registry.callback_counter(
+    "agl_optimize_coalesced", "진행 중인 같은 요청의 결과를 공유한 최적화 수 (누적)",
+    lambda: {(): optimize_flights.coalesced}
+)
+metrics_registry.gauge("agl_cache_entries", "최적화 결과 캐시 항목 수", lambda: {(): result_cache.stats()["size"]})
+metrics_registry.gauge("agl_learned_snapshot_version", "학습된 최적화 스냅샷 버전", lambda: {(): learned_snapshots.version})
+metrics_registry.gauge(
+    "agl_admission_in_flight", "수용 제어 클래스별 처리 중인 요청 수",
+    lambda: {(name,): c["in_flight"] for name, c in admission_controller.stats()["classes"].items()},
+    ("class",)
+)
+metrics_registry.gauge(
+    "agl_admission_queued", "수용 제어 클래스별 대기 중인 요청 수",
+    lambda: {(name,): c["queued"] for name, c in admission_controller.stats()["classes"].items()},
+    ("class",)
+)
+metrics_registry.callback_counter(
+    "agl_admission_shed", "수용 제어 클래스/사유별 거절된 요청 수 (누적)",
+    lambda: {
+        (name, reason): count
+        for name, c in admission_controller.stats()["classes"].items()
+        for reason, count in c["shed"].items()
+    },
+    ("class", "reason")
+)
+metrics_registry.gauge(
+    "agl_agent_lightning_ready", "Agent Lightning 초기화 완료 여부",
+    lambda: {(): 1 if agent_lightning_init["state"] == "ready" else 0}
+)
 
 # ============================================
 # API 엔드포인트
 # ============================================
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """회로가 열린 백엔드 작업 (기다리지 않고 바로 503 + Retry-After)"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+@app.exception_handler(OwnerDeadlineExceeded)
+async def owner_deadline_handler(request: Request, exc: OwnerDeadlineExceeded):
+    """요청 기한 안에 소유자 작업을 마칠 수 없음"""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(OwnerUnavailable)
+async def owner_unavailable_handler(request: Request, exc: OwnerUnavailable):
+    """소유자 프로세스에 연결할 수 없음"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(OwnerCallError)
+async def owner_call_error_handler(request: Request, exc: OwnerCallError):
+    """소유자 프로세스에서 작업이 실패함 (소유자 쪽 예외 이름 포함)"""
+    return JSONResponse(status_code=502, content={"detail": str(exc), "error_type": exc.error_type})
+
 @app.get("/")
 async def root():
     """헬스 체크"""
@@ -434,110 +1911,248 @@ async def root():
         "version": "2.0.0",
         "agent_lightning_available": AGENT_LIGHTNING_AVAILABLE,
         "features": {
-            "span_tracking": AGENT_LIGHTNING_AVAILABLE,
-            "reward_system": AGENT_LIGHTNING_AVAILABLE,
-            "continuous_learning": trainer is not None,
-            "store_integration": lightning_store is not None
-        }
+            "span_tracking": tracking_available(),
+            "reward_system": tracking_available(),
+            "local_span_store": local_store_available(),
+            "continuous_learning": training_available(),
+            "store_integration": store_available()
+        },
+        "agent_lightning_init": agent_lightning_init["state"],
+        # 이 프로세스의 백엔드 작업별 회로 상태 (다중 워커 모드의 저장소 회로는 /training/status 참고)
+        "circuit_breakers": circuit_breakers.states()
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 메트릭"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="메트릭이 비활성화되어 있습니다")
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health/live")
+async def liveness():
+    """생존 확인 (프로세스가 요청에 응답하는지만 확인)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """준비 상태 확인
+
+    최적화/템플릿 추천은 시작 직후부터 처리할 수 있으므로 기본적으로 Agent Lightning
+    초기화를 기다리지 않는다 (READINESS_REQUIRE_AGENT_LIGHTNING=true 이면 대기).
+    """
+    agent_lightning = get_agent_lightning_status()
+    ready = server_state["started"] and (
+        not READINESS_REQUIRE_AGENT_LIGHTNING or agent_lightning["state"] == "ready"
+    )
+    body = {"status": "ready" if ready else "not_ready", "agent_lightning": agent_lightning}
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+def optimize_and_track(request: PromptOptimizationRequest, category: str, task_id: str) -> str:
+    """최적화 실행, Span/보상 기록 및 응답 직렬화 (/optimize 처리 경로, 이벤트 루프 밖에서 호출)"""
+    started = time.perf_counter()
+    result, cache_hit = run_optimizer_cached(category, request.prompt, request.model, request.options or {})
+    return track_optimization(request, category, task_id, result, cache_hit, started)
+
+async def optimize_and_track_async(
+    request: PromptOptimizationRequest,
+    category: str,
+    task_id: str,
+    headers: Optional[Mapping[str, str]] = None
+) -> Tuple[str, Optional[str]]:
+    """이벤트 루프용 optimize_and_track ((응답 본문, 프로파일 ID) 반환)
+
+    프로파일링 대상 요청은 최적화부터 직렬화까지 한 스레드에서 기록해야 하므로(프로파일러는 호출한
+    스레드만 기록한다) 구간 전체를 스레드 풀에서 실행한다.
+    """
+    profile = request_profiler.capture(headers or {}, "/optimize", {
+        "category": category, "model": request.model, "prompt_length": len(request.prompt)
+    })
+    if profile is not NO_PROFILE:
+        def profiled() -> Tuple[str, Optional[str]]:
+            with profile:
+                body = optimize_and_track(request, category, task_id)
+            return body, profile.profile_id
+        return await asyncio.to_thread(profiled)
+    
+    started = time.perf_counter()
+    result, cache_hit = await run_optimizer_cached_async(category, request.prompt, request.model, request.options or {})
+    return track_optimization(request, category, task_id, result, cache_hit, started), None
+
+def track_optimization(
+    request: PromptOptimizationRequest,
+    category: str,
+    task_id: str,
+    result: Dict[str, Any],
+    cache_hit: bool,
+    started: float
+) -> str:
+    """최적화 결과의 메트릭/Span/보상 기록 및 응답 직렬화 (started는 최적화 시작 시각)"""
+    optimize_seconds.labels("/optimize", category, request.model or "unknown").observe(time.perf_counter() - started)
+    optimize_requests.labels("/optimize", category, request.model or "unknown").inc()
+    
+    # Agent Lightning Span 추적 (캐시 적중 시에는 설정에 따라 기록)
+    span_id = None
+    if (OPTIMIZE_CACHE_EMIT_SPANS_ON_HIT or not cache_hit) and tracking_available():
+        span_id = enqueue_prompt_span(
+            prompt=request.prompt,
+            optimized_prompt=result["optimized_prompt"],
+            category=category,
+            model=request.model,
+            task_id=task_id,
+            metadata={
+                "quality_score": result["quality_score"],
+                "confidence": result["confidence"],
+                "improvements_count": len(result["improvements"]),
+                "improvements": result["improvements"],
+                "cache_hit": cache_hit
+            }
+        )
+    
+    # 사용자 피드백이 있으면 보상 기록
+    if request.user_feedback and span_id:
+        reward = calculate_reward_from_feedback(
+            quality_score=result["quality_score"],
+            user_rating=request.user_feedback.get("rating"),
+            user_feedback=request.user_feedback
+        )
+        enqueue_reward(
+            span_id=span_id,
+            reward=reward,
+            feedback_text=request.user_feedback.get("text"),
+            metadata=request.user_feedback
+        )
+    
+    # 응답에 task_id와 span_id 포함 (클라이언트가 피드백 제출 시 사용)
+    started = time.perf_counter()
+    body = build_optimization_response(request, result, task_id, span_id).model_dump_json()
+    STAGE_SERIALIZE.observe(time.perf_counter() - started)
+    return body
+
 @app.post("/optimize", response_model=PromptOptimizationResponse)
-async def optimize_prompt(request: PromptOptimizationRequest):
+async def optimize_prompt(request: PromptOptimizationRequest, http_request: Request):
     """프롬프트 최적화 (강화학습 통합)"""
     try:
         category = request.category.lower()
         
         # 작업 ID 생성 (없으면 새로 생성)
-        task_id = request.task_id or f"task_{category}_{hash(request.prompt) % 10000}"
+        task_id = request.task_id or build_task_id(category, request.prompt)
         
-        if category == "image":
-            result = optimize_image_prompt(request.prompt, request.model, request.options or {})
-        elif category == "video":
-            result = optimize_video_prompt(request.prompt, request.model, request.options or {})
-        elif category == "text":
-            result = optimize_text_prompt(request.prompt, request.model, request.options or {})
-        else:
+        if category not in ("image", "video", "text"):
             raise HTTPException(status_code=400, detail=f"지원하지 않는 카테고리: {category}")
-        
-        # Agent Lightning Span 추적
-        span_id = None
-        if AGENT_LIGHTNING_AVAILABLE:
-            span_id = emit_prompt_span(
-                prompt=request.prompt,
-                optimized_prompt=result["optimized_prompt"],
-                category=category,
-                model=request.model,
-                task_id=task_id,
-                metadata={
-                    "quality_score": result["quality_score"],
-                    "confidence": result["confidence"],
-                    "improvements_count": len(result["improvements"])
-                }
-            )
-        
-        # 사용자 피드백이 있으면 보상 기록
-        if request.user_feedback and span_id:
-            reward = calculate_reward_from_feedback(
-                quality_score=result["quality_score"],
-                user_rating=request.user_feedback.get("rating"),
-                user_feedback=request.user_feedback
-            )
-            emit_reward(
-                span_id=span_id,
-                reward=reward,
-                feedback_text=request.user_feedback.get("text"),
-                metadata=request.user_feedback
-            )
-        
-        response = PromptOptimizationResponse(
-            original_prompt=request.prompt,
-            optimized_prompt=result["optimized_prompt"],
-            improvements=result["improvements"],
-            quality_score=result["quality_score"],
-            confidence=result["confidence"],
-            recommendations=result.get("negative_suggestions", [])
-        )
-        
-        # 응답에 task_id와 span_id 포함 (클라이언트가 피드백 제출 시 사용)
-        # Pydantic 모델에 추가 필드를 포함하려면 모델을 확장하거나 dict로 변환
-        if span_id:
-            response_dict = response.model_dump() if hasattr(response, 'model_dump') else response.dict()
-            response_dict["task_id"] = task_id
-            response_dict["span_id"] = span_id
-            return response_dict
-        
+        # 프로파일링 대상 요청이면 최적화부터 직렬화까지 기록한다
+        body, profile_id = await optimize_and_track_async(request, category, task_id, http_request.headers)
+        response = Response(content=body, media_type="application/json")
+        if profile_id:
+            response.headers[PROFILE_ID_HEADER] = profile_id
         return response
+    except HTTPException:
+        raise
     except Exception as e:
+        record_error("/optimize", e)
         logger.error(f"프롬프트 최적화 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/optimize/batch", response_model=BatchOptimizationResponse)
+async def optimize_prompt_batch(request: BatchOptimizationRequest):
+    """프롬프트 일괄 최적화 (항목별 결과/오류 반환)"""
+    if len(request.items) > OPTIMIZE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"배치 항목 수 초과: {len(request.items)} > {OPTIMIZE_BATCH_MAX_ITEMS}"
+        )
+    
+    try:
+        # 진행 중인 같은 요청의 계산을 기다릴 수 있으므로 이벤트 루프 밖에서 실행한다
+        results = await asyncio.to_thread(optimize_batch, request.items)
+        succeeded = sum(1 for item in results if item.status == "success")
+        logger.info(f"일괄 최적화 완료: total={len(results)}, succeeded={succeeded}")
+        started = time.perf_counter()
+        body = BatchOptimizationResponse(
+            results=results,
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded
+        ).model_dump_json()
+        STAGE_SERIALIZE.observe(time.perf_counter() - started)
+        return Response(content=body, media_type="application/json")
+    except Exception as e:
+        record_error("/optimize/batch", e)
+        logger.error(f"일괄 최적화 실패: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/optimize/stream")
+async def optimize_prompt_stream(request: Request):
+    """프롬프트 스트리밍 최적화 (NDJSON 요청 -> NDJSON 결과, 항목별 결과/오류)"""
+    return BodyStreamingResponse(
+        optimize_ndjson_stream(request.stream()),
+        media_type="application/x-ndjson"
+    )
+
 @app.post("/recommend-templates", response_model=TemplateRecommendationResponse)
-async def recommend_templates_endpoint(request: TemplateRecommendationRequest):
+async def recommend_templates_endpoint(request: TemplateRecommendationRequest, http_request: Request, response: Response):
     """템플릿 추천"""
     try:
-        result = recommend_templates(request.user_input, request.category, request.model)
+        with request_profiler.capture(http_request.headers, "/recommend-templates", {
+            "category": request.category, "model": request.model, "input_length": len(request.user_input)
+        }) as profile:
+            result = recommend_templates(request.user_input, request.category, request.model)
+        if profile is not None and profile.profile_id:
+            response.headers[PROFILE_ID_HEADER] = profile.profile_id
         
         return TemplateRecommendationResponse(
             recommended_templates=result["recommended_templates"],
             reasoning=result["reasoning"],
-            confidence=result["confidence"]
+            confidence=result["confidence"],
+            catalog_version=result["catalog_version"]
         )
     except Exception as e:
+        record_error("/recommend-templates", e)
         logger.error(f"템플릿 추천 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/templates/catalog")
+async def get_template_catalog():
+    """템플릿 카탈로그 버전/크기 및 불러오기 상태 조회"""
+    return template_catalog.status()
+
+@app.post("/templates/reload")
+async def reload_template_catalog():
+    """템플릿 카탈로그 파일 다시 불러오기 (실패하면 이전 카탈로그 유지)
+
+    다중 워커 모드에서는 요청을 받은 워커만 즉시 다시 불러오며, 다른 워커는 파일 변경 확인 주기에 따라 교체한다.
+    """
+    previous_version = template_catalog.version
+    swapped = await asyncio.to_thread(template_catalog.reload, True)
+    status = template_catalog.status()
+    if status["last_error"] and not swapped:
+        raise HTTPException(status_code=422, detail=status["last_error"])
+    return {
+        "status": "success",
+        "swapped": swapped,
+        "previous_version": previous_version,
+        **status
+    }
+
+def require_agent_lightning() -> None:
+    """보상 기록이 불가능하면 503 (agentlightning과 로컬 Span 저장소 모두 없을 때)"""
+    if not tracking_available():
+        initializing = agent_lightning_init["state"] in ("pending", "initializing")
+        raise HTTPException(
+            status_code=503,
+            detail="Agent Lightning 초기화 중입니다" if initializing else "Agent Lightning이 사용 불가능합니다"
+        )
+
 @app.post("/feedback")
 async def submit_feedback(request: FeedbackRequest):
     """사용자 피드백 제출 및 보상 기록"""
     try:
-        if not AGENT_LIGHTNING_AVAILABLE:
-            raise HTTPException(
-                status_code=503,
-                detail="Agent Lightning이 사용 불가능합니다"
-            )
+        require_agent_lightning()
         
-        # 보상 기록
-        success = emit_reward(
+        # 보상 기록 예약 (백그라운드에서 기록)
+        success = enqueue_reward(
             span_id=request.span_id or request.task_id,
             reward=request.reward,
             feedback_text=request.feedback_text,
@@ -549,16 +2164,15 @@ async def submit_feedback(request: FeedbackRequest):
         
         if not success:
             raise HTTPException(
-                status_code=500,
-                detail="보상 기록 실패"
+                status_code=503,
+                detail="보상 기록 대기열이 가득 찼습니다"
             )
         
-        # Trainer가 활성화되어 있으면 학습 트리거
-        if trainer:
+        # Trainer가 활성화되어 있으면 학습 트리거 (연속된 피드백은 하나의 학습 작업으로 합쳐진다)
+        if training_available():
             try:
-                # 비동기 학습 트리거 (실제 구현은 trainer API에 따라 다름)
+                await call_owner("submit_training", reason="feedback", debounce=True)
                 logger.info(f"학습 트리거: task_id={request.task_id}")
-                # trainer.train() 또는 유사한 메서드 호출
             except Exception as e:
                 logger.warning(f"학습 트리거 실패: {e}")
         
@@ -571,62 +2185,237 @@ async def submit_feedback(request: FeedbackRequest):
     except HTTPException:
         raise
     except Exception as e:
+        record_error("/feedback", e)
         logger.error(f"피드백 제출 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/training/status")
-async def get_training_status():
-    """학습 상태 조회"""
+@app.post("/feedback/batch", response_model=FeedbackBatchResponse)
+async def submit_feedback_batch(request: FeedbackBatchRequest):
+    """사용자 피드백 일괄 제출 (항목별 결과/오류 반환, 장애 후 클라이언트 대기열 재전송용)"""
+    if len(request.items) > FEEDBACK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"배치 항목 수 초과: {len(request.items)} > {FEEDBACK_BATCH_MAX_ITEMS}"
+        )
+    require_agent_lightning()
+    
     try:
-        status = {
-            "agent_lightning_available": AGENT_LIGHTNING_AVAILABLE,
-            "store_available": lightning_store is not None,
-            "trainer_available": trainer is not None,
-            "training_active": False
-        }
+        results = ingest_feedback_batch(request.items)
+        succeeded = sum(1 for item in results if item.status == "success")
+        logger.info(f"일괄 피드백 기록: total={len(results)}, succeeded={succeeded}")
         
-        if lightning_store:
+        # 배치 전체에 대해 학습 트리거 한 번 (연속된 피드백은 하나의 학습 작업으로 합쳐진다)
+        if succeeded and training_available():
             try:
-                # 학습 데이터 통계 조회
-                # 실제 구현은 store API에 따라 다름
-                status["total_spans"] = 0
-                status["total_rewards"] = 0
-                status["average_reward"] = 0.0
-                # 학습 데이터 통계는 실제 store API에 따라 구현
+                await call_owner("submit_training", reason="feedback", debounce=True)
             except Exception as e:
-                logger.warning(f"학습 통계 조회 실패: {e}")
+                logger.warning(f"학습 트리거 실패: {e}")
         
+        started = time.perf_counter()
+        body = FeedbackBatchResponse(
+            results=results,
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded
+        ).model_dump_json()
+        STAGE_SERIALIZE.observe(time.perf_counter() - started)
+        return Response(content=body, media_type="application/json")
+    except Exception as e:
+        record_error("/feedback/batch", e)
+        logger.error(f"일괄 피드백 제출 실패: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/training/status")
+async def get_training_status():
+    """학습 상태 조회"""
+    try:
+        try:
+            status = await call_owner("training_status")
+        except (CircuitOpenError, OwnerDeadlineExceeded, OwnerUnavailable) as e:
+            # 소유자가 응답하지 않아도 워커 쪽 상태(회로 포함)는 보고한다
+            status = {"owner_available": False, "error": str(e)}
+        if PROCESS_ROLE == "worker":
+            # Span/보상 대기열, 결과 캐시, 소유자 호출 회로는 워커마다 따로 있다
+            status["worker"] = {
+                "pid": os.getpid(),
+                "emitter": span_emitter.stats(),
+                "circuit_breakers": circuit_breakers.status()
+            }
         return status
     except Exception as e:
+        record_error("/training/status", e)
         logger.error(f"학습 상태 조회 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """최적화 결과 캐시 통계 조회"""
+    return {
+        **result_cache.stats(),
+        "coalescing": {"enabled": OPTIMIZE_COALESCE_ENABLED, **optimize_flights.stats()},
+        "learned_optimizations_version": get_learned_optimizations_version(),
+        "emit_spans_on_hit": OPTIMIZE_CACHE_EMIT_SPANS_ON_HIT
+    }
+
+@app.get("/profiling/status")
+async def get_profiling_status():
+    """요청 프로파일링/연속 표본 추출 설정 및 상태"""
+    return {"requests": request_profiler.status(), "sampler": stack_sampler.status()}
+
+@app.get("/profiling/profiles")
+async def list_profiles():
+    """저장된 요청 프로파일 목록 (최신 순)"""
+    profiles = await asyncio.to_thread(request_profiler.store.list)
+    return {"profiles": profiles, "total": len(profiles)}
+
+@app.get("/profiling/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "pstats", limit: int = 50, sort: str = "cumulative"):
+    """요청 프로파일 다운로드 (format=pstats: pstats 파일, format=text: 상위 limit개 함수 요약)"""
+    try:
+        if format == "text":
+            summary = await asyncio.to_thread(request_profiler.store.summary, profile_id, limit, sort)
+            if summary is None:
+                raise HTTPException(status_code=404, detail=f"프로파일을 찾을 수 없습니다: {profile_id}")
+            return PlainTextResponse(summary)
+        path = request_profiler.store.path(profile_id)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"프로파일을 찾을 수 없습니다: {profile_id}")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+@app.get("/profiling/stacks")
+async def get_profiling_stacks():
+    """연속 표본 추출 결과 (flamegraph.pl/speedscope용 접힌 스택 텍스트)"""
+    return PlainTextResponse(stack_sampler.collapsed())
+
+@app.delete("/profiling/stacks")
+async def reset_profiling_stacks():
+    """연속 표본 추출 집계 초기화"""
+    stack_sampler.reset()
+    return {"status": "success", **stack_sampler.status()}
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """수용 제어 상태 (클래스별 처리/대기 중인 요청 수, 누적 수용/거절 수)"""
+    return {"enabled": ADMISSION_ENABLED, **admission_controller.stats()}
+
 @app.post("/training/trigger")
 async def trigger_training():
     """수동 학습 트리거"""
     try:
-        if not trainer:
+        if not training_available():
             raise HTTPException(
                 status_code=503,
                 detail="Trainer가 사용 불가능합니다"
             )
         
-        # 학습 실행
-        # 실제 구현은 trainer API에 따라 다름
-        logger.info("수동 학습 트리거 실행")
+        # 학습 작업 등록 (대기 중인 작업이 있으면 그 작업에 합쳐진다)
+        job = await call_owner("submit_training", reason="manual")
+        logger.info(f"수동 학습 트리거 실행: job_id={job['job_id']}")
         
         return {
             "status": "success",
-            "message": "학습이 시작되었습니다"
+            "message": "학습 작업이 등록되었습니다",
+            "job": job
         }
-    except HTTPException:
+    except TrainingQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except (HTTPException, CircuitOpenError, OwnerDeadlineExceeded, OwnerUnavailable, OwnerCallError):
         raise
     except Exception as e:
+        record_error("/training/trigger", e)
         logger.error(f"학습 트리거 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/training/export")
+async def get_training_export_status():
+    """학습 데이터 내보내기 상태 (세그먼트/행 수, 마지막 내보내기 결과)"""
+    try:
+        return await call_owner("export_status")
+    except (CircuitOpenError, OwnerDeadlineExceeded, OwnerUnavailable) as e:
+        # 소유자가 응답하지 않으면 /training/status처럼 연결 상태만 보고한다
+        return {"owner_available": False, "error": str(e)}
+
+@app.post("/training/export", status_code=202)
+async def trigger_training_export():
+    """학습 데이터 즉시 내보내기 요청 (백그라운드에서 실행)"""
+    if not training_exporter.enabled:
+        raise HTTPException(status_code=503, detail="학습 데이터 내보내기가 비활성화되어 있습니다 (TRAINING_EXPORT_PATH)")
+    if not local_store_available():
+        raise HTTPException(status_code=503, detail="로컬 Span 저장소를 사용할 수 없습니다")
+    await call_owner("request_export")
+    return {"status": "accepted", "message": "학습 데이터 내보내기가 요청되었습니다"}
+
+@app.get("/warm-state")
+async def get_warm_state():
+    """웜 재시작 상태 (복원/건너뛴 섹션, 마지막 기록 결과, 다중 워커 모드에서 기록하지 않는 섹션)"""
+    try:
+        return await call_owner("warm_state_status")
+    except (CircuitOpenError, OwnerDeadlineExceeded, OwnerUnavailable) as e:
+        # 소유자가 응답하지 않으면 /training/status처럼 연결 상태만 보고한다
+        return {"owner_available": False, "error": str(e)}
+
+@app.post("/warm-state/save")
+async def save_warm_state():
+    """웜 상태 즉시 기록 (예: 배포 직전)"""
+    if not warm_state.enabled:
+        raise HTTPException(status_code=503, detail="웜 상태 기록이 비활성화되어 있습니다 (WARM_STATE_PATH)")
+    if PROCESS_ROLE == "worker":
+        result = await call_owner("save_warm_state")
+    else:
+        result = await asyncio.to_thread(warm_state.save)
+    if not result["saved"]:
+        raise HTTPException(status_code=500, detail=result.get("error", "웜 상태 기록 실패"))
+    return {"status": "success", **result}
+
+@app.get("/training/jobs")
+async def list_training_jobs():
+    """최근 학습 작업 목록"""
+    return {"jobs": await call_owner("list_jobs")}
+
+@app.get("/training/jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """학습 작업 상태 조회"""
+    job = await call_owner("get_job", job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"학습 작업을 찾을 수 없습니다: {job_id}")
+    return job
+
+@app.post("/training/jobs/{job_id}/cancel")
+async def cancel_training_job(job_id: str):
+    """학습 작업 취소 (실행 중이면 유예 시간 후 프로세스 종료)"""
+    job = await call_owner("cancel_job", job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"학습 작업을 찾을 수 없습니다: {job_id}")
+    return job
+
+def run_multi_worker(port: int) -> None:
+    """다중 워커 모드 실행
+
+    현재 프로세스가 소유자가 되어 저장소/학습 서비스와 IPC 서버를 띄우고,
+    uvicorn 워커 프로세스들이 같은 포트에서 요청을 나눠 처리한다.
+    """
+    global PROCESS_ROLE
+    import uvicorn
+    os.environ.update(
+        AGL_PROCESS_ROLE="worker",
+        AGL_OWNER_SOCKET=os.path.abspath(AGL_OWNER_SOCKET),
+        AGL_SHARED_SNAPSHOT_PATH=os.path.abspath(AGL_SHARED_SNAPSHOT_PATH)
+    )
+    PROCESS_ROLE = "owner"
+    start_owner_services()
+    logger.info(f"✅ 소유자 프로세스 시작: pid={os.getpid()}, workers={WORKERS}")
+    try:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=WORKERS)
+    finally:
+        stop_owner_services()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8001))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    if WORKERS > 1:
+        run_multi_worker(port)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
 
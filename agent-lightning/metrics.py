@@ -0,0 +1,294 @@
+"""
+Prometheus 텍스트 형식 메트릭
+외부 의존성 없이 카운터/히스토그램/게이지를 제공한다. 레이블 조합별 시계열은 처음 사용될 때 한 번만
+만들어지고 버킷 배열도 그때 미리 할당되므로, 이후 관측은 버킷 탐색과 덧셈만 수행한다.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# 요청/단계 지연용 기본 버킷 (초)
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# 레이블 조합 수가 상한을 넘으면 이후 조합은 이 값으로 합쳐진다
+OVERFLOW_LABEL = "other"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """레이블 조합별 시계열을 가진 메트릭 공통부"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), max_series: int = 1000):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max(1, max_series)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """레이블 값에 해당하는 시계열 (자주 쓰는 조합은 미리 받아 두고 재사용한다)"""
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: 레이블 수 불일치 ({len(values)} != {len(self.labelnames)})")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None and len(self._children) >= self.max_series:
+                key = (OVERFLOW_LABEL,) * len(self.labelnames)
+                child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """레이블이 없는 카운터 증가"""
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child: _CounterChild) -> List[str]:
+        return [f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # 마지막 칸은 +Inf 버킷
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+class Histogram(_Metric):
+    """고정 버킷 히스토그램"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+        max_series: int = 1000
+    ):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.upper_bounds = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        """레이블이 없는 히스토그램 관측"""
+        self.labels().observe(value)
+
+    def _render_child(self, values, child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.upper_bounds + (math.inf,), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Gauge(_Metric):
+    """수집 시점에 값을 읽어 오는 게이지 (값은 callback이 반환하는 {레이블 값 튜플: 값})"""
+
+    kind = "gauge"
+    # 표본 이름에 붙는 접미사
+    suffix = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.callback().items():
+            lines.append(f"{self.name}{self.suffix}{_format_labels(self.labelnames, values)} {_format_value(float(value))}")
+        return lines
+
+class CallbackCounter(Gauge):
+    """수집 시점에 누적 값을 읽어 오는 카운터 (다른 객체가 세고 있는 누적 수 노출용)
+
+    callback이 반환하는 값은 단조 증가해야 하며 (프로세스 재시작 시에만 0으로 돌아간다), Counter와 같이 _total 접미사로 출력된다.
+    """
+
+    kind = "counter"
+    suffix = "_total"
+
+class MetricsRegistry:
+    """메트릭 등록 및 텍스트 형식 출력"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"이미 등록된 메트릭: {metric.name}")
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), max_series: int = 1000) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, max_series))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+        max_series: int = 1000
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets, max_series))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, callback, labelnames))
+
+    def callback_counter(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackCounter:
+        return self.register(CallbackCounter(name, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식 (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in list(self._metrics):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} 수집 실패: {_escape(str(e))}")
+        lines.append("")
+        return "\n".join(lines)
+
+def _route_path(scope) -> str:
+    """요청의 라우트 경로 템플릿 (맞는 라우트가 없으면 "unmatched")
+
+    라우팅 전에 응답한 요청(예: 수용 제어로 거절된 요청)은 scope에 라우트가 없으므로 라우트 표를 직접 맞춰 본다.
+    """
+    path = getattr(scope.get("route"), "path", None)
+    if path:
+        return path
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if getattr(match, "name", None) == "FULL":
+            return getattr(route, "path", None) or "unmatched"
+    return "unmatched"
+
+class RequestMetricsMiddleware:
+    """엔드포인트(라우트 경로) 별 요청 수/지연 기록 ASGI 미들웨어"""
+
+    def __init__(self, app, requests: Counter, duration: Histogram, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.requests = requests
+        self.duration = duration
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            path = _route_path(scope)
+            if path not in self.exclude_paths:
+                self.requests.labels(path, scope["method"], str(status[0])).inc()
+                self.duration.labels(path, scope["method"]).observe(time.perf_counter() - started)
@@ -0,0 +1,446 @@
+"""
+최적화 서버 Python 클라이언트
+일괄 작업 등에서 /optimize, /recommend-templates, /feedback을 호출하기 위한 비동기 클라이언트.
+
+- OptimizerClient: httpx 연결 풀(keep-alive)을 재사용하고 동시 요청 수를 제한한다.
+  여러 항목은 /optimize/batch, /optimize/stream, /feedback/batch를 사용하며, 서버에 해당 엔드포인트가
+  없으면(404/405) 단건 요청으로 자동 전환한다. 429/503과 연결 실패는 지터를 둔 지수 백오프로 재시도한다.
+- InProcessOptimizerClient: 같은 프로세스에서 서버 함수를 직접 호출한다 (HTTP 없음).
+
+두 클라이언트는 같은 메서드와 같은 모델(schemas.py)을 사용한다.
+
+    async with OptimizerClient("http://localhost:8001") as client:
+        result = await client.optimize("a cat on a sofa", "image", model="midjourney")
+        results = await client.optimize_many(requests)
+"""
+
+import asyncio
+import json
+import os
+import random
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Union
+
+import httpx
+
+from schemas import (
+    BatchOptimizationItemResult,
+    FeedbackBatchItemResult,
+    FeedbackBatchRequest,
+    FeedbackBatchResponse,
+    FeedbackRequest,
+    PromptOptimizationRequest,
+    PromptOptimizationResponse,
+    TemplateRecommendationResponse
+)
+
+DEFAULT_BASE_URL = os.getenv("OPTIMIZER_URL", "http://localhost:8001")
+# 재시도할 응답 상태 (수용 제어 거절, 일시적 사용 불가) - 둘 다 서버가 요청을 처리하지 않은 경우이다
+RETRY_STATUSES = frozenset((429, 503))
+# 엔드포인트가 없는 서버로 판단할 응답 상태
+UNSUPPORTED_STATUSES = frozenset((404, 405))
+
+OptimizeInput = Union[PromptOptimizationRequest, Mapping[str, Any]]
+FeedbackInput = Union[FeedbackRequest, Mapping[str, Any]]
+
+class OptimizerClientError(Exception):
+    """요청 실패 (status는 HTTP 상태, 연결 실패면 None)"""
+
+    def __init__(self, status: Optional[int], detail: str):
+        super().__init__(f"{status}: {detail}" if status is not None else detail)
+        self.status = status
+        self.detail = detail
+
+def _as_request(item: OptimizeInput) -> PromptOptimizationRequest:
+    if isinstance(item, PromptOptimizationRequest):
+        return item
+    return PromptOptimizationRequest.model_validate(item)
+
+def _as_payload(item: Union[OptimizeInput, FeedbackInput]) -> Dict[str, Any]:
+    if hasattr(item, "model_dump"):
+        return item.model_dump(exclude_none=True)
+    return dict(item)
+
+def _item_error(result: BatchOptimizationItemResult) -> OptimizerClientError:
+    return OptimizerClientError(None, result.error or "알 수 없는 오류")
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+async def _aiter_chunks(
+    requests: Union[Iterable[Any], AsyncIterable[Any]], size: int
+) -> AsyncIterator[List[Any]]:
+    """동기/비동기 반복자를 size개씩 나누기 (입력 전체를 메모리에 올리지 않는다)"""
+    chunk: List[Any] = []
+    if hasattr(requests, "__aiter__"):
+        async for item in requests:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for item in requests:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+class OptimizerClient:
+    """HTTP 최적화 서버 클라이언트 (연결 풀/동시 요청 수 제한/재시도)"""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        max_connections: int = 32,
+        max_keepalive_connections: int = 16,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 16,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.2,
+        retry_max_backoff: float = 5.0,
+        batch_size: int = 500,
+        headers: Optional[Mapping[str, str]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.batch_size = max(1, batch_size)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=timeout,
+            headers=headers,
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        # 엔드포인트 지원 여부 (처음 404/405를 받으면 False로 기억한다)
+        self._supported: Dict[str, bool] = {}
+        self.retries = 0
+
+    async def __aenter__(self) -> "OptimizerClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    # --------------------------------------------
+    # 전송
+    # --------------------------------------------
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """지수 백오프 + 전체 지터 (Retry-After가 있으면 그 이상 기다린다)"""
+        delay = random.uniform(0, min(self.retry_max_backoff, self.retry_backoff * (2 ** attempt)))
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after", 0))
+            except ValueError:
+                retry_after = 0.0
+            delay = max(delay, min(retry_after, self.retry_max_backoff) + random.uniform(0, self.retry_backoff))
+        return delay
+
+    async def _request(self, method: str, path: str, payload: Any = None) -> httpx.Response:
+        """요청 전송 (429/503/연결 실패는 재시도, 그 외 오류 상태는 OptimizerClientError)"""
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, path, json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if attempt >= self.max_retries:
+                    raise OptimizerClientError(None, f"연결 실패: {e}")
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise OptimizerClientError(response.status_code, self._detail(response))
+            self.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _detail(response: httpx.Response) -> str:
+        try:
+            return str(response.json().get("detail", response.text))
+        except ValueError:
+            return response.text
+
+    async def _request_optional(self, path: str, payload: Any) -> Optional[httpx.Response]:
+        """서버에 엔드포인트가 없으면 None (이후에는 요청하지 않는다)"""
+        if self._supported.get(path) is False:
+            return None
+        try:
+            response = await self._request("POST", path, payload)
+        except OptimizerClientError as e:
+            if e.status in UNSUPPORTED_STATUSES:
+                self._supported[path] = False
+                return None
+            raise
+        self._supported[path] = True
+        return response
+
+    # --------------------------------------------
+    # 최적화
+    # --------------------------------------------
+
+    async def optimize(
+        self,
+        prompt: Union[str, OptimizeInput],
+        category: Optional[str] = None,
+        model: Optional[str] = None,
+        **fields: Any
+    ) -> PromptOptimizationResponse:
+        """프롬프트 하나 최적화 (PromptOptimizationRequest 또는 prompt/category/model 인자)"""
+        if isinstance(prompt, str):
+            request = PromptOptimizationRequest(prompt=prompt, category=category, model=model, **fields)
+        else:
+            request = _as_request(prompt)
+        response = await self._request("POST", "/optimize", _as_payload(request))
+        return PromptOptimizationResponse.model_validate_json(response.content)
+
+    async def optimize_many(
+        self, requests: Iterable[OptimizeInput]
+    ) -> List[Union[PromptOptimizationResponse, OptimizerClientError]]:
+        """여러 프롬프트 최적화 (입력 순서대로, 실패한 항목은 OptimizerClientError)
+
+        batch_size개씩 /optimize/batch로 보내고, 서버가 지원하지 않으면 단건 요청을 동시에 보낸다.
+        """
+        payloads = [_as_payload(item) for item in requests]
+        chunks = list(_chunks(payloads, self.batch_size))
+        results = await asyncio.gather(*(self._optimize_chunk(chunk) for chunk in chunks))
+        return [result for chunk in results for result in chunk]
+
+    async def _optimize_chunk(
+        self, payloads: List[Dict[str, Any]]
+    ) -> List[Union[PromptOptimizationResponse, OptimizerClientError]]:
+        response = await self._request_optional("/optimize/batch", {"items": payloads})
+        if response is None:
+            return await asyncio.gather(*(self._optimize_single(payload) for payload in payloads))
+        results: List[Union[PromptOptimizationResponse, OptimizerClientError]] = [None] * len(payloads)
+        for item in response.json()["results"]:
+            result = BatchOptimizationItemResult.model_validate(item)
+            results[result.index] = (
+                PromptOptimizationResponse.model_validate(result.result)
+                if result.status == "success" else _item_error(result)
+            )
+        return results
+
+    async def _optimize_single(self, payload: Dict[str, Any]) -> Union[PromptOptimizationResponse, OptimizerClientError]:
+        try:
+            return await self.optimize(payload)
+        except OptimizerClientError as e:
+            return e
+
+    async def optimize_stream(
+        self, requests: Union[Iterable[OptimizeInput], AsyncIterable[OptimizeInput]]
+    ) -> AsyncIterator[BatchOptimizationItemResult]:
+        """많은 프롬프트를 스트리밍으로 최적화 (/optimize/stream, 결과는 처리되는 대로 반환)
+
+        입력 전체를 메모리에 올리지 않으며, 스트리밍은 재시도하지 않는다.
+        서버가 스트리밍을 지원하지 않으면 batch_size개씩 optimize_many로 처리한다.
+        """
+        if self._supported.get("/optimize/stream") is not False:
+            async with self._semaphore:
+                async with self._client.stream(
+                    "POST", "/optimize/stream", content=self._ndjson(requests),
+                    headers={"content-type": "application/x-ndjson"}
+                ) as response:
+                    if response.status_code not in UNSUPPORTED_STATUSES:
+                        if response.status_code >= 400:
+                            await response.aread()
+                            raise OptimizerClientError(response.status_code, self._detail(response))
+                        self._supported["/optimize/stream"] = True
+                        async for line in response.aiter_lines():
+                            if line.strip():
+                                yield BatchOptimizationItemResult.model_validate_json(line)
+                        return
+            self._supported["/optimize/stream"] = False
+
+        # 스트리밍 미지원 서버 (요청 본문을 보내기 전에 거절되었으므로 입력은 아직 소비되지 않았다)
+        offset = 0
+        async for chunk in _aiter_chunks(requests, self.batch_size):
+            for position, result in enumerate(await self.optimize_many(chunk)):
+                if isinstance(result, OptimizerClientError):
+                    yield BatchOptimizationItemResult(index=offset + position, status="error", error=result.detail)
+                else:
+                    yield BatchOptimizationItemResult(index=offset + position, status="success", result=result.model_dump())
+            offset += len(chunk)
+
+    @staticmethod
+    async def _ndjson(requests: Union[Iterable[OptimizeInput], AsyncIterable[OptimizeInput]]) -> AsyncIterator[bytes]:
+        if hasattr(requests, "__aiter__"):
+            async for item in requests:
+                yield json.dumps(_as_payload(item), ensure_ascii=False).encode("utf-8") + b"\n"
+        else:
+            for item in requests:
+                yield json.dumps(_as_payload(item), ensure_ascii=False).encode("utf-8") + b"\n"
+
+    # --------------------------------------------
+    # 템플릿 추천
+    # --------------------------------------------
+
+    async def recommend_templates(
+        self,
+        user_input: str,
+        category: str,
+        model: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> TemplateRecommendationResponse:
+        payload = {"user_input": user_input, "category": category, "model": model, "context": context or {}}
+        response = await self._request("POST", "/recommend-templates", payload)
+        return TemplateRecommendationResponse.model_validate_json(response.content)
+
+    # --------------------------------------------
+    # 피드백
+    # --------------------------------------------
+
+    async def submit_feedback(self, feedback: Optional[FeedbackInput] = None, **fields: Any) -> Dict[str, Any]:
+        """피드백 하나 제출 (FeedbackRequest 또는 task_id/span_id/reward 등 인자)"""
+        request = FeedbackRequest.model_validate(_as_payload(feedback) if feedback is not None else fields)
+        response = await self._request("POST", "/feedback", _as_payload(request))
+        return response.json()
+
+    async def submit_feedback_many(self, items: Iterable[Mapping[str, Any]]) -> List[FeedbackBatchItemResult]:
+        """피드백 여러 개 제출 (FeedbackBatchItem 형식, 입력 순서대로 항목별 결과)
+
+        batch_size개씩 /feedback/batch로 보내고, 서버가 지원하지 않으면 /feedback으로 하나씩 보낸다
+        (이때는 reward가 있는 항목만 기록할 수 있다).
+        """
+        payloads = [_as_payload(item) for item in items]
+        results: List[FeedbackBatchItemResult] = []
+        for chunk in _chunks(payloads, self.batch_size):
+            response = await self._request_optional("/feedback/batch", {"items": chunk})
+            if response is None:
+                chunk_results = await asyncio.gather(*(self._feedback_single(index, payload) for index, payload in enumerate(chunk)))
+            else:
+                chunk_results = [FeedbackBatchItemResult.model_validate(item) for item in response.json()["results"]]
+            offset = len(results)
+            for result in chunk_results:
+                result.index += offset
+            results.extend(chunk_results)
+        return results
+
+    async def _feedback_single(self, index: int, payload: Dict[str, Any]) -> FeedbackBatchItemResult:
+        try:
+            response = await self.submit_feedback(payload)
+        except (OptimizerClientError, ValueError) as e:
+            return FeedbackBatchItemResult(index=index, status="error", error=str(e))
+        return FeedbackBatchItemResult(index=index, status="success", reward=response.get("reward"))
+
+class InProcessOptimizerClient:
+    """같은 프로세스의 최적화 서버 함수를 직접 호출하는 클라이언트 (HTTP/직렬화 없음)
+
+    OptimizerClient와 같은 메서드를 제공한다. start_services=True이면 Span 기록/학습 등
+    서버의 백그라운드 서비스를 이 클라이언트가 시작하고 종료한다 (아니면 최적화/추천만 사용 가능).
+    """
+
+    def __init__(self, start_services: bool = False, batch_size: int = 500):
+        import main
+        self._main = main
+        self.start_services = start_services
+        self.batch_size = max(1, batch_size)
+        self._started = False
+
+    async def __aenter__(self) -> "InProcessOptimizerClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        if self.start_services:
+            await asyncio.to_thread(self._main.start_owner_services)
+        await asyncio.to_thread(self._main.template_catalog.reload)
+        self._started = True
+
+    async def aclose(self) -> None:
+        if self._started and self.start_services:
+            await asyncio.to_thread(self._main.stop_owner_services)
+        self._started = False
+
+    async def _call_endpoint(self, endpoint, *args: Any) -> Any:
+        """엔드포인트 함수 호출 (HTTPException -> OptimizerClientError)"""
+        from fastapi import HTTPException
+        try:
+            return await endpoint(*args)
+        except HTTPException as e:
+            raise OptimizerClientError(e.status_code, str(e.detail))
+
+    async def optimize(
+        self,
+        prompt: Union[str, OptimizeInput],
+        category: Optional[str] = None,
+        model: Optional[str] = None,
+        **fields: Any
+    ) -> PromptOptimizationResponse:
+        if isinstance(prompt, str):
+            request = PromptOptimizationRequest(prompt=prompt, category=category, model=model, **fields)
+        else:
+            request = _as_request(prompt)
+        category = request.category.lower()
+        if category not in ("image", "video", "text"):
+            raise OptimizerClientError(400, f"지원하지 않는 카테고리: {category}")
+        task_id = request.task_id or self._main.build_task_id(category, request.prompt)
+        body, _ = await self._main.optimize_and_track_async(request, category, task_id)
+        return PromptOptimizationResponse.model_validate_json(body)
+
+    async def optimize_many(
+        self, requests: Iterable[OptimizeInput]
+    ) -> List[Union[PromptOptimizationResponse, OptimizerClientError]]:
+        payloads = [_as_payload(item) for item in requests]
+        results: List[Union[PromptOptimizationResponse, OptimizerClientError]] = []
+        for chunk in _chunks(payloads, self.batch_size):
+            for result in await asyncio.to_thread(self._main.optimize_batch, chunk):
+                results.append(
+                    PromptOptimizationResponse.model_validate(result.result)
+                    if result.status == "success" else _item_error(result)
+                )
+        return results
+
+    async def optimize_stream(
+        self, requests: Union[Iterable[OptimizeInput], AsyncIterable[OptimizeInput]]
+    ) -> AsyncIterator[BatchOptimizationItemResult]:
+        offset = 0
+        async for chunk in _aiter_chunks(requests, self.batch_size):
+            for result in await asyncio.to_thread(self._main.optimize_batch, [_as_payload(item) for item in chunk]):
+                result.index += offset
+                yield result
+            offset += len(chunk)
+
+    async def recommend_templates(
+        self,
+        user_input: str,
+        category: str,
+        model: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> TemplateRecommendationResponse:
+        return TemplateRecommendationResponse(**self._main.recommend_templates(user_input, category, model))
+
+    async def submit_feedback(self, feedback: Optional[FeedbackInput] = None, **fields: Any) -> Dict[str, Any]:
+        request = FeedbackRequest.model_validate(_as_payload(feedback) if feedback is not None else fields)
+        return await self._call_endpoint(self._main.submit_feedback, request)
+
+    async def submit_feedback_many(self, items: Iterable[Mapping[str, Any]]) -> List[FeedbackBatchItemResult]:
+        payloads = [_as_payload(item) for item in items]
+        results: List[FeedbackBatchItemResult] = []
+        for chunk in _chunks(payloads, self.batch_size):
+            response = await self._call_endpoint(self._main.submit_feedback_batch, FeedbackBatchRequest(items=chunk))
+            chunk_results = FeedbackBatchResponse.model_validate_json(response.body).results
+            offset = len(results)
+            for result in chunk_results:
+                result.index += offset
+            results.extend(chunk_results)
+        return results
@@ -0,0 +1,145 @@
+"""
+소유자 프로세스 IPC
+다중 워커 모드에서 저장소 쓰기와 학습은 소유자 프로세스 하나만 수행한다.
+워커는 Unix 도메인 소켓으로 소유자에게 Span/보상 배치를 전달하고 학습 관련 작업을 요청한다.
+메시지는 한 줄에 하나의 JSON 객체이며, 요청마다 응답 한 줄이 돌아온다.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class OwnerCallError(Exception):
+    """소유자 프로세스에서 작업이 실패함 (error_type은 소유자 쪽 예외 이름)"""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+
+class _OwnerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        operations: Dict[str, Callable[..., Any]] = self.server.operations
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                operation = operations.get(request.get("op"))
+                if operation is None:
+                    raise KeyError(f"알 수 없는 작업: {request.get('op')}")
+                response = {"ok": True, "result": operation(**(request.get("args") or {}))}
+            except Exception as e:
+                response = {"ok": False, "error_type": type(e).__name__, "error": str(e)}
+            try:
+                self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except OSError:
+                return
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class OwnerServer:
+    """소유자 프로세스 작업 서버 (워커 연결마다 스레드 하나)"""
+
+    def __init__(self, path: str, operations: Dict[str, Callable[..., Any]]):
+        self.path = path
+        self.operations = operations
+        self._server: Optional[_ThreadingUnixServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = _ThreadingUnixServer(self.path, _OwnerRequestHandler)
+        self._server.operations = self.operations
+        os.chmod(self.path, 0o600)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="owner-ipc", daemon=True)
+        self._thread.start()
+        logger.info(f"✅ 소유자 IPC 서버 시작: {self.path}")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+class OwnerClient:
+    """워커 쪽 소유자 작업 클라이언트 (스레드마다 연결 하나를 유지)
+
+    idempotent는 두 번 실행되어도 결과가 같은 작업(조회 등)의 이름이다. 나머지 작업은 소유자가 요청을
+    받았을 수 있는 실패(전송 후 응답 전에 연결이 끊김)에서 다시 보내지 않는다.
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0, idempotent: Iterable[str] = ()):
+        self.path = path
+        self.timeout = timeout
+        self.idempotent = frozenset(idempotent)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            connection = (sock, sock.makefile("rb"))
+            self._local.connection = connection
+        return connection
+
+    def _close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            sock, reader = connection
+            try:
+                reader.close()
+                sock.close()
+            except OSError:
+                pass
+
+    def call(self, op: str, *, timeout: Optional[float] = None, **args: Any) -> Any:
+        """소유자 작업 호출 (연결이 끊겼으면 한 번 다시 연결)
+
+        멱등이 아닌 작업은 요청을 보내기 전에 실패한 경우(끊긴 연결에 쓰기 실패)에만 다시 보낸다.
+        timeout을 지정하면 이 호출만 그 시간까지 기다리며, 시간이 지나면 응답이 섞이지 않도록
+        연결을 닫고 다시 시도하지 않는다.
+        """
+        payload = json.dumps({"op": op, "args": args}, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        retryable = op in self.idempotent
+        for attempt in range(2):
+            sent = False
+            try:
+                sock, reader = self._connection()
+                sock.settimeout(self.timeout if timeout is None else max(timeout, 0.001))
+                sock.sendall(payload)
+                sent = True
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("소유자 프로세스 연결이 종료되었습니다")
+                break
+            except socket.timeout:
+                self._close()
+                raise
+            except OSError:
+                self._close()
+                if attempt or (sent and not retryable):
+                    raise
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise OwnerCallError(response.get("error_type", "Exception"), response.get("error", ""))
+        return response.get("result")
+
+    def close(self) -> None:
+        self._close()
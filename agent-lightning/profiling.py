@@ -0,0 +1,278 @@
+"""
+요청 프로파일링
+- 요청 단위: 헤더로 요청하거나 표본 비율에 걸린 요청의 처리 경로를 cProfile로 기록하고,
+  크기가 제한된 디스크 링 버퍼(오래된 프로파일부터 삭제)에 pstats 파일로 저장한다.
+- 연속 표본 추출: 낮은 주기로 모든 스레드의 호출 스택을 표본 추출하여 flamegraph용
+  접힌 스택(collapsed stack, "바깥;안쪽 횟수") 형식으로 집계한다.
+둘 다 비활성화되어 있으면 요청 처리 경로에서는 플래그 확인 외에 아무것도 하지 않는다.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-agl-profile"
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9]{13}-[0-9]+-[0-9]+$")
+# 프로파일링하지 않는 요청이 받는 공유 컨텍스트 (할당 없음, capture 반환값과 is로 비교할 수 있다)
+NO_PROFILE = nullcontext()
+
+class ProfileStore:
+    """프로파일 링 버퍼 (디렉터리 하나, 최대 max_profiles개)
+
+    프로파일 ID는 "생성 시각(ms)-PID-일련번호"이므로 이름 순서가 생성 순서이며,
+    여러 워커 프로세스가 같은 디렉터리를 써도 ID가 겹치지 않는다.
+    """
+
+    def __init__(self, directory: str, max_profiles: int = 50):
+        self.directory = directory
+        self.max_profiles = max(1, max_profiles)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError(f"잘못된 프로파일 ID: {profile_id}")
+        return os.path.join(self.directory, f"{profile_id}{extension}")
+
+    def save(self, profile: cProfile.Profile, metadata: Dict[str, Any]) -> str:
+        """프로파일 저장 후 오래된 프로파일 정리 (프로파일 ID 반환)"""
+        with self._lock:
+            self._sequence += 1
+            profile_id = f"{int(time.time() * 1000):013d}-{os.getpid()}-{self._sequence}"
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(self._path(profile_id, ".prof"))
+        with open(self._path(profile_id, ".json"), "w", encoding="utf-8") as f:
+            json.dump({"profile_id": profile_id, **metadata}, f, ensure_ascii=False)
+        self._trim()
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".prof") and _PROFILE_ID_PATTERN.match(name[:-5]))
+
+    def _trim(self) -> None:
+        ids = self._ids()
+        for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+            for extension in (".prof", ".json"):
+                try:
+                    os.unlink(self._path(profile_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """저장된 프로파일 메타데이터 (최신 순)"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, ".json"), encoding="utf-8") as f:
+                    metadata = json.load(f)
+                metadata["size_bytes"] = os.path.getsize(self._path(profile_id, ".prof"))
+            except (OSError, ValueError):
+                continue
+            profiles.append(metadata)
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """pstats 파일 경로 (없으면 None, 잘못된 ID면 ValueError)"""
+        path = self._path(profile_id, ".prof")
+        return path if os.path.exists(path) else None
+
+    def summary(self, profile_id: str, limit: int = 50, sort: str = "cumulative") -> Optional[str]:
+        """pstats 텍스트 요약 (누적 시간 상위 limit개 함수)"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+class _ProfileCapture:
+    """with 블록 하나의 cProfile 기록 (블록 안에서 await하지 않는 동기 구간에 사용)"""
+
+    __slots__ = ("profiler", "endpoint", "trigger", "metadata", "profile", "started", "profile_id")
+
+    def __init__(self, profiler: "RequestProfiler", endpoint: str, trigger: str, metadata: Optional[Dict[str, Any]]):
+        self.profiler = profiler
+        self.endpoint = endpoint
+        self.trigger = trigger
+        self.metadata = metadata or {}
+        self.profile = cProfile.Profile()
+        self.started = 0.0
+        self.profile_id: Optional[str] = None
+
+    def __enter__(self) -> "_ProfileCapture":
+        self.started = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.profile.disable()
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        try:
+            self.profile_id = self.profiler.store.save(self.profile, {
+                "endpoint": self.endpoint,
+                "trigger": self.trigger,
+                "created_at": time.time(),
+                "duration_ms": round(duration_ms, 3),
+                "error": exc_type.__name__ if exc_type else None,
+                **self.metadata
+            })
+            self.profiler.captured += 1
+        except OSError as e:
+            logger.warning(f"⚠️ 프로파일 저장 실패: {e}")
+        finally:
+            self.profiler._active.release()
+
+class RequestProfiler:
+    """요청 단위 프로파일링 결정 및 기록
+
+    header_enabled면 X-AGL-Profile 헤더가 있는 요청을(header_token이 있으면 값이 같을 때만),
+    sample_rate > 0 이면 그 비율만큼의 요청을 기록한다. 동시에 하나의 요청만 기록한다.
+    """
+
+    def __init__(
+        self,
+        store: ProfileStore,
+        header_enabled: bool = False,
+        header_token: str = "",
+        sample_rate: float = 0.0
+    ):
+        self.store = store
+        self.header_enabled = header_enabled
+        self.header_token = header_token
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.enabled = header_enabled or self.sample_rate > 0
+        self.captured = 0
+        self.skipped_busy = 0
+        self._active = threading.Lock()
+
+    def capture(self, headers: Mapping[str, str], endpoint: str, metadata: Optional[Dict[str, Any]] = None):
+        """프로파일링 대상이면 기록 컨텍스트, 아니면 아무것도 하지 않는 컨텍스트"""
+        if not self.enabled:
+            return NO_PROFILE
+        trigger = None
+        if self.header_enabled:
+            value = headers.get(PROFILE_HEADER)
+            if value is not None and (not self.header_token or value == self.header_token):
+                trigger = "header"
+        if trigger is None and self.sample_rate > 0 and random.random() < self.sample_rate:
+            trigger = "sample"
+        if trigger is None:
+            return NO_PROFILE
+        if not self._active.acquire(blocking=False):
+            self.skipped_busy += 1
+            return NO_PROFILE
+        return _ProfileCapture(self, endpoint, trigger, metadata)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "header_enabled": self.header_enabled,
+            "header_token_required": bool(self.header_token),
+            "sample_rate": self.sample_rate,
+            "captured": self.captured,
+            "skipped_busy": self.skipped_busy,
+            "directory": self.store.directory,
+            "max_profiles": self.store.max_profiles
+        }
+
+class StackSampler:
+    """연속 스택 표본 추출 (interval마다 모든 스레드의 호출 스택을 접힌 스택으로 집계)
+
+    서로 다른 스택 수가 max_stacks를 넘으면 이후 새 스택은 "[other]"로 합쳐진다.
+    """
+
+    def __init__(self, interval: float = 0.05, max_stacks: int = 10000, max_depth: int = 64, name: str = "stack-sampler"):
+        self.interval = interval
+        self.max_stacks = max(1, max_stacks)
+        self.max_depth = max_depth
+        self.name = name
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _collapse(self, frame) -> str:
+        names: List[str] = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def sample(self) -> None:
+        """현재 모든 스레드의 스택 표본 하나 추출 (표본 추출 스레드 자신은 제외)"""
+        own = threading.get_ident()
+        stacks = [self._collapse(frame) for ident, frame in sys._current_frames().items() if ident != own]
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                    self._stacks[stack] = self._stacks.get(stack, 0) + 1
+                else:
+                    self._stacks["[other]"] = self._stacks.get("[other]", 0) + 1
+
+    def collapsed(self) -> str:
+        """flamegraph.pl / speedscope에 바로 넣을 수 있는 접힌 스택 텍스트 (많은 순)"""
+        with self._lock:
+            items = sorted(self._stacks.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+            self.started_at = time.time()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"✅ 연속 스택 표본 추출 시작: interval={self.interval}s")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.sample()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            distinct = len(self._stacks)
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "distinct_stacks": distinct,
+            "max_stacks": self.max_stacks,
+            "started_at": self.started_at
+        }
@@ -0,0 +1,276 @@
+"""
+최적화 결과 캐시
+정규화된 요청 지문(fingerprint)을 키로 하는 크기/TTL 제한 LRU 캐시
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+def request_fingerprint(
+    prompt: str,
+    category: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None
+) -> str:
+    """최적화 요청의 정규화된 지문
+
+    카테고리는 소문자로 정규화하고 옵션은 키 순서와 무관하게 직렬화한다.
+    프롬프트와 모델은 최적화 결과에 그대로 반영되므로 원문을 사용한다.
+    """
+    normalized = json.dumps(
+        [category.lower(), model, prompt, options or {}],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """크기/TTL 제한 LRU 캐시
+
+    항목은 학습 스냅샷 버전과 함께 관리되며, 새 버전으로 조회/저장하면 캐시 전체가 무효화되고
+    이전 버전은 폐기된다. 폐기된 버전(교체 전 스냅샷으로 시작한 느린 요청)의 저장은 무시하고 조회는
+    적중하지 않으므로 새 항목을 지우지 않는다. 저장된 값은 읽기 전용으로 취급해야 한다.
+    """
+
+    # 폐기된 버전을 기억하는 수
+    RETIRED_VERSIONS = 16
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._retired: "OrderedDict[Hashable, None]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_rejections = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _sync_version(self, version: Hashable) -> bool:
+        """새 버전이면 캐시 전체 무효화, 폐기된 버전이면 False (잠금 상태에서 호출)"""
+        if version == self._version:
+            return True
+        if version in self._retired:
+            self.stale_rejections += 1
+            return False
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+        if self._version is not None:
+            self._retired[self._version] = None
+            while len(self._retired) > self.RETIRED_VERSIONS:
+                self._retired.popitem(last=False)
+        self._version = version
+        return True
+
+    def get(self, key: Hashable, version: Hashable = None) -> Optional[Any]:
+        """캐시 조회 (없거나 만료되었으면 None)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if not self._sync_version(version):
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Hashable = None) -> None:
+        """캐시 저장 (용량 초과 시 가장 오래 사용되지 않은 항목 제거, 폐기된 버전이면 무시)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._sync_version(version):
+                return
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """캐시 전체 무효화"""
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def export_entries(self) -> Tuple[Optional[Hashable], List[Tuple[Hashable, float, Any]]]:
+        """(버전, [(키, 남은 TTL, 값), ...]) - 만료되지 않은 항목을 오래 사용되지 않은 순으로"""
+        with self._lock:
+            now = self._clock()
+            entries = [
+                (key, expires_at - now, value)
+                for key, (expires_at, value) in self._entries.items()
+                if expires_at > now
+            ]
+            return self._version, entries
+
+    def restore_entries(self, version: Hashable, entries: Iterable[Tuple[Hashable, float, Any]]) -> int:
+        """export_entries 결과로 캐시 채우기 (기존 항목은 버림, 복원한 항목 수 반환)
+
+        남은 TTL은 현재 ttl_seconds를 넘지 않게 줄이며, 용량을 넘으면 최근 항목만 남긴다.
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            now = self._clock()
+            self._entries.clear()
+            self._retired.pop(version, None)
+            self._version = version
+            for key, remaining, value in entries:
+                if remaining > 0:
+                    self._entries[key] = (now + min(remaining, self.ttl_seconds), value)
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 통계"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_rejections": self.stale_rejections
+            }
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # 이벤트 루프에서 기다리는 호출의 (loop, future) - SingleFlight._lock으로 보호
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+
+def _resolve_waiter(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+class SingleFlight:
+    """같은 키의 동시 계산을 하나로 합침
+
+    먼저 도착한 호출만 계산하고, 계산 중에 같은 키로 들어온 호출은 그 결과(또는 예외)를 함께 받는다.
+    계산이 끝나면 키가 지워지므로 결과 보관은 캐시가 담당한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable) -> Tuple[_Flight, bool]:
+        """키의 진행 중인 계산 (없으면 새로 만들고 leader=True)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        return flight, leader
+
+    def _lead(self, key: Hashable, flight: _Flight, compute: Callable[[], T]) -> T:
+        try:
+            flight.result = compute()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                flight.done.set()
+                waiters, flight.waiters = flight.waiters, []
+            for loop, future in waiters:
+                try:
+                    loop.call_soon_threadsafe(_resolve_waiter, future)
+                except RuntimeError:
+                    # 기다리던 루프가 이미 닫힘
+                    pass
+
+    def do(self, key: Hashable, compute: Callable[[], T]) -> Tuple[T, bool]:
+        """(결과, 다른 호출의 계산을 공유했는지 여부) 반환"""
+        flight, leader = self._join(key)
+        if leader:
+            return self._lead(key, flight, compute), False
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    async def do_async(self, key: Hashable, compute: Callable[[], T]) -> Tuple[T, bool]:
+        """이벤트 루프용 do (계산과 기다림 모두 루프를 막지 않는다)
+
+        먼저 도착한 호출은 compute를 스레드에서 실행하므로, 계산하는 동안 같은 키로 들어온 코루틴과
+        다른 스레드(스트리밍/일괄 처리)의 호출이 결과를 함께 받는다. 기다리는 코루틴은 스레드를 차지하지
+        않고 루프의 future로 깨어난다.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            return await asyncio.to_thread(self._lead, key, flight, compute), False
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if flight.done.is_set():
+                future.set_result(None)
+            else:
+                flight.waiters.append((loop, future))
+        await future
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    def stats(self) -> Dict[str, Any]:
+        """계산/공유 횟수"""
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "computed": self.leaders,
+                "coalesced": self.coalesced
+            }
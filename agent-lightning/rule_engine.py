@@ -0,0 +1,282 @@
+"""
+프롬프트 최적화 규칙 엔진
+선언적 규칙 테이블을 (category, model) 별 단일 다중 패턴 매처로 미리 컴파일하여
+규칙 수와 관계없이 프롬프트를 한 번만 스캔한다.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# ============================================
+# 규칙 정의
+# ============================================
+
+@dataclass(frozen=True)
+class OptimizationRule:
+    """최적화 규칙
+
+    absent의 키워드가 프롬프트에 하나도 없을 때(그리고 word_count_below 조건을 만족할 때) 적용된다.
+    적용 시 prefix/append로 프롬프트를 보강하고 improvement를 기록하거나,
+    negative가 지정된 경우 부정 프롬프트 제안만 추가한다.
+    """
+    rule_id: str
+    category: str
+    absent: Tuple[str, ...] = ()
+    models: Optional[Tuple[str, ...]] = None  # None이면 모든 모델에 적용
+    case_sensitive: bool = False
+    word_count_below: Optional[int] = None
+    prefix: str = ""
+    append: str = ""
+    improvement: Optional[str] = None
+    negative: Optional[str] = None
+
+# 기본 규칙 테이블 (테이블 순서대로 적용된다)
+DEFAULT_RULES: Tuple[OptimizationRule, ...] = (
+    # 이미지
+    OptimizationRule(
+        rule_id="image.resolution",
+        category="image",
+        absent=("4k", "8k"),
+        append=", 4k, ultra detailed",
+        improvement="고해상도 키워드 추가",
+    ),
+    OptimizationRule(
+        rule_id="image.midjourney.params",
+        category="image",
+        models=("midjourney",),
+        absent=("--v", "--style"),
+        case_sensitive=True,
+        append=" --v 6 --style raw",
+        improvement="Midjourney 버전 및 스타일 파라미터 추가",
+    ),
+    OptimizationRule(
+        rule_id="image.composition",
+        category="image",
+        absent=("composition", "lighting"),
+        append=", professional composition, cinematic lighting",
+        improvement="전문적인 구도 및 조명 지시 추가",
+    ),
+    OptimizationRule(
+        rule_id="image.negative.blurry",
+        category="image",
+        absent=("blurry",),
+        negative="blurry",
+    ),
+    OptimizationRule(
+        rule_id="image.negative.low_quality",
+        category="image",
+        absent=("low quality",),
+        negative="low quality",
+    ),
+    # 동영상
+    OptimizationRule(
+        rule_id="video.motion",
+        category="video",
+        absent=("motion", "movement"),
+        append=", smooth motion, natural movement",
+        improvement="자연스러운 모션 지시 추가",
+    ),
+    OptimizationRule(
+        rule_id="video.camera",
+        category="video",
+        absent=("camera",),
+        append=", cinematic camera movement",
+        improvement="시네마틱 카메라 워크 추가",
+    ),
+    OptimizationRule(
+        rule_id="video.sora.consistency",
+        category="video",
+        models=("sora",),
+        absent=("consistent",),
+        append=", consistent style and lighting",
+        improvement="스타일 일관성 강화",
+    ),
+    OptimizationRule(
+        rule_id="video.frame_rate",
+        category="video",
+        absent=("fps", "frame rate"),
+        append=", 24fps",
+        improvement="프레임 레이트 명시",
+    ),
+    # 텍스트
+    OptimizationRule(
+        rule_id="text.structure",
+        category="text",
+        word_count_below=10,
+        prefix="다음 주제에 대해 상세하고 전문적인 내용을 작성해주세요: ",
+        improvement="프롬프트 구조화 및 명확성 개선",
+    ),
+    OptimizationRule(
+        rule_id="text.output_format",
+        category="text",
+        absent=("형식", "format"),
+        append="\n출력 형식: 구조화된 마크다운 형식",
+        improvement="출력 형식 명시",
+    ),
+)
+
+# ============================================
+# 다중 패턴 매처
+# ============================================
+
+# (키워드, 대소문자 구분 여부)
+KeywordKey = Tuple[str, bool]
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """트라이를 정규식으로 변환 (같은 위치에서는 가장 긴 키워드가 선택된다)"""
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # 종료 노드에서는 더 긴 키워드를 먼저 시도하고, 실패하면 현재 키워드로 매칭한다
+    return "(?:" + body + ")?" if terminal else body
+
+class KeywordMatcher:
+    """여러 키워드의 부분 문자열 포함 여부를 한 번의 스캔으로 판정하는 매처
+
+    소문자로 변환한 텍스트를 트라이 기반 정규식으로 한 번 스캔한다. 각 위치에서는 가장 긴
+    키워드만 보고되므로, 그 키워드의 접두사인 키워드는 컴파일 시 미리 계산해 함께 포함시킨다.
+    대소문자를 구분하는 키워드는 매칭 위치에서 원문과 다시 비교한다.
+    """
+
+    def __init__(self, keywords: Iterable[KeywordKey]):
+        self.keywords: Tuple[KeywordKey, ...] = tuple(dict.fromkeys(keywords))
+        self._by_lowered: Dict[str, List[KeywordKey]] = {}
+        for key in self.keywords:
+            self._by_lowered.setdefault(key[0].lower(), []).append(key)
+
+        lowered = [word for word in self._by_lowered if word]
+        # 빈 키워드는 항상 포함된 것으로 본다 ("" in text 와 동일)
+        self._always: FrozenSet[KeywordKey] = frozenset(self._by_lowered.get("", ()))
+        trie: Dict[str, dict] = {}
+        for word in lowered:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._pattern = re.compile("(?=(" + _trie_pattern(trie) + "))") if lowered else None
+
+        # 매칭된 키워드(소문자) -> 같은 위치에서 함께 매칭되는 접두사 키워드 목록
+        self._prefix_closure: Dict[str, Tuple[str, ...]] = {
+            word: tuple(other for other in lowered if word.startswith(other))
+            for word in lowered
+        }
+
+    def find(self, text: str, lowered: Optional[str] = None) -> FrozenSet[KeywordKey]:
+        """text에 포함된 키워드 집합 반환"""
+        if self._pattern is None:
+            return self._always
+        if lowered is None:
+            lowered = text.lower()
+        aligned = len(lowered) == len(text)
+        found = set(self._always)
+        for match in self._pattern.finditer(lowered):
+            position = match.start()
+            for word in self._prefix_closure[match.group(1)]:
+                for key in self._by_lowered[word]:
+                    if key in found:
+                        continue
+                    keyword, case_sensitive = key
+                    if not case_sensitive:
+                        found.add(key)
+                    elif aligned:
+                        if text.startswith(keyword, position):
+                            found.add(key)
+                    elif keyword in text:
+                        found.add(key)
+        return frozenset(found)
+
+# ============================================
+# 규칙 엔진
+# ============================================
+
+@dataclass(frozen=True)
+class RuleApplication:
+    """규칙 적용 결과"""
+    optimized_prompt: str
+    improvements: List[str]
+    negative_suggestions: List[str]
+    applied_rules: List[str]
+
+class CompiledRuleSet:
+    """(category, model) 하나에 대해 컴파일된 규칙 집합"""
+
+    def __init__(self, rules: Sequence[OptimizationRule]):
+        self.rules = tuple(rules)
+        # 키워드 -> 해당 키워드가 있으면 적용되지 않는 규칙 인덱스
+        self._blocking: Dict[KeywordKey, Tuple[int, ...]] = {}
+        for index, rule in enumerate(self.rules):
+            for keyword in rule.absent:
+                key = (keyword, rule.case_sensitive)
+                self._blocking[key] = self._blocking.get(key, ()) + (index,)
+        self.matcher = KeywordMatcher(self._blocking)
+        self._needs_word_count = any(rule.word_count_below is not None for rule in self.rules)
+
+    def apply(self, prompt: str) -> RuleApplication:
+        """프롬프트에 규칙 적용 (프롬프트는 한 번만 스캔된다)"""
+        blocked = set()
+        for key in self.matcher.find(prompt):
+            blocked.update(self._blocking[key])
+        word_count = len(prompt.split()) if self._needs_word_count else 0
+
+        prefixes: List[str] = []
+        suffixes: List[str] = []
+        improvements: List[str] = []
+        negative_suggestions: List[str] = []
+        applied_rules: List[str] = []
+        for index, rule in enumerate(self.rules):
+            if index in blocked:
+                continue
+            if rule.word_count_below is not None and word_count >= rule.word_count_below:
+                continue
+            applied_rules.append(rule.rule_id)
+            if rule.negative:
+                negative_suggestions.append(rule.negative)
+                continue
+            if rule.prefix:
+                prefixes.append(rule.prefix)
+            if rule.append:
+                suffixes.append(rule.append)
+            if rule.improvement:
+                improvements.append(rule.improvement)
+
+        optimized = "".join(prefixes) + prompt + "".join(suffixes) if prefixes or suffixes else prompt
+        return RuleApplication(
+            optimized_prompt=optimized,
+            improvements=improvements,
+            negative_suggestions=negative_suggestions,
+            applied_rules=applied_rules,
+        )
+
+class RuleEngine:
+    """규칙 테이블을 (category, model) 별 규칙 집합으로 미리 컴파일한 엔진"""
+
+    def __init__(self, rules: Sequence[OptimizationRule] = DEFAULT_RULES):
+        self.rules = tuple(rules)
+        self._compiled: Dict[Tuple[str, Optional[str]], CompiledRuleSet] = {}
+
+        categories = list(dict.fromkeys(rule.category for rule in self.rules))
+        for category in categories:
+            category_rules = [rule for rule in self.rules if rule.category == category]
+            models = dict.fromkeys(model for rule in category_rules for model in (rule.models or ()))
+            # 모델을 지정하지 않은 규칙만으로 구성된 기본 규칙 집합
+            self._compiled[(category, None)] = CompiledRuleSet(
+                [rule for rule in category_rules if rule.models is None]
+            )
+            for model in models:
+                self._compiled[(category, model)] = CompiledRuleSet(
+                    [rule for rule in category_rules if rule.models is None or model in rule.models]
+                )
+
+    def rule_set(self, category: str, model: Optional[str] = None) -> CompiledRuleSet:
+        """(category, model)에 해당하는 컴파일된 규칙 집합 조회"""
+        compiled = self._compiled.get((category, model)) or self._compiled.get((category, None))
+        if compiled is None:
+            raise ValueError(f"지원하지 않는 카테고리: {category}")
+        return compiled
+
+    def apply(self, category: str, model: Optional[str], prompt: str) -> RuleApplication:
+        """(category, model) 규칙을 프롬프트에 적용"""
+        return self.rule_set(category, model).apply(prompt)
@@ -0,0 +1,105 @@
+"""
+최적화 서버 요청/응답 모델
+서버(main.py)와 클라이언트(optimizer_client.py)가 같은 모델을 사용한다.
+서버 모듈을 불러오지 않고도 사용할 수 있도록 pydantic 외의 의존성이 없다.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+class PromptOptimizationRequest(BaseModel):
+    """프롬프트 최적화 요청"""
+    prompt: str = Field(..., description="원본 프롬프트")
+    category: str = Field(..., description="카테고리: image, video, text")
+    model: Optional[str] = Field(None, description="타겟 모델 (예: midjourney, sora, dalle)")
+    options: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 옵션")
+    user_feedback: Optional[Dict[str, Any]] = Field(None, description="사용자 피드백 (선택적)")
+    task_id: Optional[str] = Field(None, description="작업 ID (Agent Lightning용)")
+
+class PromptOptimizationResponse(BaseModel):
+    """프롬프트 최적화 응답"""
+    original_prompt: str
+    optimized_prompt: str
+    improvements: List[str] = Field(default_factory=list, description="개선 사항 목록")
+    quality_score: float = Field(..., ge=0, le=100, description="품질 점수 (0-100)")
+    confidence: float = Field(..., ge=0, le=1, description="신뢰도 (0-1)")
+    recommendations: List[str] = Field(default_factory=list, description="추천 사항")
+    task_id: Optional[str] = Field(None, description="작업 ID (Span 기록 시 포함, 피드백 제출에 사용)")
+    span_id: Optional[str] = Field(None, description="Span ID (Span 기록 시 포함, 피드백 제출에 사용)")
+
+class TemplateRecommendationRequest(BaseModel):
+    """템플릿 추천 요청"""
+    user_input: str = Field(..., description="사용자 입력")
+    category: str = Field(..., description="카테고리: image, video, text")
+    model: Optional[str] = Field(None, description="타겟 모델")
+    context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 컨텍스트")
+
+class TemplateRecommendationResponse(BaseModel):
+    """템플릿 추천 응답"""
+    recommended_templates: List[Dict[str, Any]] = Field(default_factory=list)
+    reasoning: str = Field(..., description="추천 이유")
+    confidence: float = Field(..., ge=0, le=1)
+    catalog_version: Optional[str] = Field(None, description="추천에 사용된 템플릿 카탈로그 버전")
+
+class BatchOptimizationRequest(BaseModel):
+    """일괄 프롬프트 최적화 요청"""
+    # 항목 하나의 검증 실패가 전체 배치를 실패시키지 않도록 항목별로 검증한다
+    items: List[Dict[str, Any]] = Field(..., description="PromptOptimizationRequest 형식의 항목 목록")
+
+class BatchOptimizationItemResult(BaseModel):
+    """일괄 최적화 항목별 결과"""
+    index: int = Field(..., description="요청 items 내 위치")
+    status: str = Field(..., description="success 또는 error")
+    result: Optional[Dict[str, Any]] = Field(None, description="PromptOptimizationResponse 형식의 결과 (task_id/span_id 포함)")
+    error: Optional[str] = Field(None, description="오류 메시지")
+
+class BatchOptimizationResponse(BaseModel):
+    """일괄 프롬프트 최적화 응답"""
+    results: List[BatchOptimizationItemResult] = Field(default_factory=list)
+    total: int
+    succeeded: int
+    failed: int
+
+class FeedbackRequest(BaseModel):
+    """사용자 피드백 요청"""
+    task_id: str = Field(..., description="작업 ID")
+    span_id: Optional[str] = Field(None, description="Span ID")
+    reward: float = Field(..., ge=-1, le=1, description="보상 점수 (-1 ~ 1)")
+    feedback_text: Optional[str] = Field(None, description="피드백 텍스트")
+    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 메타데이터")
+
+class FeedbackBatchItem(BaseModel):
+    """일괄 피드백 항목
+
+    reward가 없으면 quality_score/rating/피드백 플래그로 보상을 계산한다 (calculate_reward_from_feedback과 같은 값).
+    """
+    task_id: str = Field(..., description="작업 ID")
+    span_id: Optional[str] = Field(None, description="Span ID")
+    reward: Optional[float] = Field(None, ge=-1, le=1, description="보상 점수 (-1 ~ 1, 없으면 계산)")
+    quality_score: Optional[float] = Field(None, ge=0, le=100, description="최적화 응답의 품질 점수 (0-100)")
+    rating: Optional[float] = Field(None, ge=1, le=5, description="사용자 평점 (1-5)")
+    satisfied: bool = Field(False, description="만족 여부")
+    used_result: bool = Field(False, description="결과 사용 여부")
+    disappointed: bool = Field(False, description="실망 여부")
+    feedback_text: Optional[str] = Field(None, description="피드백 텍스트")
+    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="추가 메타데이터")
+
+class FeedbackBatchRequest(BaseModel):
+    """일괄 피드백 요청"""
+    # 항목 하나의 검증 실패가 전체 배치를 실패시키지 않도록 항목별로 검증한다
+    items: List[Dict[str, Any]] = Field(..., description="FeedbackBatchItem 형식의 항목 목록")
+
+class FeedbackBatchItemResult(BaseModel):
+    """일괄 피드백 항목별 결과"""
+    index: int = Field(..., description="요청 items 내 위치")
+    status: str = Field(..., description="success 또는 error")
+    reward: Optional[float] = Field(None, description="기록된 보상")
+    error: Optional[str] = Field(None, description="오류 메시지")
+
+class FeedbackBatchResponse(BaseModel):
+    """일괄 피드백 응답"""
+    results: List[FeedbackBatchItemResult] = Field(default_factory=list)
+    total: int
+    succeeded: int
+    failed: int
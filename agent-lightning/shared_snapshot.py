@@ -0,0 +1,130 @@
+"""
+프로세스 간 공유 학습 스냅샷 파일
+소유자 프로세스가 학습 스냅샷을 버전과 함께 파일로 기록하고, 워커는 파일을 메모리 매핑하여 읽는다.
+새 버전은 임시 파일에 쓴 뒤 이름을 바꿔 원자적으로 교체하므로, 워커는 항상 완전한 스냅샷만 본다.
+
+파일 형식: 헤더(매직 8바이트, 버전 u64, 본문 길이 u64, CRC32 u32) + JSON 본문
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from keyword_index import LearnedKeywords
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"AGLSNAP1"
+_HEADER = struct.Struct("<8sQQI")
+
+def _to_plain(value: Any) -> Any:
+    """MappingProxyType/tuple을 JSON 직렬화 가능한 형태로 변환 (학습 키워드는 보상과 함께 기록해 순위를 유지)"""
+    if isinstance(value, LearnedKeywords):
+        return value.to_plain()
+    if isinstance(value, Mapping):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    return value
+
+def write_snapshot_file(path: str, version: int, entries: Mapping[Tuple[str, str], Mapping[str, Any]]) -> None:
+    """스냅샷 파일 기록 (임시 파일 + 이름 변경)"""
+    payload = json.dumps(
+        [[category, model, _to_plain(entry)] for (category, model), entry in entries.items()],
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    header = _HEADER.pack(SNAPSHOT_MAGIC, version, len(payload), zlib.crc32(payload))
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def read_snapshot_file(path: str) -> Tuple[int, Dict[Tuple[str, str], Dict[str, Any]]]:
+    """스냅샷 파일 읽기 (메모리 매핑, 손상되었으면 ValueError)"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError(f"스냅샷 파일이 너무 짧습니다: {size} bytes")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, length, checksum = _HEADER.unpack_from(mapped, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("스냅샷 파일 형식이 아닙니다")
+            payload = mapped[_HEADER.size:_HEADER.size + length]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise ValueError("스냅샷 파일 체크섬 불일치")
+    entries = {(category, model): entry for category, model, entry in json.loads(payload)}
+    return version, entries
+
+class SharedSnapshotFollower:
+    """스냅샷 파일 변경 감시 및 적용 (워커 프로세스)
+
+    파일 메타데이터(inode, 수정 시각, 크기)가 바뀐 경우에만 파일을 읽으며,
+    버전이 바뀌었으면 apply(version, entries)를 호출한다.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        apply: Callable[[int, Dict[Tuple[str, str], Dict[str, Any]]], None],
+        poll_interval: float = 1.0,
+        name: str = "shared-snapshot"
+    ):
+        self.path = path
+        self.apply = apply
+        self.poll_interval = poll_interval
+        self.name = name
+        self.version: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> bool:
+        """파일이 바뀌었으면 적용 (적용했으면 True)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+        # 손상된 파일은 다시 바뀔 때까지 한 번만 읽는다
+        self._signature = signature
+        try:
+            version, entries = read_snapshot_file(self.path)
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            logger.warning(f"⚠️ 공유 스냅샷 읽기 실패: {e}")
+            return False
+        self.last_error = None
+        if version == self.version:
+            return False
+        self.apply(version, entries)
+        self.version = version
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.poll_interval):
+            self.poll()
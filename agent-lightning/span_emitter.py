@@ -0,0 +1,312 @@
+"""
+백그라운드 Span/보상 기록기
+요청 처리 경로에서는 제한된 큐에 넣기만 하고, 별도 스레드가 크기 또는 주기 기준으로
+모아서 기록한다. 저장소 쓰기 지연이 이벤트 루프를 막지 않도록 하기 위함이다.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 큐가 가득 찼을 때의 처리 정책
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+
+def _on_event_loop() -> bool:
+    """현재 스레드에서 asyncio 이벤트 루프가 실행 중인지"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+class SpanIdRegistry:
+    """요청 시 발급한 로컬 Span ID -> 저장소가 발급한 Span ID 매핑 (크기 제한 LRU)
+
+    최근 기록한 Span의 조회용 캐시이며, 매핑의 원본은 로컬 Span 저장소의 Span 행이다.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def put(self, local_id: str, backend_id: str) -> None:
+        with self._lock:
+            self._entries[local_id] = backend_id
+            self._entries.move_to_end(local_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, local_id: str) -> Optional[str]:
+        """저장소 Span ID 조회 (캐시에 없으면 None)"""
+        with self._lock:
+            return self._entries.get(local_id)
+
+class PendingRewards:
+    """Span보다 먼저 도착한 보상 (로컬 Span ID별, 크기/시간 제한)
+
+    Span이 기록되면 take()로 꺼내 기록하고, max_age가 지나도록 Span이 오지 않은 보상은
+    expire()로 꺼내 버린다. max_entries를 넘으면 가장 오래 기다린 Span의 보상부터 버린다.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_age: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, max_entries)
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._added_at: Dict[str, float] = {}
+        self._size = 0
+        self.deferred = 0
+        self.released = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, span_id: str, item: Any) -> None:
+        """Span을 기다리는 보상 추가"""
+        with self._lock:
+            if span_id not in self._entries:
+                self._entries[span_id] = []
+                self._added_at[span_id] = self._clock()
+            self._entries[span_id].append(item)
+            self._size += 1
+            self.deferred += 1
+            while self._size > self.max_entries:
+                oldest, items = self._entries.popitem(last=False)
+                del self._added_at[oldest]
+                self._size -= len(items)
+                self.dropped += len(items)
+
+    def take(self, span_id: str) -> List[Any]:
+        """Span의 대기 중인 보상을 꺼냄 (없으면 빈 목록)"""
+        with self._lock:
+            items = self._entries.pop(span_id, None)
+            if items is None:
+                return []
+            del self._added_at[span_id]
+            self._size -= len(items)
+            self.released += len(items)
+            return items
+
+    def expire(self) -> List[Any]:
+        """max_age가 지난 보상을 꺼냄"""
+        expired: List[Any] = []
+        with self._lock:
+            cutoff = self._clock() - self.max_age
+            while self._entries:
+                oldest = next(iter(self._entries))
+                if self._added_at[oldest] > cutoff:
+                    break
+                expired.extend(self._entries.pop(oldest))
+                del self._added_at[oldest]
+            self._size -= len(expired)
+            self.expired += len(expired)
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": self._size,
+                "pending_spans": len(self._entries),
+                "deferred": self.deferred,
+                "released": self.released,
+                "expired": self.expired,
+                "dropped": self.dropped,
+                "max_entries": self.max_entries,
+                "max_age": self.max_age
+            }
+
+class BackgroundEmitter:
+    """제한된 큐와 배치 기록 스레드
+
+    sink는 항목 목록을 받아 한 번에 기록하는 함수이며 기록 스레드에서만 호출된다.
+    overflow가 drop_oldest이면 가장 오래된 항목을 버리고, block이면 block_timeout 동안
+    자리가 나기를 기다린 뒤 새 항목을 버린다 (이벤트 루프 스레드에서는 기다리지 않고 바로 버린다).
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[Any]], None],
+        max_queue: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        block_timeout: float = 0.05,
+        name: str = "span-emitter"
+    ):
+        if overflow not in (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK):
+            raise ValueError(f"지원하지 않는 overflow 정책: {overflow}")
+        self.sink = sink
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.name = name
+
+        self._queue: Deque[Any] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.submitted = 0
+        self.emitted = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """기록 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self.running:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """남은 항목을 모두 기록한 뒤 스레드 종료 (timeout 내 완료 여부 반환)"""
+        with self._lock:
+            self._stopping = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        drained = not thread.is_alive()
+        if not drained:
+            logger.warning(f"⚠️ {self.name}: 종료 대기 시간 초과 (남은 항목 {len(self._queue)}개)")
+        return drained
+
+    def _enqueue(self, item: Any, wait: bool) -> bool:
+        """잠금 상태에서 항목 추가"""
+        if len(self._queue) >= self.max_queue:
+            if self.overflow == OVERFLOW_BLOCK and wait:
+                self._not_full.wait_for(
+                    lambda: len(self._queue) < self.max_queue or self._stopping,
+                    timeout=self.block_timeout
+                )
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == OVERFLOW_BLOCK:
+                    self.dropped += 1
+                    return False
+                self._queue.popleft()
+                self.dropped += 1
+        self._queue.append(item)
+        self.submitted += 1
+        return True
+
+    def submit(self, item: Any) -> bool:
+        """항목 추가 (버려졌으면 False)"""
+        return self.submit_many((item,))[0]
+
+    def submit_many(self, items: Iterable[Any]) -> List[bool]:
+        """여러 항목 추가 (항목별 추가 여부 반환)
+
+        block 정책에서는 한 번 대기 시간을 넘기면 나머지 항목은 기다리지 않고 버린다.
+        이벤트 루프 스레드(비동기 요청 처리기)에서 호출하면 block 정책이어도 기다리지 않고 바로 버린다
+        (대기하면 모든 코루틴이 멈춘다). 대기는 일괄 처리 CLI, 스트리밍 처리 스레드 등에서만 한다.
+        """
+        if not self.running and not self._stopping:
+            self.start()
+        accepted: List[bool] = []
+        with self._lock:
+            if self._stopping:
+                return [False for _ in items]
+            wait = self.overflow == OVERFLOW_BLOCK and not _on_event_loop()
+            for item in items:
+                added = self._enqueue(item, wait)
+                wait = wait and added
+                accepted.append(added)
+            if len(self._queue) >= self.batch_size:
+                self._not_empty.notify()
+        return accepted
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """대기 중인 항목이 모두 기록될 때까지 대기"""
+        with self._lock:
+            self._flush_requested = True
+            self._not_empty.notify()
+            return self._idle.wait_for(lambda: not self._queue and not self._in_flight, timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                self._not_empty.wait_for(
+                    lambda: len(self._queue) >= self.batch_size or self._flush_requested or self._stopping,
+                    timeout=self.flush_interval
+                )
+                if not self._queue:
+                    self._flush_requested = False
+                    self._idle.notify_all()
+                    if self._stopping:
+                        return
+                    continue
+                count = min(self.batch_size, len(self._queue))
+                batch = [self._queue.popleft() for _ in range(count)]
+                self._in_flight = count
+                self._not_full.notify_all()
+
+            started = time.perf_counter()
+            succeeded = True
+            try:
+                self.sink(batch)
+            except Exception as e:
+                succeeded = False
+                logger.warning(f"⚠️ {self.name}: 배치 기록 실패 ({len(batch)}개): {e}")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self._in_flight = 0
+                if succeeded:
+                    self.emitted += len(batch)
+                else:
+                    self.failed_batches += 1
+                self.flushes += 1
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+                if not self._queue:
+                    self._idle.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """큐 깊이 및 기록 지연 통계"""
+        with self._lock:
+            return {
+                "running": self.running,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "overflow_policy": self.overflow,
+                "submitted": self.submitted,
+                "emitted": self.emitted,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "failed_batches": self.failed_batches,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+                "max_flush_ms": round(self.max_flush_ms, 3)
+            }
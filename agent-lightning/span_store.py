@@ -0,0 +1,232 @@
+"""
+로컬 Span/보상 저장소 (SQLite WAL)
+agentlightning이 없으면 대체 저장소로, 있으면 조회용 로컬 사본으로 사용한다.
+쓰기는 전용 연결 하나가 배치 단위 트랜잭션으로 수행하고, 읽기는 읽기 전용 연결 풀을 사용하므로
+WAL 모드에서 읽기와 쓰기가 서로를 막지 않는다.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY,
+    span_id TEXT NOT NULL UNIQUE,
+    backend_span_id TEXT,
+    task_id TEXT,
+    category TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_spans_task_id ON spans (task_id);
+CREATE INDEX IF NOT EXISTS idx_spans_category_model ON spans (category, model);
+CREATE INDEX IF NOT EXISTS idx_spans_model ON spans (model);
+
+CREATE TABLE IF NOT EXISTS rewards (
+    id INTEGER PRIMARY KEY,
+    span_id TEXT NOT NULL,
+    task_id TEXT,
+    reward REAL NOT NULL,
+    feedback_text TEXT,
+    created_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rewards_span_id ON rewards (span_id);
+CREATE INDEX IF NOT EXISTS idx_rewards_task_id ON rewards (task_id);
+"""
+
+# (span_id, backend_span_id, task_id, category, model, created_at, metadata)
+SpanRow = Tuple[str, Optional[str], Optional[str], str, str, float, Optional[Dict[str, Any]]]
+# (span_id, task_id, reward, feedback_text, created_at, metadata)
+RewardRow = Tuple[str, Optional[str], float, Optional[str], float, Optional[Dict[str, Any]]]
+
+def _dumps(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+class LocalSpanStore:
+    """SQLite WAL 기반 Span/보상 저장소
+
+    write_batch 한 번이 트랜잭션 하나이며, 기록 스레드(BackgroundEmitter의 sink)에서 호출하는 것을 전제로 한다.
+    """
+
+    def __init__(self, path: str, read_pool_size: int = 4, busy_timeout: float = 5.0):
+        self.path = path
+        self.read_pool_size = max(1, read_pool_size)
+        self.busy_timeout = busy_timeout
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self.write_batches = 0
+        self.spans_written = 0
+        self.rewards_written = 0
+        self.last_batch_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def open(self) -> None:
+        """쓰기 연결 생성 및 스키마 초기화"""
+        if self._writer is not None:
+            return
+        writer = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False, isolation_level=None)
+        writer.execute("PRAGMA journal_mode=WAL")
+        # WAL에서는 NORMAL이어도 손상되지 않으며, 커밋마다 fsync하지 않는다
+        writer.execute("PRAGMA synchronous=NORMAL")
+        writer.executescript(SCHEMA)
+        self._writer = writer
+        logger.info(f"✅ 로컬 Span 저장소 열기 완료: {self.path}")
+
+    def close(self) -> None:
+        """모든 연결 종료"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
+
+    # --------------------------------------------
+    # 쓰기
+    # --------------------------------------------
+
+    def write_batch(self, spans: Sequence[SpanRow] = (), rewards: Sequence[RewardRow] = ()) -> None:
+        """Span/보상을 트랜잭션 하나로 기록 (이미 있는 span_id는 무시)"""
+        if not spans and not rewards:
+            return
+        if self._writer is None:
+            raise RuntimeError("로컬 Span 저장소가 열려 있지 않습니다")
+        started = time.perf_counter()
+        with self._write_lock:
+            writer = self._writer
+            writer.execute("BEGIN IMMEDIATE")
+            try:
+                if spans:
+                    writer.executemany(
+                        "INSERT OR IGNORE INTO spans (span_id, backend_span_id, task_id, category, model, created_at, metadata)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [row[:6] + (_dumps(row[6]),) for row in spans]
+                    )
+                if rewards:
+                    writer.executemany(
+                        "INSERT INTO rewards (span_id, task_id, reward, feedback_text, created_at, metadata)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        [row[:5] + (_dumps(row[5]),) for row in rewards]
+                    )
+                writer.execute("COMMIT")
+            except Exception as e:
+                writer.execute("ROLLBACK")
+                self.last_error = str(e)
+                raise
+        self.write_batches += 1
+        self.spans_written += len(spans)
+        self.rewards_written += len(rewards)
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        self.last_error = None
+
+    # --------------------------------------------
+    # 읽기
+    # --------------------------------------------
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """읽기 전용 연결 대여 (풀이 비어 있으면 read_pool_size까지 새로 만든다)"""
+        try:
+            connection = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                create = self._reader_count < self.read_pool_size
+                if create:
+                    self._reader_count += 1
+            if create:
+                connection = sqlite3.connect(
+                    f"file:{self.path}?mode=ro", uri=True, timeout=self.busy_timeout, check_same_thread=False
+                )
+            else:
+                connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    def iter_spans(self) -> Iterator[Tuple[str, str, str, float]]:
+        """모든 Span (span_id, category, model, created_at), 기록 순서"""
+        with self.reader() as connection:
+            yield from connection.execute("SELECT span_id, category, model, created_at FROM spans ORDER BY id")
+
+    def iter_rewards(self) -> Iterator[Tuple[str, float, float]]:
+        """모든 보상 (span_id, reward, created_at), 기록 순서"""
+        with self.reader() as connection:
+            yield from connection.execute("SELECT span_id, reward, created_at FROM rewards ORDER BY id")
+
+    def get_span(self, span_id: str) -> Optional[Dict[str, Any]]:
+        """Span 한 건 조회 (로컬 Span ID 기준)"""
+        with self.reader() as connection:
+            row = connection.execute(
+                "SELECT span_id, backend_span_id, task_id, category, model, created_at, metadata FROM spans WHERE span_id = ?",
+                (span_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("span_id", "backend_span_id", "task_id", "category", "model", "created_at", "metadata")
+        span = dict(zip(keys, row))
+        span["metadata"] = json.loads(span["metadata"]) if span["metadata"] else {}
+        return span
+
+    def backend_span_ids(self, span_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """로컬 Span ID -> 저장소 Span ID (저장된 Span만 포함, 저장소 기록에 실패한 Span은 None)"""
+        span_ids = list(dict.fromkeys(span_ids))
+        resolved: Dict[str, Optional[str]] = {}
+        with self.reader() as connection:
+            # SQLite 바인딩 변수 수 제한을 넘지 않도록 나눠서 조회
+            for start in range(0, len(span_ids), 500):
+                chunk = span_ids[start:start + 500]
+                resolved.update(connection.execute(
+                    f"SELECT span_id, backend_span_id FROM spans WHERE span_id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ))
+        return resolved
+
+    def task_span_ids(self, task_id: str) -> List[str]:
+        """작업 ID의 Span ID 목록"""
+        with self.reader() as connection:
+            return [row[0] for row in connection.execute("SELECT span_id FROM spans WHERE task_id = ? ORDER BY id", (task_id,))]
+
+    def counts(self) -> Dict[str, int]:
+        """저장된 Span/보상 수"""
+        with self.reader() as connection:
+            spans = connection.execute("SELECT COUNT(*) FROM spans").fetchone()[0]
+            rewards = connection.execute("SELECT COUNT(*) FROM rewards").fetchone()[0]
+        return {"spans": spans, "rewards": rewards}
+
+    def stats(self) -> Dict[str, Any]:
+        """쓰기 통계 (저장소를 조회하지 않는다)"""
+        return {
+            "open": self.is_open,
+            "path": self.path,
+            "write_batches": self.write_batches,
+            "spans_written": self.spans_written,
+            "rewards_written": self.rewards_written,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+            "read_connections": self._reader_count,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,309 @@
+"""
+템플릿 카탈로그
+외부 데이터 파일(JSON/JSONL, 파일 하나 또는 디렉터리)에서 템플릿을 읽어 색인된 불변 카탈로그로 만든다.
+파일이 바뀌거나 다시 불러오기가 요청되면 새 카탈로그를 따로 만든 뒤 참조를 통째로 교체하므로,
+요청 처리 경로는 잠금 없이 현재 카탈로그를 읽고 교체 중에도 요청이 실패하지 않는다.
+
+파일 형식:
+    *.json  : {"image": [템플릿, ...], "video": [...]} 또는 [{"category": "image", ...템플릿}, ...]
+    *.jsonl : 한 줄에 템플릿 하나 ({"category": "image", "name": ..., "template": ..., "score": ..., "reason": ...})
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from template_index import TemplateIndex
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE_EXTENSIONS = (".json", ".jsonl")
+
+class TemplateCatalogError(ValueError):
+    """카탈로그 파일을 읽을 수 없거나 형식/크기 제한을 벗어남"""
+
+@dataclass(frozen=True)
+class TemplateCatalog:
+    """색인된 템플릿 카탈로그 (생성 후 변경되지 않는다)
+
+    version은 파일 내용의 해시이므로 같은 파일을 읽은 프로세스(워커)끼리는 버전이 같다.
+    """
+    version: str
+    index: TemplateIndex
+    source: Optional[str]
+    files: Tuple[str, ...]
+    loaded_at: float
+    skipped: int = 0
+
+    def recommend(self, user_input: str, category: str, k: int = 3) -> List[Dict[str, Any]]:
+        return self.index.recommend(user_input, category, k=k)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "files": list(self.files),
+            "loaded_at": self.loaded_at,
+            "templates": self.index.size(),
+            "categories": {category: self.index.size(category) for category in self.index.categories()},
+            "skipped": self.skipped
+        }
+
+EMPTY_CATALOG = TemplateCatalog(version="empty", index=TemplateIndex({}), source=None, files=(), loaded_at=0.0)
+
+def catalog_files(path: str) -> List[str]:
+    """카탈로그 파일 목록 (디렉터리면 확장자가 맞는 파일을 이름 순으로)"""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith(CATALOG_FILE_EXTENSIONS) and not name.startswith(".")
+        )
+    return [path]
+
+def _records(path: str, data: bytes) -> Iterator[Tuple[Optional[str], Any]]:
+    """파일 내용에서 (카테고리, 템플릿) 추출"""
+    if path.endswith(".jsonl"):
+        for line_number, line in enumerate(data.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                yield None, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise TemplateCatalogError(f"{path}:{line_number}: {e}")
+        return
+    try:
+        document = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise TemplateCatalogError(f"{path}: {e}")
+    if isinstance(document, dict):
+        for category, templates in document.items():
+            if not isinstance(templates, list):
+                raise TemplateCatalogError(f"{path}: '{category}' 항목이 템플릿 목록이 아닙니다")
+            for template in templates:
+                yield category, template
+    elif isinstance(document, list):
+        for template in document:
+            yield None, template
+    else:
+        raise TemplateCatalogError(f"{path}: 최상위는 객체 또는 배열이어야 합니다")
+
+def _normalize(category: Optional[str], template: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """템플릿 검증 (name/template 문자열 필수, 점수는 0~1 실수), 잘못된 항목이면 None"""
+    if not isinstance(template, dict):
+        return None
+    template = dict(template)
+    category = template.pop("category", None) or category
+    if not isinstance(category, str) or not category:
+        return None
+    if not isinstance(template.get("name"), str) or not isinstance(template.get("template"), str):
+        return None
+    try:
+        template["score"] = min(max(float(template.get("score", 0.0)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return None
+    return category.lower(), template
+
+def load_catalog(path: str, max_templates: Optional[int] = None) -> TemplateCatalog:
+    """카탈로그 파일을 읽어 색인 (형식 오류/개수 초과 시 TemplateCatalogError)"""
+    files = catalog_files(path)
+    if not files:
+        raise TemplateCatalogError(f"카탈로그 파일이 없습니다: {path}")
+    digest = hashlib.sha256()
+    catalog: Dict[str, List[Dict[str, Any]]] = {}
+    count = skipped = 0
+    for file_path in files:
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise TemplateCatalogError(f"{file_path}: {e}")
+        digest.update(os.path.basename(file_path).encode("utf-8") + b"\0" + data + b"\0")
+        for category, template in _records(file_path, data):
+            normalized = _normalize(category, template)
+            if normalized is None:
+                skipped += 1
+                continue
+            count += 1
+            if max_templates is not None and count > max_templates:
+                raise TemplateCatalogError(f"템플릿 수가 제한({max_templates})을 넘습니다: {path}")
+            catalog.setdefault(normalized[0], []).append(normalized[1])
+    return TemplateCatalog(
+        version=digest.hexdigest()[:16],
+        index=TemplateIndex(catalog),
+        source=path,
+        files=tuple(files),
+        loaded_at=time.time(),
+        skipped=skipped
+    )
+
+class TemplateCatalogManager:
+    """카탈로그 파일 변경 감시 및 원자적 교체
+
+    파일 메타데이터(이름, 수정 시각, 크기)가 바뀐 경우에만 다시 읽으며,
+    내용 해시가 같으면 현재 카탈로그를 유지한다. 읽기에 실패하면 이전 카탈로그를 계속 사용한다.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        poll_interval: float = 5.0,
+        max_templates: Optional[int] = None,
+        name: str = "template-catalog"
+    ):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_templates = max_templates
+        self.name = name
+        self.current: TemplateCatalog = EMPTY_CATALOG
+        self.reload_count = 0
+        self.last_reload_at: Optional[float] = None
+        self.last_reload_ms = 0.0
+        self.last_error: Optional[str] = None
+        self._signature: Optional[Tuple[Tuple[str, int, int], ...]] = None
+        # 카탈로그가 바뀌지 않았으면 export_state는 같은 객체를 반환한다 (웜 상태 기록 시 재직렬화 생략)
+        self._exported: Optional[Tuple[TemplateCatalog, Tuple[Dict[str, Any], List[bytes]]]] = None
+        self._reload_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+    def recommend(self, user_input: str, category: str, k: int = 3) -> Tuple[List[Dict[str, Any]], str]:
+        """(추천 템플릿, 카탈로그 버전) - 한 번 읽은 카탈로그로 두 값을 만든다"""
+        catalog = self.current
+        return catalog.recommend(user_input, category, k=k), catalog.version
+
+    def swap(self, catalog: TemplateCatalog) -> TemplateCatalog:
+        """카탈로그 교체 (버전이 같으면 현재 카탈로그 유지)"""
+        with self._reload_lock:
+            if catalog.version != self.current.version:
+                self.current = catalog
+            return self.current
+
+    def export_state(self) -> Optional[Tuple[Dict[str, Any], List[bytes]]]:
+        """현재 카탈로그와 색인 상태 (메타데이터, 배열 원시 바이트) - 파일에서 불러온 카탈로그가 없으면 None"""
+        with self._reload_lock:
+            catalog, signature = self.current, self._signature
+        if catalog.source is None or not signature:
+            return None
+        exported = self._exported
+        if exported is not None and exported[0] is catalog and exported[1][0]["signature"] == [list(item) for item in signature]:
+            return exported[1]
+        index_meta, buffers = catalog.index.to_state()
+        meta = {
+            "version": catalog.version,
+            "source": catalog.source,
+            "files": list(catalog.files),
+            "loaded_at": catalog.loaded_at,
+            "skipped": catalog.skipped,
+            "signature": [list(item) for item in signature],
+            "index": index_meta
+        }
+        self._exported = (catalog, (meta, buffers))
+        return self._exported[1]
+
+    def restore_state(self, meta: Dict[str, Any], buffers: List[bytes]) -> TemplateCatalog:
+        """export_state 결과로 카탈로그 복원 (파일을 다시 읽지 않음)
+
+        카탈로그 경로나 파일 메타데이터가 저장 당시와 다르면 ValueError를 내고 현재 카탈로그를 유지한다.
+        복원 후 reload()는 파일이 바뀌기 전까지 아무것도 하지 않는다.
+        """
+        if meta["source"] != self.path:
+            raise ValueError(f"카탈로그 경로가 다릅니다: {meta['source']}")
+        signature = tuple(tuple(item) for item in meta["signature"])
+        if signature != self._file_signature():
+            raise ValueError("카탈로그 파일이 저장 이후 바뀌었습니다")
+        catalog = TemplateCatalog(
+            version=meta["version"],
+            index=TemplateIndex.from_state(meta["index"], buffers),
+            source=meta["source"],
+            files=tuple(meta["files"]),
+            loaded_at=meta["loaded_at"],
+            skipped=meta["skipped"]
+        )
+        with self._reload_lock:
+            self.current = catalog
+            self._signature = signature
+        return catalog
+
+    def _file_signature(self) -> Tuple[Tuple[str, int, int], ...]:
+        """(파일, 수정 시각, 크기) 목록 (경로가 없으면 빈 튜플)"""
+        signature = []
+        try:
+            for file_path in catalog_files(self.path):
+                stat = os.stat(file_path)
+                signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            return ()
+        return tuple(signature)
+
+    def reload(self, force: bool = False) -> bool:
+        """파일이 바뀌었으면 (force면 무조건) 다시 읽어 교체 (교체했으면 True)"""
+        if not self.path:
+            return False
+        with self._reload_lock:
+            started = time.perf_counter()
+            try:
+                signature = self._file_signature()
+                if not force and signature == self._signature:
+                    return False
+                # 실패한 파일은 다시 바뀔 때까지 한 번만 읽는다
+                self._signature = signature
+                catalog = load_catalog(self.path, self.max_templates)
+            except (OSError, TemplateCatalogError) as e:
+                self.last_error = str(e)
+                logger.warning(f"⚠️ 템플릿 카탈로그 불러오기 실패 (이전 카탈로그 유지): {e}")
+                return False
+            finally:
+                self.last_reload_at = time.time()
+                self.last_reload_ms = (time.perf_counter() - started) * 1000
+            self.reload_count += 1
+            self.last_error = None
+            if catalog.version == self.current.version:
+                return False
+            self.current = catalog
+        logger.info(
+            f"✅ 템플릿 카탈로그 교체: version={catalog.version}, templates={catalog.index.size()}, "
+            f"skipped={catalog.skipped}, {self.last_reload_ms:.0f}ms"
+        )
+        return True
+
+    def start(self) -> None:
+        """카탈로그를 불러오고 변경 감시 스레드 시작 (poll_interval <= 0 이면 감시하지 않음)"""
+        self.reload()
+        if self.poll_interval <= 0 or not self.path:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.poll_interval):
+            self.reload()
+
+    def status(self) -> Dict[str, Any]:
+        """카탈로그 버전/크기 및 마지막 불러오기 결과"""
+        return {
+            **self.current.describe(),
+            "path": self.path,
+            "poll_interval": self.poll_interval,
+            "max_templates": self.max_templates,
+            "reload_count": self.reload_count,
+            "last_reload_at": self.last_reload_at,
+            "last_reload_ms": round(self.last_reload_ms, 3),
+            "last_error": self.last_error
+        }
@@ -0,0 +1,198 @@
+"""
+템플릿 추천 인덱스
+카탈로그를 불러올 때 템플릿을 토큰화해 역색인을 만들어 두고,
+추천 요청은 역색인 조회와 상위 k개 선택만 수행한다.
+10만 개 규모의 카탈로그에서도 메모리가 크게 늘지 않도록 템플릿은 (키, 값) 튜플로,
+게시 목록과 점수는 array로 보관한다.
+"""
+
+import heapq
+import re
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# 한글 음절 연속 구간 / 그 외 문자·숫자 연속 구간
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[^\W_가-힣]+")
+# 템플릿 자리표시자 ({subject}, {description} 등)는 색인하지 않는다
+_PLACEHOLDER_PATTERN = re.compile(r"\{[^{}]*\}")
+
+# 기본 점수와 입력 일치도의 가중치
+BASE_SCORE_WEIGHT = 0.7
+MATCH_SCORE_WEIGHT = 0.3
+
+def tokenize(text: str) -> Set[str]:
+    """검색용 토큰 집합 생성
+
+    영문/숫자는 단어 단위로 분리하고, 한글은 조사·어미가 붙어도 일치하도록
+    어절 자체와 음절 bigram을 함께 토큰으로 사용한다.
+    """
+    tokens: Set[str] = set()
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        word = match.group()
+        tokens.add(word)
+        if len(word) > 1 and "가" <= word[0] <= "힣":
+            tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+class _CategoryIndex:
+    """카테고리 하나의 템플릿 역색인"""
+
+    def __init__(self, templates: Iterable[Mapping[str, Any]]):
+        # 템플릿마다 dict를 두지 않고 키 튜플(같은 키 구성끼리 공유)과 값 튜플만 보관한다
+        key_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        rows: List[Tuple[Tuple[str, ...], Tuple[Any, ...]]] = []
+        self.base_scores = array("d")
+        postings: Dict[str, List[int]] = {}
+        for index, template in enumerate(templates):
+            keys = tuple(template.keys())
+            keys = key_tuples.setdefault(keys, keys)
+            rows.append((keys, tuple(template[key] for key in keys)))
+            self.base_scores.append(float(template.get("score", 0.0)))
+            text = f"{template.get('name', '')} {_PLACEHOLDER_PATTERN.sub(' ', template.get('template', ''))}"
+            for token in tokenize(text):
+                postings.setdefault(token, []).append(index)
+        self.rows: Tuple[Tuple[Tuple[str, ...], Tuple[Any, ...]], ...] = tuple(rows)
+
+        # 게시 목록은 토큰별 배열 대신 하나의 배열에 이어 붙이고 토큰 -> 구간 번호만 보관한다
+        self.token_slots: Dict[str, int] = {}
+        self.posting_ids = array("I")
+        self.posting_offsets = array("I", [0])
+        for token, ids in postings.items():
+            self.token_slots[token] = len(self.posting_offsets) - 1
+            self.posting_ids.extend(ids)
+            self.posting_offsets.append(len(self.posting_ids))
+        del postings
+
+        # 입력과 겹치는 토큰이 없는 템플릿은 기본 점수 순으로 선택된다
+        self.by_base_score = array(
+            "I", sorted(range(len(self.rows)), key=lambda i: (-self.base_scores[i], i))
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def to_state(self) -> Tuple[Dict[str, Any], List[bytes]]:
+        """(JSON 직렬화 가능한 메타데이터, 배열 원시 바이트 목록) - from_state로 토큰화 없이 복원한다"""
+        key_sets: Dict[Tuple[str, ...], int] = {}
+        rows = [[key_sets.setdefault(keys, len(key_sets)), list(values)] for keys, values in self.rows]
+        meta = {
+            "key_sets": [list(keys) for keys in key_sets],
+            "rows": rows,
+            "tokens": list(self.token_slots),
+            "lengths": [len(self.base_scores), len(self.posting_ids), len(self.posting_offsets), len(self.by_base_score)]
+        }
+        arrays = (self.base_scores, self.posting_ids, self.posting_offsets, self.by_base_score)
+        return meta, [values.tobytes() for values in arrays]
+
+    @classmethod
+    def from_state(cls, meta: Mapping[str, Any], buffers: List[bytes]) -> "_CategoryIndex":
+        """to_state 결과로 색인 복원 (형식이 맞지 않으면 ValueError)"""
+        index = cls.__new__(cls)
+        key_sets = [tuple(keys) for keys in meta["key_sets"]]
+        index.rows = tuple((key_sets[keys], tuple(values)) for keys, values in meta["rows"])
+        index.token_slots = {token: slot for slot, token in enumerate(meta["tokens"])}
+        arrays = []
+        for typecode, data, length in zip("dIII", buffers, meta["lengths"]):
+            values = array(typecode)
+            values.frombytes(data)
+            if len(values) != length:
+                raise ValueError("색인 배열 길이가 맞지 않습니다")
+            arrays.append(values)
+        index.base_scores, index.posting_ids, index.posting_offsets, index.by_base_score = arrays
+        if len(index.base_scores) != len(index.rows) or len(index.posting_offsets) != len(index.token_slots) + 1:
+            raise ValueError("색인 구성이 맞지 않습니다")
+        return index
+
+    def template(self, index: int) -> Dict[str, Any]:
+        keys, values = self.rows[index]
+        return dict(zip(keys, values))
+
+    def top_k(self, user_tokens: Set[str], k: int) -> List[Tuple[int, float, float]]:
+        """(템플릿 인덱스, match_score, final_score) 상위 k개"""
+        overlaps: Dict[int, int] = {}
+        offsets = self.posting_offsets
+        for token in user_tokens:
+            slot = self.token_slots.get(token)
+            if slot is None:
+                continue
+            for index in self.posting_ids[offsets[slot]:offsets[slot + 1]]:
+                overlaps[index] = overlaps.get(index, 0) + 1
+
+        denominator = max(len(user_tokens), 1)
+        candidates: List[Tuple[float, int, float]] = []
+        for index, overlap in overlaps.items():
+            match_score = overlap / denominator
+            final_score = self.base_scores[index] * BASE_SCORE_WEIGHT + match_score * MATCH_SCORE_WEIGHT
+            candidates.append((final_score, index, match_score))
+
+        unmatched = 0
+        for index in self.by_base_score:
+            if unmatched >= k:
+                break
+            if index in overlaps:
+                continue
+            candidates.append((self.base_scores[index] * BASE_SCORE_WEIGHT, index, 0.0))
+            unmatched += 1
+
+        # 점수가 같으면 카탈로그 순서를 유지한다
+        best = heapq.nlargest(k, candidates, key=lambda c: (c[0], -c[1]))
+        return [(index, match_score, final_score) for final_score, index, match_score in best]
+
+class TemplateIndex:
+    """카테고리별 템플릿 역색인 (생성 후 변경되지 않는다)"""
+
+    def __init__(self, catalog: Mapping[str, Iterable[Mapping[str, Any]]]):
+        self._categories: Dict[str, _CategoryIndex] = {
+            category: _CategoryIndex(templates) for category, templates in catalog.items()
+        }
+
+    @staticmethod
+    def state_format() -> Dict[str, Any]:
+        """배열 원시 바이트의 플랫폼 의존 정보 (다르면 to_state 결과를 그대로 읽을 수 없다)"""
+        return {"byteorder": sys.byteorder, "itemsize": [array(typecode).itemsize for typecode in "dI"]}
+
+    def to_state(self) -> Tuple[Dict[str, Any], List[bytes]]:
+        """카테고리별 색인 상태 (메타데이터, 배열 원시 바이트 목록)"""
+        meta: Dict[str, Any] = {"format": self.state_format(), "categories": []}
+        buffers: List[bytes] = []
+        for category, index in self._categories.items():
+            category_meta, category_buffers = index.to_state()
+            meta["categories"].append([category, category_meta])
+            buffers.extend(category_buffers)
+        return meta, buffers
+
+    @classmethod
+    def from_state(cls, meta: Mapping[str, Any], buffers: List[bytes]) -> "TemplateIndex":
+        """to_state 결과로 색인 복원 (플랫폼/형식이 맞지 않으면 ValueError)"""
+        if meta.get("format") != cls.state_format():
+            raise ValueError("색인 상태의 배열 형식이 현재 플랫폼과 다릅니다")
+        categories = meta["categories"]
+        if len(buffers) != len(categories) * 4:
+            raise ValueError("색인 배열 수가 맞지 않습니다")
+        instance = cls.__new__(cls)
+        instance._categories = {
+            category: _CategoryIndex.from_state(category_meta, buffers[i * 4:i * 4 + 4])
+            for i, (category, category_meta) in enumerate(categories)
+        }
+        return instance
+
+    def categories(self) -> List[str]:
+        return list(self._categories)
+
+    def size(self, category: Optional[str] = None) -> int:
+        """템플릿 수"""
+        if category is not None:
+            index = self._categories.get(category)
+            return len(index) if index else 0
+        return sum(len(index) for index in self._categories.values())
+
+    def recommend(self, user_input: str, category: str, k: int = 3) -> List[Dict[str, Any]]:
+        """사용자 입력과 가장 잘 맞는 템플릿 상위 k개 (match_score/final_score 포함)"""
+        index = self._categories.get(category)
+        if index is None or k <= 0:
+            return []
+        return [
+            {**index.template(i), "match_score": match_score, "final_score": final_score}
+            for i, match_score, final_score in index.top_k(tokenize(user_input), k)
+        ]
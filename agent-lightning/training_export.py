@@ -0,0 +1,695 @@
+"""
+학습 데이터 열 기반(columnar) 내보내기
+로컬 Span 저장소(SQLite)의 Span/보상을 추가 전용(append-only) 열 기반 디렉터리로 증분 내보내고,
+학습/분석 쪽에서는 Python 객체를 만들지 않고 메모리 매핑으로 바로 읽는다.
+
+디렉터리 구조:
+    manifest.json           세그먼트 목록, 사전(category/model/improvement), 마지막으로 내보낸 행 번호
+    seg-000001/             내보내기 한 번(또는 압축)마다 세그먼트 하나 이상
+        spans.rowid.npy             int64   저장소 행 번호 (세그먼트 안에서, 세그먼트 순서로 오름차순)
+        spans.created_at.npy        float64
+        spans.category.npy          uint16  사전 코드
+        spans.model.npy             uint32  사전 코드
+        spans.quality_score.npy     float32 (없으면 NaN)
+        spans.confidence.npy        float32 (없으면 NaN)
+        spans.improvements.values.npy / .offsets.npy    uint32 사전 코드 목록 (행 i는 offsets[i]:offsets[i+1])
+        spans.<문자열 열>.data.npy / .offsets.npy       UTF-8 바이트 영역 (span_id, task_id, original_prompt, optimized_prompt)
+        rewards.rowid.npy / rewards.reward.npy / rewards.created_at.npy
+        rewards.span_rowid.npy      int64   보상이 가리키는 Span의 저장소 행 번호 (찾지 못하면 -1)
+        rewards.feedback_text.data.npy / .offsets.npy
+
+모든 열은 .npy 파일이므로 np.load(mmap_mode="r")로 복사 없이 읽을 수 있다. 사전은 추가만 되므로
+이전 세그먼트의 코드는 바뀌지 않으며, 세그먼트를 모두 기록한 뒤 manifest를 원자적으로 교체한다.
+"""
+
+import bisect
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATASET_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+SEGMENT_PREFIX = "seg-"
+
+SPAN_STRING_COLUMNS = ("span_id", "task_id", "original_prompt", "optimized_prompt")
+REWARD_STRING_COLUMNS = ("feedback_text",)
+DICTIONARY_COLUMNS = ("category", "model", "improvement")
+
+# ============================================
+# 읽기
+# ============================================
+
+class StringColumn:
+    """문자열 열 (세그먼트별 오프셋/UTF-8 바이트 영역, 항목에 접근할 때만 디코딩한다)"""
+
+    def __init__(self, parts: Sequence[Tuple[np.ndarray, np.ndarray]]):
+        self._parts = list(parts)
+        self._starts: List[int] = []
+        total = 0
+        for offsets, _ in self._parts:
+            self._starts.append(total)
+            total += len(offsets) - 1
+        self._length = total
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        part = bisect.bisect_right(self._starts, index) - 1
+        offsets, data = self._parts[part]
+        local = index - self._starts[part]
+        return data[offsets[local]:offsets[local + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for offsets, data in self._parts:
+            raw = data.tobytes()
+            bounds = offsets.tolist()
+            for start, end in zip(bounds, bounds[1:]):
+                yield raw[start:end].decode("utf-8")
+
+    def to_list(self) -> List[str]:
+        return list(self)
+
+    def byte_lengths(self) -> np.ndarray:
+        """항목별 UTF-8 바이트 길이 (디코딩 없음)"""
+        if not self._parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.diff(offsets) for offsets, _ in self._parts])
+
+class ListColumn:
+    """사전 코드 목록 열 (행마다 길이가 다른 uint32 배열)"""
+
+    def __init__(self, parts: Sequence[Tuple[np.ndarray, np.ndarray]]):
+        self._parts = list(parts)
+        self._starts: List[int] = []
+        total = 0
+        for offsets, _ in self._parts:
+            self._starts.append(total)
+            total += len(offsets) - 1
+        self._length = total
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        part = bisect.bisect_right(self._starts, index) - 1
+        offsets, values = self._parts[part]
+        local = index - self._starts[part]
+        return values[offsets[local]:offsets[local + 1]]
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(행 번호, 코드) 배열 - 희소 행렬(scipy.sparse.csr_matrix 등) 생성용"""
+        rows = []
+        values = []
+        for start, (offsets, part_values) in zip(self._starts, self._parts):
+            counts = np.diff(offsets)
+            rows.append(np.repeat(np.arange(start, start + len(counts), dtype=np.int64), counts))
+            values.append(np.asarray(part_values))
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+        return np.concatenate(rows), np.concatenate(values)
+
+    def counts(self) -> np.ndarray:
+        """행별 항목 수"""
+        if not self._parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.diff(offsets) for offsets, _ in self._parts])
+
+def _load(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode="r", allow_pickle=False)
+
+class TrainingDataset:
+    """내보낸 학습 데이터 읽기 (모든 열은 메모리 매핑)
+
+    생성 시점의 manifest 기준으로 모든 열 파일을 열어 두므로, 이후 내보내기/압축으로 세그먼트가
+    교체·삭제되어도 읽는 내용은 바뀌지 않는다. 숫자 열은 세그먼트가 하나면 복사 없이, 여러 개면 이어 붙여 반환한다.
+    """
+
+    def __init__(self, path: str, retries: int = 3):
+        self.path = path
+        for attempt in range(retries + 1):
+            with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            if self.manifest.get("format_version") != DATASET_FORMAT_VERSION:
+                raise ValueError(f"지원하지 않는 학습 데이터 형식 버전: {self.manifest.get('format_version')}")
+            try:
+                self._files = [self._open_segment(segment) for segment in self.manifest["segments"]]
+                break
+            except FileNotFoundError:
+                # manifest를 읽은 직후 압축으로 세그먼트가 교체된 경우 (새 manifest로 다시 연다)
+                if attempt >= retries:
+                    raise
+        self.segments: List[Dict[str, Any]] = self.manifest["segments"]
+        self.dictionaries: Dict[str, List[str]] = self.manifest["dictionaries"]
+        self._cache: Dict[str, Any] = {}
+
+    def _open_segment(self, segment: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        directory = os.path.join(self.path, segment["name"])
+        return {name[:-4]: _load(os.path.join(directory, name)) for name in os.listdir(directory) if name.endswith(".npy")}
+
+    @property
+    def num_spans(self) -> int:
+        return sum(segment["spans"] for segment in self.segments)
+
+    @property
+    def num_rewards(self) -> int:
+        return sum(segment["rewards"] for segment in self.segments)
+
+    def _array(self, table: str, name: str) -> np.ndarray:
+        key = f"{table}.{name}"
+        if key not in self._cache:
+            parts = [files[key] for files in self._files]
+            if len(parts) == 1:
+                self._cache[key] = parts[0]
+            elif parts:
+                self._cache[key] = np.concatenate(parts)
+            else:
+                self._cache[key] = np.zeros(0, dtype=_EMPTY_DTYPES.get(key, np.float64))
+        return self._cache[key]
+
+    def span_column(self, name: str) -> np.ndarray:
+        """Span 숫자/코드 열 (rowid, created_at, category, model, quality_score, confidence)"""
+        return self._array("spans", name)
+
+    def reward_column(self, name: str) -> np.ndarray:
+        """보상 숫자 열 (rowid, reward, created_at, span_rowid)"""
+        return self._array("rewards", name)
+
+    def _parts(self, key: str, data_name: str) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return [(files[f"{key}.offsets"], files[f"{key}.{data_name}"]) for files in self._files]
+
+    def span_strings(self, name: str) -> StringColumn:
+        """Span 문자열 열 (span_id, task_id, original_prompt, optimized_prompt)"""
+        return StringColumn(self._parts(f"spans.{name}", "data"))
+
+    def reward_strings(self, name: str) -> StringColumn:
+        return StringColumn(self._parts(f"rewards.{name}", "data"))
+
+    def improvements(self) -> ListColumn:
+        """Span별 개선 사항 코드 목록 (코드 -> 문자열은 dictionaries["improvement"])"""
+        return ListColumn(self._parts("spans.improvements", "values"))
+
+    def reward_span_index(self) -> np.ndarray:
+        """보상별 Span 위치 (span_column 배열의 인덱스, 찾지 못한 보상은 -1)"""
+        span_rowids = self.span_column("rowid")
+        targets = self.reward_column("span_rowid")
+        positions = np.searchsorted(span_rowids, targets)
+        positions = np.minimum(positions, max(len(span_rowids) - 1, 0))
+        found = (targets >= 0) & (len(span_rowids) > 0)
+        if len(span_rowids):
+            found &= span_rowids[positions] == targets
+        return np.where(found, positions, -1).astype(np.int64)
+
+    def span_rewards(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Span별 (보상 합계, 보상 수) - 보상이 없으면 (0, 0)"""
+        index = self.reward_span_index()
+        valid = index >= 0
+        totals = np.bincount(index[valid], weights=self.reward_column("reward")[valid], minlength=self.num_spans)
+        counts = np.bincount(index[valid], minlength=self.num_spans)
+        return totals, counts
+
+    def spans_frame(self, include_text: bool = False):
+        """Span pandas DataFrame (category/model은 Categorical, 보상 평균 포함)"""
+        import pandas as pd
+        totals, counts = self.span_rewards()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_reward = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+        frame = pd.DataFrame({
+            "rowid": self.span_column("rowid"),
+            "created_at": self.span_column("created_at"),
+            "category": pd.Categorical.from_codes(self.span_column("category"), self.dictionaries["category"]),
+            "model": pd.Categorical.from_codes(self.span_column("model"), self.dictionaries["model"]),
+            "quality_score": self.span_column("quality_score"),
+            "confidence": self.span_column("confidence"),
+            "improvements_count": self.improvements().counts(),
+            "reward_count": counts,
+            "mean_reward": mean_reward
+        })
+        if include_text:
+            for name in SPAN_STRING_COLUMNS:
+                frame[name] = self.span_strings(name).to_list()
+        return frame
+
+    def rewards_frame(self):
+        """보상 pandas DataFrame (span_index는 spans_frame의 행 위치, 찾지 못하면 -1)"""
+        import pandas as pd
+        return pd.DataFrame({
+            "rowid": self.reward_column("rowid"),
+            "created_at": self.reward_column("created_at"),
+            "reward": self.reward_column("reward"),
+            "span_rowid": self.reward_column("span_rowid"),
+            "span_index": self.reward_span_index()
+        })
+
+_EMPTY_DTYPES = {
+    "spans.rowid": np.int64,
+    "spans.category": np.uint16,
+    "spans.model": np.uint32,
+    "spans.quality_score": np.float32,
+    "spans.confidence": np.float32,
+    "rewards.rowid": np.int64,
+    "rewards.span_rowid": np.int64
+}
+
+# ============================================
+# 쓰기
+# ============================================
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {
+        "format_version": DATASET_FORMAT_VERSION,
+        "segments": [],
+        "dictionaries": {name: [] for name in DICTIONARY_COLUMNS},
+        "last_span_rowid": 0,
+        "last_reward_rowid": 0,
+        "next_segment": 1,
+        "updated_at": None
+    }
+
+class _Dictionary:
+    """추가 전용 문자열 사전 (기존 코드는 바뀌지 않는다)"""
+
+    def __init__(self, values: List[str]):
+        self.values = values
+        self.codes = {value: code for code, value in enumerate(values)}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+def _string_arena(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """문자열 목록 -> (int64 오프셋, uint8 바이트 영역), None은 빈 문자열"""
+    encoded = [value.encode("utf-8") if value else b"" for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+def _metadata_float(metadata: Dict[str, Any], key: str) -> float:
+    value = metadata.get(key)
+    try:
+        return float(value) if value is not None else float("nan")
+    except (TypeError, ValueError):
+        return float("nan")
+
+class TrainingExporter:
+    """로컬 Span 저장소 -> 열 기반 학습 데이터 증분 내보내기
+
+    내보내기 한 번은 저장소의 읽기 트랜잭션 하나 안에서 마지막으로 내보낸 행 이후의 Span/보상을
+    segment_rows개씩 세그먼트로 기록하고, 끝나면 manifest를 교체한다. 중간에 실패하면 manifest가
+    바뀌지 않으므로 다음 내보내기가 같은 행부터 다시 시작한다.
+    """
+
+    def __init__(
+        self,
+        store,
+        path: str,
+        interval: float = 300.0,
+        segment_rows: int = 200000,
+        max_segments: int = 32,
+        name: str = "training-export"
+    ):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self.segment_rows = max(1, segment_rows)
+        self.max_segments = max(1, max_segments)
+        self.name = name
+        self.exports = 0
+        self.compactions = 0
+        self.last_export_at: Optional[float] = None
+        self.last_export_ms = 0.0
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # --------------------------------------------
+    # manifest
+    # --------------------------------------------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_NAME)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return _empty_manifest()
+        if manifest.get("format_version") != DATASET_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 학습 데이터 형식 버전: {manifest.get('format_version')}")
+        return manifest
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        manifest["updated_at"] = time.time()
+        temp_path = f"{self._manifest_path()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._manifest_path())
+
+    def _remove_orphans(self, manifest: Dict[str, Any]) -> None:
+        """manifest에 없는 세그먼트 디렉터리 삭제 (중단된 내보내기/압축의 잔여물)"""
+        live = {segment["name"] for segment in manifest["segments"]}
+        for name in os.listdir(self.path):
+            if name.startswith(SEGMENT_PREFIX) and name not in live:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    # --------------------------------------------
+    # 세그먼트 기록
+    # --------------------------------------------
+
+    def _write_segment(self, manifest: Dict[str, Any], columns: Dict[str, np.ndarray], spans: int, rewards: int) -> Dict[str, Any]:
+        """열 파일 기록 후 이름 변경 (디렉터리가 보이면 모든 파일이 디스크에 기록된 상태)"""
+        name = f"{SEGMENT_PREFIX}{manifest['next_segment']:06d}"
+        manifest["next_segment"] += 1
+        final_path = os.path.join(self.path, name)
+        temp_path = f"{final_path}.tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        size = 0
+        for column, values in columns.items():
+            file_path = os.path.join(temp_path, f"{column}.npy")
+            with open(file_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(values), allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+                size += f.tell()
+        os.replace(temp_path, final_path)
+        rowids = columns["spans.rowid"]
+        return {
+            "name": name,
+            "spans": spans,
+            "rewards": rewards,
+            "first_span_rowid": int(rowids[0]) if len(rowids) else None,
+            "last_span_rowid": int(rowids[-1]) if len(rowids) else None,
+            "bytes": size,
+            "created_at": time.time()
+        }
+
+    def _span_columns(self, rows: List[Tuple], dictionaries: Dict[str, _Dictionary]) -> Dict[str, np.ndarray]:
+        """(rowid, span_id, task_id, category, model, created_at, metadata JSON) 행 -> 열"""
+        count = len(rows)
+        rowid = np.empty(count, dtype=np.int64)
+        created_at = np.empty(count, dtype=np.float64)
+        category = np.empty(count, dtype=np.uint16)
+        model = np.empty(count, dtype=np.uint32)
+        quality_score = np.empty(count, dtype=np.float32)
+        confidence = np.empty(count, dtype=np.float32)
+        improvement_offsets = np.zeros(count + 1, dtype=np.int64)
+        improvement_values: List[int] = []
+        strings: Dict[str, List[Optional[str]]] = {name: [] for name in SPAN_STRING_COLUMNS}
+        categories, models, improvements = dictionaries["category"], dictionaries["model"], dictionaries["improvement"]
+        for i, (row_id, span_id, task_id, span_category, span_model, span_created_at, metadata) in enumerate(rows):
+            metadata = json.loads(metadata) if metadata else {}
+            rowid[i] = row_id
+            created_at[i] = span_created_at
+            category[i] = categories.encode(span_category)
+            model[i] = models.encode(span_model)
+            quality_score[i] = _metadata_float(metadata, "quality_score")
+            confidence[i] = _metadata_float(metadata, "confidence")
+            for improvement in metadata.get("improvements") or ():
+                improvement_values.append(improvements.encode(str(improvement)))
+            improvement_offsets[i + 1] = len(improvement_values)
+            strings["span_id"].append(span_id)
+            strings["task_id"].append(task_id)
+            strings["original_prompt"].append(metadata.get("original_prompt"))
+            strings["optimized_prompt"].append(metadata.get("optimized_prompt"))
+        if len(categories.values) > np.iinfo(np.uint16).max:
+            raise ValueError("category 사전이 uint16 범위를 넘습니다")
+        columns = {
+            "spans.rowid": rowid,
+            "spans.created_at": created_at,
+            "spans.category": category,
+            "spans.model": model,
+            "spans.quality_score": quality_score,
+            "spans.confidence": confidence,
+            "spans.improvements.offsets": improvement_offsets,
+            "spans.improvements.values": np.asarray(improvement_values, dtype=np.uint32)
+        }
+        for name, values in strings.items():
+            columns[f"spans.{name}.offsets"], columns[f"spans.{name}.data"] = _string_arena(values)
+        return columns
+
+    @staticmethod
+    def _reward_columns(rows: List[Tuple]) -> Dict[str, np.ndarray]:
+        """(rowid, reward, created_at, feedback_text, span_rowid) 행 -> 열"""
+        columns = {
+            "rewards.rowid": np.array([row[0] for row in rows], dtype=np.int64),
+            "rewards.reward": np.array([row[1] for row in rows], dtype=np.float64),
+            "rewards.created_at": np.array([row[2] for row in rows], dtype=np.float64),
+            "rewards.span_rowid": np.array([row[4] for row in rows], dtype=np.int64)
+        }
+        columns["rewards.feedback_text.offsets"], columns["rewards.feedback_text.data"] = _string_arena([row[3] for row in rows])
+        return columns
+
+    # --------------------------------------------
+    # 내보내기 / 압축
+    # --------------------------------------------
+
+    def export(self) -> Dict[str, Any]:
+        """마지막 내보내기 이후의 Span/보상을 새 세그먼트로 기록 (결과 요약 반환)"""
+        if not self.enabled:
+            raise RuntimeError("학습 데이터 내보내기 경로가 설정되어 있지 않습니다")
+        if not self.store.is_open:
+            raise RuntimeError("로컬 Span 저장소가 열려 있지 않습니다")
+        with self._lock:
+            started = time.perf_counter()
+            os.makedirs(self.path, exist_ok=True)
+            manifest = self._read_manifest()
+            self._remove_orphans(manifest)
+            dictionaries = {name: _Dictionary(list(manifest["dictionaries"][name])) for name in DICTIONARY_COLUMNS}
+            new_segments = []
+            exported_spans = exported_rewards = 0
+            with self.store.reader() as connection:
+                # 읽기 트랜잭션 하나로 Span과 보상의 시점을 맞춘다 (보상이 가리키는 Span은 항상 함께 내보내진다)
+                connection.execute("BEGIN")
+                try:
+                    max_span = connection.execute("SELECT COALESCE(MAX(id), 0) FROM spans").fetchone()[0]
+                    max_reward = connection.execute("SELECT COALESCE(MAX(id), 0) FROM rewards").fetchone()[0]
+                    last_span, last_reward = manifest["last_span_rowid"], manifest["last_reward_rowid"]
+                    while last_span < max_span or last_reward < max_reward:
+                        span_rows = connection.execute(
+                            "SELECT id, span_id, task_id, category, model, created_at, metadata FROM spans"
+                            " WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                            (last_span, max_span, self.segment_rows)
+                        ).fetchall()
+                        # 보상의 span_id는 로컬 Span ID 또는 작업 ID(/feedback에 span_id 없이 제출된 경우)이다
+                        reward_rows = connection.execute(
+                            "SELECT r.id, r.reward, r.created_at, r.feedback_text, COALESCE("
+                            "  s.id,"
+                            "  (SELECT MAX(t.id) FROM spans t WHERE t.task_id = r.span_id AND t.id <= ?),"
+                            "  (SELECT MAX(t.id) FROM spans t WHERE t.task_id = r.task_id AND t.id <= ?),"
+                            "  -1)"
+                            " FROM rewards r LEFT JOIN spans s ON s.span_id = r.span_id AND s.id <= ?"
+                            " WHERE r.id > ? AND r.id <= ? ORDER BY r.id LIMIT ?",
+                            (max_span, max_span, max_span, last_reward, max_reward, self.segment_rows)
+                        ).fetchall()
+                        columns = self._span_columns(span_rows, dictionaries)
+                        columns.update(self._reward_columns(reward_rows))
+                        new_segments.append(self._write_segment(manifest, columns, len(span_rows), len(reward_rows)))
+                        exported_spans += len(span_rows)
+                        exported_rewards += len(reward_rows)
+                        if span_rows:
+                            last_span = span_rows[-1][0]
+                        if reward_rows:
+                            last_reward = reward_rows[-1][0]
+                finally:
+                    connection.execute("COMMIT")
+            if new_segments:
+                manifest["segments"].extend(new_segments)
+                manifest["dictionaries"] = {name: dictionary.values for name, dictionary in dictionaries.items()}
+                manifest["last_span_rowid"] = last_span
+                manifest["last_reward_rowid"] = last_reward
+                self._write_manifest(manifest)
+            result = {
+                "spans": exported_spans,
+                "rewards": exported_rewards,
+                "segments": [segment["name"] for segment in new_segments],
+                "total_segments": len(manifest["segments"])
+            }
+            if len(manifest["segments"]) > self.max_segments:
+                # 작은 세그먼트가 쌓이지 않도록 끝부분의 작은 세그먼트들을 합친다 (행 번호 순서 유지)
+                start = len(manifest["segments"])
+                while start > 0 and manifest["segments"][start - 1]["spans"] + manifest["segments"][start - 1]["rewards"] < self.segment_rows:
+                    start -= 1
+                result["compacted"] = self._compact(manifest, start)
+            self.exports += 1
+            self.last_export_at = time.time()
+            self.last_export_ms = (time.perf_counter() - started) * 1000
+            self.last_result = result
+            self.last_error = None
+        if exported_spans or exported_rewards:
+            logger.info(
+                f"✅ 학습 데이터 내보내기: spans={exported_spans}, rewards={exported_rewards}, "
+                f"{self.last_export_ms:.0f}ms ({self.path})"
+            )
+        return result
+
+    def compact(self) -> Dict[str, Any]:
+        """모든 세그먼트를 하나로 합치기"""
+        with self._lock:
+            return self._compact(self._read_manifest(), 0)
+
+    def _compact(self, manifest: Dict[str, Any], start: int) -> Dict[str, Any]:
+        """start번째 이후의 세그먼트를 하나로 합치기"""
+        kept = manifest["segments"][:start]
+        segments = manifest["segments"][start:]
+        if len(segments) <= 1:
+            return {"segments": len(manifest["segments"]), "merged": 0}
+        started = time.perf_counter()
+        columns: Dict[str, np.ndarray] = {}
+        names = sorted(
+            name[:-4] for name in os.listdir(os.path.join(self.path, segments[0]["name"])) if name.endswith(".npy")
+        )
+        for column in names:
+            parts = [_load(os.path.join(self.path, segment["name"], f"{column}.npy")) for segment in segments]
+            if column.endswith(".offsets"):
+                # 오프셋은 앞 세그먼트의 데이터 길이만큼 밀어서 이어 붙인다
+                merged = [np.asarray(parts[0])]
+                base = int(parts[0][-1])
+                for part in parts[1:]:
+                    merged.append(np.asarray(part[1:]) + base)
+                    base += int(part[-1])
+                columns[column] = np.concatenate(merged)
+            else:
+                columns[column] = np.concatenate(parts)
+        merged_segment = self._write_segment(
+            manifest, columns, sum(segment["spans"] for segment in segments), sum(segment["rewards"] for segment in segments)
+        )
+        old_names = [segment["name"] for segment in segments]
+        manifest["segments"] = kept + [merged_segment]
+        self._write_manifest(manifest)
+        # 이미 열린 메모리 매핑은 파일이 삭제되어도 유효하다
+        for name in old_names:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        self.compactions += 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"✅ 학습 데이터 세그먼트 압축: {len(old_names)} -> 1, {elapsed_ms:.0f}ms")
+        return {"segments": len(manifest["segments"]), "merged": len(old_names), "duration_ms": round(elapsed_ms, 3)}
+
+    # --------------------------------------------
+    # 주기적 내보내기
+    # --------------------------------------------
+
+    def request_export(self) -> None:
+        """다음 주기를 기다리지 않고 내보내기 요청"""
+        self._requested.set()
+
+    def _export_safely(self) -> None:
+        try:
+            self.export()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"⚠️ 학습 데이터 내보내기 실패: {e}")
+
+    def start(self) -> None:
+        """주기적 내보내기 시작 (경로가 없으면 아무것도 하지 않음)"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """주기적 내보내기 종료 (실행 중이었으면 남은 데이터를 마지막으로 한 번 내보낸다)"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._requested.set()
+        self._thread.join(timeout)
+        self._thread = None
+        if self.store.is_open:
+            self._export_safely()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._requested.wait(self.interval if self.interval > 0 else None)
+            self._requested.clear()
+            if self._stopping.is_set():
+                return
+            if self.store.is_open:
+                self._export_safely()
+
+    def status(self) -> Dict[str, Any]:
+        manifest: Dict[str, Any] = {}
+        if self.enabled:
+            try:
+                manifest = self._read_manifest()
+            except (OSError, ValueError) as e:
+                manifest = {"error": str(e)}
+        segments = manifest.get("segments", [])
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval": self.interval,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "segments": len(segments),
+            "spans": sum(segment["spans"] for segment in segments),
+            "rewards": sum(segment["rewards"] for segment in segments),
+            "bytes": sum(segment["bytes"] for segment in segments),
+            "last_span_rowid": manifest.get("last_span_rowid"),
+            "last_reward_rowid": manifest.get("last_reward_rowid"),
+            "exports": self.exports,
+            "compactions": self.compactions,
+            "last_export_at": self.last_export_at,
+            "last_export_ms": round(self.last_export_ms, 3),
+            "last_result": self.last_result,
+            "last_error": self.last_error or manifest.get("error")
+        }
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import sys
+    from span_store import LocalSpanStore
+    parser = argparse.ArgumentParser(description="로컬 Span 저장소 -> 열 기반 학습 데이터 증분 내보내기")
+    parser.add_argument("--store", default=os.getenv("LOCAL_SPAN_STORE_PATH", "span_store.db"), help="로컬 Span 저장소 (SQLite)")
+    parser.add_argument("--output", default=os.getenv("TRAINING_EXPORT_PATH") or "training_dataset", help="내보낼 디렉터리")
+    parser.add_argument("--segment-rows", type=int, default=200000, help="세그먼트당 최대 행 수")
+    parser.add_argument("--compact", action="store_true", help="내보낸 뒤 모든 세그먼트를 하나로 합치기")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not os.path.exists(args.store):
+        print(f"❌ 로컬 Span 저장소가 없습니다: {args.store}", file=sys.stderr)
+        return 1
+    store = LocalSpanStore(args.store)
+    store.open()
+    try:
+        exporter = TrainingExporter(store, args.output, segment_rows=args.segment_rows)
+        print(json.dumps(exporter.export(), ensure_ascii=False))
+        if args.compact:
+            print(json.dumps(exporter.compact(), ensure_ascii=False))
+    finally:
+        store.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
@@ -0,0 +1,403 @@
+"""
+백그라운드 학습 작업 실행기
+Trainer 작업을 서버 프로세스와 분리된 자식 프로세스에서 실행하여,
+학습 중에도 요청 처리 지연이 늘어나지 않도록 한다.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+class TrainingQueueFull(Exception):
+    """학습 대기열이 가득 참"""
+
+# ============================================
+# 자식 프로세스에서 실행되는 학습 함수
+# ============================================
+
+class JobContext:
+    """자식 프로세스에서 진행률 보고 및 취소 확인에 사용"""
+
+    def __init__(self, job_id: str, events: Any, cancel_event: Any):
+        self.job_id = job_id
+        self._events = events
+        self._cancel_event = cancel_event
+
+    def report(self, progress: float, message: str = "") -> None:
+        self._events.put((self.job_id, "progress", max(0.0, min(1.0, progress)), message))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+def run_lightning_training(context: JobContext, store_url: str) -> Dict[str, Any]:
+    """Agent Lightning Trainer 학습 실행 (자식 프로세스)"""
+    context.report(0.05, "저장소 연결")
+    from agentlightning import LightningStore, Trainer
+
+    store = LightningStore(store_url=store_url)
+    trainer = Trainer(store=store)
+    if context.cancelled:
+        return {"trained": False}
+
+    context.report(0.2, "학습 실행")
+    # 실제 구현은 trainer API에 따라 다름
+    train = getattr(trainer, "train", None)
+    if callable(train):
+        train()
+    context.report(1.0, "학습 완료")
+    return {"trained": callable(train)}
+
+def _job_entrypoint(target: Callable[..., Any], job_id: str, kwargs: Dict[str, Any], events: Any, cancel_event: Any) -> None:
+    """자식 프로세스 진입점 (결과/오류를 이벤트 큐로 전달)"""
+    context = JobContext(job_id, events, cancel_event)
+    try:
+        result = target(context, **kwargs)
+        events.put((job_id, "result", result if isinstance(result, dict) else {"result": result}, ""))
+    except BaseException as e:
+        events.put((job_id, "error", None, f"{type(e).__name__}: {e}"))
+
+# ============================================
+# 작업 관리
+# ============================================
+
+@dataclass
+class TrainingJob:
+    """학습 작업 상태"""
+    job_id: str
+    reason: str
+    created_at: float = field(default_factory=time.time)
+    status: str = JOB_QUEUED
+    triggers: int = 1  # 이 작업으로 합쳐진 트리거 수
+    progress: float = 0.0
+    message: str = ""
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested_at: Optional[float] = None
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        duration = self.duration_seconds
+        return {
+            "job_id": self.job_id,
+            "reason": self.reason,
+            "status": self.status,
+            "triggers": self.triggers,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": round(duration, 3) if duration is not None else None,
+            "result": self.result,
+            "error": self.error
+        }
+
+class TrainingJobRunner:
+    """학습 작업 대기열과 자식 프로세스 풀
+
+    최대 max_concurrent개의 작업을 각각 별도 프로세스에서 실행한다.
+    debounce 트리거는 debounce_seconds 동안 모아 하나의 작업으로 합치고,
+    실행 전인 작업이 있으면 새 트리거는 그 작업에 합쳐진다.
+    실행 중인 작업 취소는 먼저 협조적 취소를 요청하고 cancel_grace 후 프로세스를 종료한다.
+    """
+
+    def __init__(
+        self,
+        target: Callable[..., Any] = run_lightning_training,
+        target_kwargs: Optional[Dict[str, Any]] = None,
+        max_concurrent: int = 1,
+        max_queue: int = 10,
+        debounce_seconds: float = 30.0,
+        max_debounce_seconds: Optional[float] = None,
+        cancel_grace: float = 5.0,
+        on_complete: Optional[Callable[[TrainingJob], None]] = None,
+        history_size: int = 50,
+        mp_start_method: str = "spawn"
+    ):
+        self.target = target
+        self.target_kwargs = dict(target_kwargs or {})
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(1, max_queue)
+        self.debounce_seconds = debounce_seconds
+        self.max_debounce_seconds = max_debounce_seconds if max_debounce_seconds is not None else debounce_seconds * 5
+        self.cancel_grace = cancel_grace
+        self.on_complete = on_complete
+        self.history_size = max(1, history_size)
+
+        self._mp = multiprocessing.get_context(mp_start_method)
+        self._events: Any = None
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._queue: List[str] = []
+        self._processes: Dict[str, Any] = {}
+        self._cancel_events: Dict[str, Any] = {}
+        self._debounce_first: Optional[float] = None
+        self._debounce_last: Optional[float] = None
+        self._debounce_triggers = 0
+        self._debounce_reason = ""
+        self.last_job: Optional[TrainingJob] = None
+
+    # --------------------------------------------
+    # 공개 API
+    # --------------------------------------------
+
+    def start(self) -> None:
+        """감독 스레드 시작"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            if self._events is None:
+                self._events = self._mp.Queue()
+            self._thread = threading.Thread(target=self._run, name="training-jobs", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """대기 작업 취소, 실행 중 작업 종료 후 감독 스레드 정지"""
+        with self._lock:
+            self._stopping = True
+            for job_id in list(self._queue):
+                self._finish(self._jobs[job_id], JOB_CANCELLED, error="서버 종료")
+            self._queue.clear()
+            for job_id in list(self._processes):
+                self._request_cancel(self._jobs[job_id])
+        self._wakeup.set()
+        deadline = time.time() + timeout
+        for process in list(self._processes.values()):
+            process.join(max(0.0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+        if self._thread is not None:
+            self._thread.join(max(0.0, deadline - time.time()))
+
+    def submit(self, reason: str = "manual", debounce: bool = False) -> Optional[TrainingJob]:
+        """학습 작업 요청
+
+        debounce이면 트리거를 모아 두었다가 나중에 하나의 작업으로 만들고 None을 반환한다.
+        실행 전인 작업이 이미 있으면 그 작업에 합쳐서 반환한다.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        with self._lock:
+            if self._queue:
+                job = self._jobs[self._queue[-1]]
+                job.triggers += 1
+                return job
+            if debounce and self.debounce_seconds > 0:
+                now = time.time()
+                if self._debounce_first is None:
+                    self._debounce_first = now
+                self._debounce_last = now
+                self._debounce_triggers += 1
+                self._debounce_reason = reason
+                self._wakeup.set()
+                return None
+            return self._enqueue(reason, triggers=1)
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """작업 취소 (없는 작업이면 None)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            if job.status == JOB_QUEUED:
+                self._queue.remove(job_id)
+                self._finish(job, JOB_CANCELLED, error="사용자 취소")
+            else:
+                self._request_cancel(job)
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """최근 작업 목록 (최신순)"""
+        with self._lock:
+            return [job.as_dict() for job in reversed(self._jobs.values())]
+
+    def status(self) -> Dict[str, Any]:
+        """학습 진행 상태"""
+        with self._lock:
+            running = [self._jobs[job_id] for job_id in self._processes]
+            last = self.last_job
+            return {
+                "training_active": bool(running),
+                "current_job": running[0].as_dict() if running else None,
+                "running_jobs": len(running),
+                "queued_jobs": len(self._queue),
+                "pending_triggers": self._debounce_triggers,
+                "max_concurrent": self.max_concurrent,
+                "last_job": last.as_dict() if last else None,
+                "last_duration_seconds": round(last.duration_seconds, 3) if last and last.duration_seconds is not None else None
+            }
+
+    # --------------------------------------------
+    # 내부 처리 (잠금 상태에서 호출)
+    # --------------------------------------------
+
+    def _enqueue(self, reason: str, triggers: int) -> TrainingJob:
+        if len(self._queue) >= self.max_queue:
+            raise TrainingQueueFull(f"학습 대기열이 가득 찼습니다 ({self.max_queue})")
+        job = TrainingJob(job_id=f"train_{uuid.uuid4().hex[:12]}", reason=reason, triggers=triggers)
+        self._jobs[job.job_id] = job
+        self._queue.append(job.job_id)
+        self._trim_history()
+        self._wakeup.set()
+        logger.info(f"학습 작업 등록: job_id={job.job_id}, reason={reason}, triggers={triggers}")
+        return job
+
+    def _trim_history(self) -> None:
+        while len(self._jobs) > self.history_size:
+            oldest_id = next(iter(self._jobs))
+            if self._jobs[oldest_id].status not in FINISHED_STATES:
+                break
+            del self._jobs[oldest_id]
+
+    def _request_cancel(self, job: TrainingJob) -> None:
+        event = self._cancel_events.get(job.job_id)
+        if event is not None:
+            event.set()
+        if job.cancel_requested_at is None:
+            job.cancel_requested_at = time.time()
+
+    def _finish(self, job: TrainingJob, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        job.result = result
+        job.error = error
+        if status == JOB_SUCCEEDED:
+            job.progress = 1.0
+        self._processes.pop(job.job_id, None)
+        self._cancel_events.pop(job.job_id, None)
+        if job.started_at is not None:
+            self.last_job = job
+        logger.info(f"학습 작업 종료: job_id={job.job_id}, status={status}, duration={job.duration_seconds}")
+
+    def _flush_debounce(self, now: float) -> None:
+        if self._debounce_first is None or self._debounce_last is None:
+            return
+        quiet = now - self._debounce_last >= self.debounce_seconds
+        overdue = now - self._debounce_first >= self.max_debounce_seconds
+        if not (quiet or overdue):
+            return
+        triggers, reason = self._debounce_triggers, self._debounce_reason
+        self._debounce_first = self._debounce_last = None
+        self._debounce_triggers = 0
+        try:
+            self._enqueue(reason, triggers=triggers)
+        except TrainingQueueFull as e:
+            logger.warning(f"⚠️ {e}: 트리거 {triggers}개 무시")
+
+    def _start_queued(self) -> None:
+        while self._queue and len(self._processes) < self.max_concurrent and not self._stopping:
+            job = self._jobs[self._queue.pop(0)]
+            cancel_event = self._mp.Event()
+            process = self._mp.Process(
+                target=_job_entrypoint,
+                args=(self.target, job.job_id, self.target_kwargs, self._events, cancel_event),
+                name=f"training-{job.job_id}",
+                daemon=True
+            )
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            try:
+                process.start()
+            except Exception as e:
+                self._finish(job, JOB_FAILED, error=f"프로세스 시작 실패: {e}")
+                continue
+            self._processes[job.job_id] = process
+            self._cancel_events[job.job_id] = cancel_event
+
+    def _drain_events(self) -> List[TrainingJob]:
+        completed: List[TrainingJob] = []
+        while True:
+            try:
+                job_id, kind, payload, message = self._events.get_nowait()
+            except queue.Empty:
+                return completed
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                continue
+            if kind == "progress":
+                job.progress, job.message = payload, message
+            elif kind == "result":
+                if job.cancel_requested_at is not None:
+                    self._finish(job, JOB_CANCELLED, result=payload, error="사용자 취소")
+                else:
+                    self._finish(job, JOB_SUCCEEDED, result=payload)
+                    completed.append(job)
+            elif kind == "error":
+                self._finish(job, JOB_FAILED, error=message)
+
+    def _reap_processes(self, now: float) -> List[TrainingJob]:
+        dead: List[TrainingJob] = []
+        for job_id, process in list(self._processes.items()):
+            job = self._jobs[job_id]
+            if process.is_alive():
+                if job.cancel_requested_at is not None and now - job.cancel_requested_at >= self.cancel_grace:
+                    process.terminate()
+                continue
+            process.join(0)
+            dead.append(job)
+        if not dead:
+            return []
+        # 종료 직전에 보낸 결과가 아직 처리되지 않았을 수 있다
+        completed = self._drain_events()
+        for job in dead:
+            if job.status in FINISHED_STATES:
+                continue
+            exitcode = self._processes[job.job_id].exitcode
+            if job.cancel_requested_at is not None:
+                self._finish(job, JOB_CANCELLED, error="사용자 취소")
+            else:
+                self._finish(job, JOB_FAILED, error=f"프로세스 비정상 종료 (exitcode={exitcode})")
+        return completed
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(0.2)
+            self._wakeup.clear()
+            with self._lock:
+                now = time.time()
+                completed = self._drain_events()
+                completed += self._reap_processes(now)
+                if self._stopping and not self._processes:
+                    return
+                self._flush_debounce(now)
+                self._start_queued()
+            for job in completed:
+                if self.on_complete is not None:
+                    try:
+                        self.on_complete(job)
+                    except Exception as e:
+                        logger.warning(f"⚠️ 학습 완료 처리 실패: {e}")
@@ -0,0 +1,330 @@
+"""
+학습 데이터 누적 통계
+Span/보상이 기록될 때마다 집계를 갱신하여, 상태 조회 시 저장소 전체를 다시 읽지 않고
+O(1)로 응답한다. 집계는 주기적으로 파일에 저장되고, 시작 시에만 파일 또는 저장소에서 복원된다.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from metrics import OVERFLOW_LABEL
+
+logger = logging.getLogger(__name__)
+
+STATS_FORMAT_VERSION = 1
+
+class RunningStats:
+    """개수/합/평균/분산 누적 (Welford)"""
+
+    __slots__ = ("count", "total", "mean", "m2")
+
+    def __init__(self, count: int = 0, total: float = 0.0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.total = total
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.mean, 6),
+            "variance": round(self.variance, 6),
+            "stddev": round(math.sqrt(self.variance), 6)
+        }
+
+    def merge(self, other: "RunningStats") -> None:
+        """다른 누적값 합치기 (병렬 Welford)"""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.total += other.total
+        self.count = count
+
+    def to_list(self) -> List[float]:
+        return [self.count, self.total, self.mean, self.m2]
+
+    @classmethod
+    def from_list(cls, values: List[float]) -> "RunningStats":
+        count, total, mean, m2 = values
+        return cls(int(count), float(total), float(mean), float(m2))
+
+class SlidingWindow:
+    """최근 window_seconds 동안의 Span 수와 보상 통계 (bucket_seconds 단위 버킷)
+
+    버킷이 만료될 때 누적값에서 빼므로 갱신과 조회 모두 분할 상환 O(1)이다.
+    """
+
+    def __init__(self, window_seconds: float, bucket_seconds: float):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        # [버킷 시작 시각, spans, rewards, reward 합, reward 제곱합]
+        self._buckets: Deque[List[float]] = deque()
+        self._totals = [0, 0, 0.0, 0.0]
+
+    def _bucket(self, now: float) -> List[float]:
+        start = now - now % self.bucket_seconds
+        if not self._buckets or self._buckets[-1][0] < start:
+            self._buckets.append([start, 0, 0, 0.0, 0.0])
+        return self._buckets[-1]
+
+    def _evict(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._buckets and self._buckets[0][0] + self.bucket_seconds <= horizon:
+            _, spans, rewards, reward_sum, reward_sumsq = self._buckets.popleft()
+            self._totals[0] -= spans
+            self._totals[1] -= rewards
+            self._totals[2] -= reward_sum
+            self._totals[3] -= reward_sumsq
+
+    def add_span(self, now: float) -> None:
+        self._evict(now)
+        self._bucket(now)[1] += 1
+        self._totals[0] += 1
+
+    def add_reward(self, reward: float, now: float) -> None:
+        self._evict(now)
+        bucket = self._bucket(now)
+        bucket[2] += 1
+        bucket[3] += reward
+        bucket[4] += reward * reward
+        self._totals[1] += 1
+        self._totals[2] += reward
+        self._totals[3] += reward * reward
+
+    def summary(self, now: float) -> Dict[str, Any]:
+        self._evict(now)
+        spans, rewards, reward_sum, reward_sumsq = self._totals
+        mean = reward_sum / rewards if rewards else 0.0
+        variance = max(reward_sumsq / rewards - mean * mean, 0.0) if rewards else 0.0
+        return {
+            "spans": spans,
+            "rewards": rewards,
+            "average_reward": round(mean, 6),
+            "reward_variance": round(variance, 6)
+        }
+
+    def to_list(self) -> List[List[float]]:
+        return [list(bucket) for bucket in self._buckets]
+
+    def load_list(self, buckets: List[List[float]]) -> None:
+        self._buckets = deque(list(bucket) for bucket in buckets)
+        self._totals = [0, 0, 0.0, 0.0]
+        for _, spans, rewards, reward_sum, reward_sumsq in self._buckets:
+            self._totals[0] += spans
+            self._totals[1] += rewards
+            self._totals[2] += reward_sum
+            self._totals[3] += reward_sumsq
+
+class _Breakdown:
+    """카테고리/모델 별 Span 수와 보상 통계"""
+
+    __slots__ = ("spans", "rewards")
+
+    def __init__(self, spans: int = 0, rewards: Optional[RunningStats] = None):
+        self.spans = spans
+        self.rewards = rewards or RunningStats()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"spans": self.spans, "rewards": self.rewards.summary()}
+
+def _bounded_key(table: Dict[str, _Breakdown], key: str, max_keys: int) -> str:
+    """집계 키 (키 수가 상한에 도달하면 새 키는 OVERFLOW_LABEL로 묶는다)"""
+    if key in table or len(table) < max_keys:
+        return key
+    return OVERFLOW_LABEL
+
+class TrainingStatistics:
+    """Span/보상 누적 통계
+
+    보상은 Span ID로 카테고리/모델에 귀속되며, 귀속 정보는 최근 max_tracked_spans개만 유지한다.
+    카테고리/모델은 요청이 정하는 값이므로 각각 max_breakdown_keys개까지만 따로 집계하고
+    나머지는 "other"로 묶는다 (메트릭 레이블 상한과 같은 방식).
+    """
+
+    def __init__(
+        self,
+        max_tracked_spans: int = 100000,
+        windows: bool = True,
+        clock=time.time,
+        max_breakdown_keys: int = 1000
+    ):
+        self.max_tracked_spans = max(1, max_tracked_spans)
+        self.max_breakdown_keys = max(1, max_breakdown_keys)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.total_spans = 0
+        self.rewards = RunningStats()
+        self.by_category: Dict[str, _Breakdown] = {}
+        self.by_model: Dict[str, _Breakdown] = {}
+        self._span_keys: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self.windows: Dict[str, SlidingWindow] = {
+            "1h": SlidingWindow(3600, 60),
+            "24h": SlidingWindow(86400, 3600)
+        } if windows else {}
+        self.updated_at: Optional[float] = None
+        self.restored_from: Optional[str] = None
+
+    def record_span(self, span_id: Optional[str], category: str, model: Optional[str], timestamp: Optional[float] = None) -> None:
+        """Span 기록 반영"""
+        now = self._clock() if timestamp is None else timestamp
+        model = model or "unknown"
+        with self._lock:
+            category = _bounded_key(self.by_category, category, self.max_breakdown_keys)
+            model = _bounded_key(self.by_model, model, self.max_breakdown_keys)
+            self.total_spans += 1
+            self.by_category.setdefault(category, _Breakdown()).spans += 1
+            self.by_model.setdefault(model, _Breakdown()).spans += 1
+            if span_id:
+                self._span_keys[span_id] = (category, model)
+                if len(self._span_keys) > self.max_tracked_spans:
+                    self._span_keys.popitem(last=False)
+            for window in self.windows.values():
+                window.add_span(now)
+            self.updated_at = now
+
+    def record_reward(self, span_id: Optional[str], reward: float, timestamp: Optional[float] = None) -> None:
+        """보상 기록 반영"""
+        now = self._clock() if timestamp is None else timestamp
+        with self._lock:
+            self.rewards.add(reward)
+            category, model = self._span_keys.get(span_id or "", ("unknown", "unknown"))
+            category = _bounded_key(self.by_category, category, self.max_breakdown_keys)
+            model = _bounded_key(self.by_model, model, self.max_breakdown_keys)
+            self.by_category.setdefault(category, _Breakdown()).rewards.add(reward)
+            self.by_model.setdefault(model, _Breakdown()).rewards.add(reward)
+            for window in self.windows.values():
+                window.add_reward(reward, now)
+            self.updated_at = now
+
+    def rebuild(
+        self,
+        spans: Iterable[Tuple[Optional[str], str, Optional[str], Optional[float]]],
+        rewards: Iterable[Tuple[Optional[str], float, Optional[float]]]
+    ) -> None:
+        """저장소의 Span/보상 전체로 통계 재구성 (시작 시에만 사용)"""
+        self.reset()
+        for span_id, category, model, timestamp in spans:
+            self.record_span(span_id, category, model, timestamp)
+        for span_id, reward, timestamp in rewards:
+            self.record_reward(span_id, reward, timestamp)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.total_spans = 0
+            self.rewards = RunningStats()
+            self.by_category.clear()
+            self.by_model.clear()
+            self._span_keys.clear()
+            for name, window in list(self.windows.items()):
+                self.windows[name] = SlidingWindow(window.window_seconds, window.bucket_seconds)
+            self.updated_at = None
+
+    def summary(self, breakdown: bool = True) -> Dict[str, Any]:
+        """현재 통계 (Span/보상 수와 무관하게 일정한 비용)"""
+        now = self._clock()
+        with self._lock:
+            summary: Dict[str, Any] = {
+                "total_spans": self.total_spans,
+                "total_rewards": self.rewards.count,
+                "average_reward": round(self.rewards.mean, 6),
+                "reward": self.rewards.summary(),
+                "updated_at": self.updated_at,
+                "restored_from": self.restored_from
+            }
+            if breakdown:
+                summary["by_category"] = {key: value.summary() for key, value in self.by_category.items()}
+                summary["by_model"] = {key: value.summary() for key, value in self.by_model.items()}
+            if self.windows:
+                summary["windows"] = {name: window.summary(now) for name, window in self.windows.items()}
+            return summary
+
+    # --------------------------------------------
+    # 저장/복원
+    # --------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "format_version": STATS_FORMAT_VERSION,
+                "saved_at": self._clock(),
+                "total_spans": self.total_spans,
+                "rewards": self.rewards.to_list(),
+                "by_category": {key: [value.spans, value.rewards.to_list()] for key, value in self.by_category.items()},
+                "by_model": {key: [value.spans, value.rewards.to_list()] for key, value in self.by_model.items()},
+                "span_keys": list(self._span_keys.items()),
+                "windows": {name: window.to_list() for name, window in self.windows.items()},
+                "updated_at": self.updated_at
+            }
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        if data.get("format_version") != STATS_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 통계 형식: {data.get('format_version')}")
+        with self._lock:
+            self.total_spans = int(data["total_spans"])
+            self.rewards = RunningStats.from_list(data["rewards"])
+            self.by_category = self._load_breakdown(data["by_category"])
+            self.by_model = self._load_breakdown(data["by_model"])
+            self._span_keys = OrderedDict(
+                (span_id, (
+                    category if category in self.by_category else OVERFLOW_LABEL,
+                    model if model in self.by_model else OVERFLOW_LABEL
+                ))
+                for span_id, (category, model) in data.get("span_keys", [])
+            )
+            for name, buckets in data.get("windows", {}).items():
+                if name in self.windows:
+                    self.windows[name].load_list(buckets)
+            self.updated_at = data.get("updated_at")
+
+    def _load_breakdown(self, data: Dict[str, List[Any]]) -> Dict[str, _Breakdown]:
+        """저장된 집계 복원 (상한을 넘는 키는 OVERFLOW_LABEL로 합친다)"""
+        table: Dict[str, _Breakdown] = {}
+        for key, (spans, rewards) in data.items():
+            key = _bounded_key(table, key, self.max_breakdown_keys)
+            breakdown = table.setdefault(key, _Breakdown())
+            breakdown.spans += int(spans)
+            breakdown.rewards.merge(RunningStats.from_list(rewards))
+        return table
+
+    def save(self, path: str) -> None:
+        """파일에 원자적으로 저장"""
+        data = self.to_dict()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def load(self, path: str) -> bool:
+        """파일에서 복원 (파일이 없거나 손상되었으면 False)"""
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.load_dict(json.load(f))
+        except Exception as e:
+            logger.warning(f"⚠️ 학습 통계 파일 복원 실패 ({path}): {e}")
+            self.reset()
+            return False
+        self.restored_from = "file"
+        return True
@@ -0,0 +1,307 @@
+"""
+웜 재시작 상태 파일
+학습 스냅샷, 최적화 결과 캐시, 템플릿 색인처럼 다시 만드는 데 시간이 걸리는 메모리 상태를
+주기적으로/종료 시 파일 하나에 기록하고, 시작 시 준비 상태가 되기 전에 복원한다.
+파일이 없거나 손상되었거나 형식이 맞지 않으면 아무것도 복원하지 않으며(콜드 시작),
+구성 요소별 호환성 키가 다른 섹션만 건너뛸 수도 있다.
+
+파일 형식:
+    헤더   : 매직 8바이트, 형식 버전 u32, 섹션 수 u32, 기록 시각 f64, 헤더 CRC32 u32
+    섹션   : 이름 길이 u16, 호환성 키 길이 u16, 본문 길이 u64, CRC32 u32 (이름+키+본문), 이름, 키, 본문
+    본문   : 압축된 JSON 메타데이터 (길이 u32 + zlib) 와 배열 원시 바이트 목록 (개수 u32, 각 길이 u64 + zlib)
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WARM_STATE_MAGIC = b"AGLWARM1"
+WARM_STATE_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIId")
+_CRC = struct.Struct("<I")
+_SECTION = struct.Struct("<HHQI")
+_LENGTH32 = struct.Struct("<I")
+_LENGTH64 = struct.Struct("<Q")
+
+# capture()가 반환하는 섹션 내용: (JSON 직렬화 가능한 메타데이터, 배열 원시 바이트 목록)
+SectionState = Tuple[Any, List[bytes]]
+
+def encode_section(meta: Any, buffers: List[bytes]) -> bytes:
+    """섹션 본문 생성 (메타데이터는 JSON, 배열은 원시 바이트로 각각 zlib 압축)"""
+    compressed = zlib.compress(json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 1)
+    parts = [_LENGTH32.pack(len(compressed)), compressed, _LENGTH32.pack(len(buffers))]
+    for data in buffers:
+        data = zlib.compress(data, 1)
+        parts.append(_LENGTH64.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def _decode_body(body: bytes) -> SectionState:
+    (meta_length,) = _LENGTH32.unpack_from(body, 0)
+    offset = _LENGTH32.size
+    meta = json.loads(zlib.decompress(body[offset:offset + meta_length]))
+    offset += meta_length
+    (count,) = _LENGTH32.unpack_from(body, offset)
+    offset += _LENGTH32.size
+    buffers = []
+    for _ in range(count):
+        (length,) = _LENGTH64.unpack_from(body, offset)
+        offset += _LENGTH64.size
+        buffers.append(zlib.decompress(body[offset:offset + length]))
+        offset += length
+    if offset != len(body):
+        raise ValueError("섹션 본문 길이가 맞지 않습니다")
+    return meta, buffers
+
+def write_warm_state(path: str, sections: List[Tuple[str, str, bytes]]) -> int:
+    """(이름, 호환성 키, encode_section 본문) 섹션들을 파일로 기록 (임시 파일 + 이름 변경, 파일 크기 반환)"""
+    header = _HEADER.pack(WARM_STATE_MAGIC, WARM_STATE_FORMAT_VERSION, len(sections), time.time())
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    size = 0
+    try:
+        with open(temp_path, "wb") as f:
+            for chunk in (header, _CRC.pack(zlib.crc32(header))):
+                f.write(chunk)
+                size += len(chunk)
+            for name, compatibility, body in sections:
+                name_bytes = name.encode("utf-8")
+                key_bytes = compatibility.encode("utf-8")
+                checksum = zlib.crc32(body, zlib.crc32(key_bytes, zlib.crc32(name_bytes)))
+                for chunk in (_SECTION.pack(len(name_bytes), len(key_bytes), len(body), checksum), name_bytes, key_bytes, body):
+                    f.write(chunk)
+                    size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return size
+
+def read_warm_state(path: str) -> Tuple[float, Dict[str, Tuple[str, bytes]]]:
+    """(기록 시각, 이름 -> (호환성 키, 본문)) - 손상되었거나 형식 버전이 다르면 ValueError
+
+    본문은 섹션을 실제로 복원할 때 decode_section으로 해석한다.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size + _CRC.size:
+        raise ValueError(f"웜 상태 파일이 너무 짧습니다: {len(data)} bytes")
+    magic, format_version, count, created_at = _HEADER.unpack_from(data, 0)
+    if magic != WARM_STATE_MAGIC:
+        raise ValueError("웜 상태 파일 형식이 아닙니다")
+    (header_checksum,) = _CRC.unpack_from(data, _HEADER.size)
+    if zlib.crc32(data[:_HEADER.size]) != header_checksum:
+        raise ValueError("웜 상태 파일 헤더 체크섬 불일치")
+    if format_version != WARM_STATE_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 웜 상태 형식 버전: {format_version}")
+    offset = _HEADER.size + _CRC.size
+    sections: Dict[str, Tuple[str, bytes]] = {}
+    for _ in range(count):
+        if offset + _SECTION.size > len(data):
+            raise ValueError("웜 상태 파일이 잘렸습니다")
+        name_length, key_length, body_length, checksum = _SECTION.unpack_from(data, offset)
+        offset += _SECTION.size
+        end = offset + name_length + key_length + body_length
+        if end > len(data):
+            raise ValueError("웜 상태 파일이 잘렸습니다")
+        name_bytes = data[offset:offset + name_length]
+        key_bytes = data[offset + name_length:offset + name_length + key_length]
+        body = data[offset + name_length + key_length:end]
+        if zlib.crc32(body, zlib.crc32(key_bytes, zlib.crc32(name_bytes))) != checksum:
+            raise ValueError(f"웜 상태 섹션 체크섬 불일치: {name_bytes.decode('utf-8', 'replace')}")
+        sections[name_bytes.decode("utf-8")] = (key_bytes.decode("utf-8"), body)
+        offset = end
+    if offset != len(data):
+        raise ValueError("웜 상태 파일 끝에 알 수 없는 데이터가 있습니다")
+    return created_at, sections
+
+def decode_section(body: bytes) -> SectionState:
+    """섹션 본문 해석 ((메타데이터, 배열 바이트 목록), 형식이 맞지 않으면 ValueError)"""
+    try:
+        return _decode_body(body)
+    except (struct.error, zlib.error) as e:
+        raise ValueError(f"섹션 본문을 해석할 수 없습니다: {e}")
+
+class _Section:
+    __slots__ = ("name", "capture", "restore", "compatibility")
+
+    def __init__(self, name: str, capture: Callable[[], Optional[SectionState]], restore: Callable[[Any, List[bytes]], Any], compatibility: str):
+        self.name = name
+        self.capture = capture
+        self.restore = restore
+        self.compatibility = compatibility
+
+class WarmStateManager:
+    """웜 상태 주기적 기록 및 시작 시 복원
+
+    구성 요소마다 register(name, capture, restore, compatibility)로 섹션을 등록한다.
+    capture()는 (메타데이터, 배열 바이트 목록) 또는 기록할 것이 없으면 None을 반환하고,
+    restore(meta, buffers)는 상태를 통째로 교체하며 맞지 않는 상태면 ValueError를 낸다.
+    capture()가 직전 기록 때와 같은 객체를 반환하면 그 섹션은 다시 직렬화하지 않는다.
+    섹션은 등록 순서대로 복원되므로 다른 섹션에 의존하는 섹션(예: 학습 스냅샷 버전을 쓰는 캐시)은 뒤에 등록한다.
+    """
+
+    def __init__(self, path: str, interval: float = 300.0, name: str = "warm-state"):
+        self.path = path
+        self.interval = interval
+        self.name = name
+        self.restored: Dict[str, Any] = {}
+        self.skipped: Dict[str, str] = {}
+        self.restored_from: Optional[float] = None
+        self.last_restore_ms = 0.0
+        self.last_restore_error: Optional[str] = None
+        self.save_count = 0
+        self.last_save_at: Optional[float] = None
+        self.last_save_ms = 0.0
+        self.last_save_bytes = 0
+        self.last_error: Optional[str] = None
+        self._sections: List[_Section] = []
+        # 섹션 이름 -> (직전에 기록한 capture() 결과, 본문)
+        self._encoded: Dict[str, Tuple[SectionState, bytes]] = {}
+        self._save_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def register(
+        self,
+        name: str,
+        capture: Callable[[], Optional[SectionState]],
+        restore: Callable[[Any, List[bytes]], Any],
+        compatibility: str = ""
+    ) -> None:
+        """섹션 등록 (compatibility가 저장 당시와 다르면 그 섹션은 복원하지 않는다, 같은 이름이면 교체)"""
+        section = _Section(name, capture, restore, compatibility)
+        with self._save_lock:
+            for index, existing in enumerate(self._sections):
+                if existing.name == name:
+                    self._sections[index] = section
+                    break
+            else:
+                self._sections.append(section)
+
+    def unregister(self, name: str) -> None:
+        """섹션 등록 해제 (이후 기록/복원하지 않는다, 없으면 무시)"""
+        with self._save_lock:
+            self._sections = [section for section in self._sections if section.name != name]
+            self._encoded.pop(name, None)
+
+    def restore(self) -> bool:
+        """파일에서 상태 복원 (하나라도 복원했으면 True, 파일이 없거나 손상되었으면 콜드 시작)"""
+        if not self.enabled:
+            return False
+        started = time.perf_counter()
+        self.restored, self.skipped = {}, {}
+        try:
+            created_at, sections = read_warm_state(self.path)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            self.last_restore_error = str(e)
+            logger.warning(f"⚠️ 웜 상태 파일을 사용할 수 없습니다 (콜드 시작): {e}")
+            return False
+        for section in self._sections:
+            stored = sections.get(section.name)
+            if stored is None:
+                continue
+            compatibility, body = stored
+            if compatibility != section.compatibility:
+                self.skipped[section.name] = "호환성 키 불일치"
+                continue
+            try:
+                meta, buffers = decode_section(body)
+                self.restored[section.name] = section.restore(meta, buffers)
+            except (ValueError, KeyError, TypeError, IndexError) as e:
+                self.skipped[section.name] = str(e)
+        self.restored_from = created_at
+        self.last_restore_error = None
+        self.last_restore_ms = (time.perf_counter() - started) * 1000
+        for section_name, reason in self.skipped.items():
+            logger.warning(f"⚠️ 웜 상태 섹션 건너뜀 ({section_name}): {reason}")
+        logger.info(
+            f"✅ 웜 상태 복원: {', '.join(self.restored) or '없음'} "
+            f"(기록 {time.time() - created_at:.0f}초 전, {self.last_restore_ms:.0f}ms)"
+        )
+        return bool(self.restored)
+
+    def save(self) -> Dict[str, Any]:
+        """현재 상태를 파일로 기록 (기록한 섹션 목록과 크기 반환)"""
+        if not self.enabled:
+            return {"saved": False, "sections": []}
+        with self._save_lock:
+            started = time.perf_counter()
+            sections = []
+            try:
+                for section in self._sections:
+                    state = section.capture()
+                    if state is None:
+                        self._encoded.pop(section.name, None)
+                        continue
+                    encoded = self._encoded.get(section.name)
+                    if encoded is None or encoded[0] is not state:
+                        encoded = self._encoded[section.name] = (state, encode_section(*state))
+                    sections.append((section.name, section.compatibility, encoded[1]))
+                self.last_save_bytes = write_warm_state(self.path, sections)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"⚠️ 웜 상태 기록 실패: {e}")
+                return {"saved": False, "sections": [], "error": str(e)}
+            finally:
+                self.last_save_ms = (time.perf_counter() - started) * 1000
+            self.save_count += 1
+            self.last_save_at = time.time()
+            self.last_error = None
+            return {"saved": True, "sections": [name for name, _, _ in sections], "bytes": self.last_save_bytes}
+
+    def start(self) -> None:
+        """주기적 기록 스레드 시작 (interval <= 0 이면 종료 시에만 기록)"""
+        if not self.enabled or self.interval <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """기록 스레드 종료 후 마지막으로 한 번 기록"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.save()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.save()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval": self.interval,
+            "sections": [section.name for section in self._sections],
+            "restored": self.restored,
+            "skipped": self.skipped,
+            "restored_from": self.restored_from,
+            "last_restore_ms": round(self.last_restore_ms, 3),
+            "last_restore_error": self.last_restore_error,
+            "save_count": self.save_count,
+            "last_save_at": self.last_save_at,
+            "last_save_ms": round(self.last_save_ms, 3),
+            "last_save_bytes": self.last_save_bytes,
+            "last_error": self.last_error
+        }